@@ -0,0 +1,299 @@
+"""
+Offline difficulty calibration from the game event log.
+
+Loads the answer events written by event_log.py into NumPy columns (log
+files past --memmap-mb are memory-mapped instead of read), then computes
+per question, with vectorized group-bys:
+
+  * accuracy per attempt and median solve time of correct answers
+  * discrimination: correlation between answering correctly and the
+    player's accuracy on their other answers
+  * the time-bonus distribution (answers inside each GameRules threshold)
+
+and suggests difficulty labels: questions are ranked by error rate and
+solve time and re-cut into the bank's labels in their current proportions.
+NumPy is only needed for this command.
+
+    python analytics.py events --min-attempts 30 --output calibration.json
+    python analytics.py /tmp/synthetic --synthetic 10000000     # benchmark
+"""
+
+import argparse
+import json
+import os
+import time
+
+try:
+    import numpy as np
+except ImportError:     # optional: nothing in the app imports this module
+    np = None
+
+from engine import DEFAULT_RULES
+from event_log import CORRECT, HEADER, MAGIC, RECORD, VERSION, WRONG, log_files, question_key
+from question_bank import DIFFICULTIES, get_bank
+
+ERROR_WEIGHT = 0.75         # vs. 0.25 for solve time when ranking hardness
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("analytics needs numpy (pip install numpy)")
+
+
+def event_dtype():
+    """NumPy layout of one event_log record"""
+    _require_numpy()
+    dtype = np.dtype([
+        ("time", "<f8"), ("session", "<u8"), ("question", "<u4"), ("elapsed", "<f4"),
+        ("score", "<i4"), ("kind", "u1"), ("difficulty", "u1"), ("language", "u1"), ("lives", "u1"),
+    ])
+    assert dtype.itemsize == RECORD.size
+    return dtype
+
+
+# ===========================
+# LOADING
+# ===========================
+
+def load_answers(directory, memmap_bytes=64 * 1024 * 1024):
+    """Columns of every answer event: question, session, correct, elapsed"""
+    dtype = event_dtype()
+    parts = []
+    for path in log_files(directory):
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION, RECORD.size):
+            continue
+        count = (os.path.getsize(path) - HEADER.size) // RECORD.size
+        if not count:
+            continue
+        if count * RECORD.size >= memmap_bytes:
+            records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+        else:
+            records = np.fromfile(path, dtype=dtype, count=count, offset=HEADER.size)
+        kind = records["kind"]
+        answers = (kind == CORRECT) | (kind == WRONG)
+        parts.append((
+            records["question"][answers], records["session"][answers],
+            kind[answers] == CORRECT, records["elapsed"][answers],
+        ))
+    if not parts:
+        return {"question": np.empty(0, "u4"), "session": np.empty(0, "u8"),
+                "correct": np.empty(0, bool), "elapsed": np.empty(0, "f4")}
+    names = ("question", "session", "correct", "elapsed")
+    return {name: np.concatenate([part[i] for part in parts]) for i, name in enumerate(names)}
+
+
+# ===========================
+# GROUP-BYS
+# ===========================
+
+def _groups(values):
+    """(sorted distinct values, group id of each value)"""
+    # One argsort; several times faster than np.unique(return_inverse=True) here
+    order = values.argsort()
+    ordered = values[order]
+    starts = np.empty(len(values), dtype=bool)
+    starts[:1] = True
+    np.not_equal(ordered[1:], ordered[:-1], out=starts[1:])
+    group = np.empty(len(values), dtype=np.intp)
+    group[order] = np.cumsum(starts) - 1
+    return ordered[starts], group
+
+
+def _group_median(groups, values, size):
+    """Median of non-negative values per group id (NaN where a group is empty)"""
+    # One sort of group * span + value orders by group, then value
+    span = float(values.max()) + 1.0 if len(values) else 1.0
+    counts = np.bincount(groups, minlength=size)
+    sorted_values = np.sort(groups * span + values) - np.repeat(np.arange(size) * span, counts)
+    starts = np.cumsum(counts) - counts
+    medians = np.full(size, np.nan)
+    has = counts > 0
+    low = starts[has] + (counts[has] - 1) // 2
+    high = starts[has] + counts[has] // 2
+    medians[has] = (sorted_values[low] + sorted_values[high]) / 2.0
+    return medians
+
+
+def question_stats(answers, bonus_thresholds=None):
+    """Per-question arrays keyed by question crc32"""
+    if bonus_thresholds is None:
+        bonus_thresholds = [within for within, _ in DEFAULT_RULES.time_bonuses]
+    keys, group = _groups(answers["question"])
+    size = len(keys)
+    correct = answers["correct"].astype(np.float64)
+    attempts = np.bincount(group, minlength=size)
+    right = np.bincount(group, weights=correct, minlength=size)
+    accuracy = right / np.maximum(attempts, 1)
+
+    # Solve time and bonus bands over correct answers with a known time
+    solved = answers["correct"] & np.isfinite(answers["elapsed"])
+    solved_group = group[solved]
+    solved_time = answers["elapsed"][solved].astype(np.float64)
+    median_time = _group_median(solved_group, solved_time, size)
+    bands = np.searchsorted(np.asarray(bonus_thresholds, dtype=np.float64), solved_time, side="right")
+    band_count = len(bonus_thresholds) + 1
+    band_totals = np.bincount(solved_group * band_count + bands, minlength=size * band_count)
+    band_totals = band_totals.reshape(size, band_count)
+    bonus_share = band_totals / np.maximum(band_totals.sum(axis=1, keepdims=True), 1)
+
+    # Discrimination: point-biserial correlation with the rest-of-session accuracy
+    sessions, session_group = _groups(answers["session"])
+    session_attempts = np.bincount(session_group, minlength=len(sessions))
+    session_right = np.bincount(session_group, weights=correct, minlength=len(sessions))
+    others = session_attempts[session_group] - 1
+    usable = others > 0
+    ability = (session_right[session_group][usable] - correct[usable]) / others[usable]
+    g = group[usable]
+    y = correct[usable]
+    n = np.bincount(g, minlength=size)
+    sx = np.bincount(g, weights=ability, minlength=size)
+    sxx = np.bincount(g, weights=ability * ability, minlength=size)
+    sy = np.bincount(g, weights=y, minlength=size)
+    sxy = np.bincount(g, weights=ability * y, minlength=size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = sx / n
+        mean_y = sy / n
+        cov = sxy / n - mean_x * mean_y
+        var_x = sxx / n - mean_x * mean_x
+        var_y = mean_y * (1 - mean_y)
+        discrimination = cov / np.sqrt(var_x * var_y)
+    discrimination[~np.isfinite(discrimination)] = np.nan
+
+    return {
+        "key": keys,
+        "attempts": attempts,
+        "accuracy": accuracy,
+        "median_time": median_time,
+        "discrimination": discrimination,
+        "bonus_share": bonus_share,
+        "bonus_thresholds": list(bonus_thresholds),
+    }
+
+
+def _percentile_rank(values):
+    """Rank of each value in [0, 1]; NaN ranks in the middle"""
+    filled = np.where(np.isfinite(values), values, np.nanmedian(values) if np.isfinite(values).any() else 0.0)
+    order = filled.argsort(kind="stable")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    return ranks / max(len(values) - 1, 1)
+
+
+def recalibrate(stats, current, min_attempts=30):
+    """Suggested label per row: hardness ranks cut in the current label proportions"""
+    suggested = list(current)
+    rows = np.flatnonzero((stats["attempts"] >= min_attempts) & np.array([c in DIFFICULTIES for c in current], dtype=bool))
+    if len(rows) < 2:
+        return suggested
+    hardness = (ERROR_WEIGHT * _percentile_rank(1.0 - stats["accuracy"][rows])
+                + (1 - ERROR_WEIGHT) * _percentile_rank(stats["median_time"][rows]))
+    order = rows[np.argsort(hardness, kind="stable")]
+    labels = sorted((current[i] for i in rows), key=DIFFICULTIES.index)
+    for row, label in zip(order, labels):
+        suggested[row] = label
+    return suggested
+
+
+def calibrate(directory, min_attempts=30, memmap_bytes=64 * 1024 * 1024, bank=None):
+    """Load, aggregate and relabel; returns (per-question rows, timings)"""
+    bank = bank if bank is not None else get_bank()
+    started = time.perf_counter()
+    answers = load_answers(directory, memmap_bytes)
+    loaded = time.perf_counter()
+    stats = question_stats(answers)
+    by_key = {question_key(qid): question for qid, question in bank.questions.items()}
+    questions = [by_key.get(int(key)) for key in stats["key"]]
+    current = [q["diff"] if q is not None else None for q in questions]
+    suggested = recalibrate(stats, current, min_attempts)
+    finished = time.perf_counter()
+
+    rows = []
+    for i, question in enumerate(questions):
+        rows.append({
+            "id": question["id"] if question is not None else f"unknown:{int(stats['key'][i]):08x}",
+            "topic": question["topic"] if question is not None else None,
+            "attempts": int(stats["attempts"][i]),
+            "accuracy": round(float(stats["accuracy"][i]), 4),
+            "median_time": None if np.isnan(stats["median_time"][i]) else round(float(stats["median_time"][i]), 2),
+            "discrimination": None if np.isnan(stats["discrimination"][i]) else round(float(stats["discrimination"][i]), 3),
+            "bonus_share": [round(float(share), 4) for share in stats["bonus_share"][i]],
+            "current": current[i],
+            "suggested": suggested[i],
+        })
+    timings = {
+        "answers": int(len(answers["question"])),
+        "load_s": round(loaded - started, 3),
+        "aggregate_s": round(finished - loaded, 3),
+        "bonus_thresholds": stats["bonus_thresholds"],
+    }
+    return rows, timings
+
+
+# ===========================
+# SYNTHETIC LOGS
+# ===========================
+
+def write_synthetic(directory, events, bank=None, seed=0, players=None):
+    """Write a log of ``events`` simulated answers for benchmarking"""
+    dtype = event_dtype()
+    bank = bank if bank is not None else get_bank()
+    rng = np.random.default_rng(seed)
+    ids = list(bank.questions)
+    keys = np.array([question_key(qid) for qid in ids], dtype="u4")
+    labels = np.array([DIFFICULTIES.index(bank.questions[qid]["diff"]) for qid in ids])
+    # True hardness: the label plus noise, so some labels are wrong
+    hardness = labels - 1.5 + rng.normal(0, 1.0, len(ids))
+    players = players or max(1, events // 40)
+    skill = rng.normal(0, 1, players)
+
+    records = np.zeros(events, dtype=dtype)
+    question = rng.integers(0, len(ids), events)
+    session = rng.integers(0, players, events)
+    p = 1 / (1 + np.exp(hardness[question] - skill[session]))
+    correct = rng.random(events) < p
+    records["time"] = time.time() + np.arange(events) * 0.01
+    records["session"] = session
+    records["question"] = keys[question]
+    records["elapsed"] = rng.lognormal(np.log(20) + 0.4 * hardness[question], 0.5)
+    records["kind"] = np.where(correct, CORRECT, WRONG)
+    records["difficulty"] = labels[question]
+    records["lives"] = 3
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"events-synthetic-{seed}.log")
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        records.tofile(f)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recalibrate question difficulty from logged answers")
+    parser.add_argument("directory", help="event log directory (CODERACER_EVENTS)")
+    parser.add_argument("--min-attempts", type=int, default=30, help="leave rarer questions as they are")
+    parser.add_argument("--memmap-mb", type=int, default=64, help="memory-map log files at least this big")
+    parser.add_argument("--output", help="write every question's statistics as JSON here")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="first write N simulated answers into the directory")
+    args = parser.parse_args(argv)
+    _require_numpy()
+
+    if args.synthetic:
+        write_synthetic(args.directory, args.synthetic)
+    rows, timings = calibrate(args.directory, args.min_attempts, args.memmap_mb * 1024 * 1024)
+    moves = [row for row in rows if row["suggested"] != row["current"]]
+    print(f"{timings['answers']} answers, {len(rows)} questions: "
+          f"loaded in {timings['load_s']}s, aggregated in {timings['aggregate_s']}s")
+    print(f"{len(moves)} questions change difficulty")
+    for row in sorted(moves, key=lambda r: r["accuracy"]):
+        median = "-" if row["median_time"] is None else f"{row['median_time']:.1f}s"
+        print(f"  {row['id']:40s} {row['current']:>9s} -> {row['suggested']:9s} "
+              f"acc {row['accuracy']:.2f}  median {median}  n={row['attempts']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"timings": timings, "questions": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
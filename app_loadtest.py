@@ -0,0 +1,195 @@
+"""
+Concurrent-session load test for the Streamlit app.
+
+Runs main.py in-process through Streamlit's AppTest harness, one simulated
+player per thread, and ramps the number of players.  Each player goes menu
+-> playing -> submit answers -> game_over and starts again until the step
+ends; while "thinking" it reruns the page at the live-view refresh rate,
+as the browser's timer would.  Prints a JSON report with rerun counts,
+p50/p95/p99 rerun service time and queueing delay, and session state size.
+
+What this does not measure: AppTest swaps a process-wide Runtime per run,
+so runs are serialized behind one lock and throughput cannot grow with
+players; and AppTest cannot run a fragment on its own, so each timer tick
+reruns the whole script where a browser would rerun only the live-view
+fragment (timer reruns are reported apart as an upper bound).  Capacity,
+CPU use and memory per session of a real server need a load generator
+against `streamlit run`.
+
+    python app_loadtest.py --players 1 2 4 8 16 --duration 20 --think-time 2
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MAIN = os.path.join(HERE, "main.py")
+
+_run_lock = threading.Lock()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+class SimulatedPlayer:
+    """Drives one AppTest session through races until the deadline"""
+    def __init__(self, seed, accuracy, think_time, refresh):
+        self.rng = random.Random(seed)
+        self.accuracy = accuracy
+        self.think_time = think_time
+        self.refresh = refresh
+        self.service = []               # seconds inside click and answer reruns
+        self.timer_service = []         # seconds inside live-view timer reruns
+        self.waits = []                 # seconds queued for the run lock
+        self.games = 0
+        self.answers = 0
+        self.errors = 0
+        self.app = None
+
+    def _run(self, action=None, timer=False):
+        queued = time.perf_counter()
+        with _run_lock:
+            start = time.perf_counter()
+            (action or self.app.run)()
+            finished = time.perf_counter()
+        self.waits.append(start - queued)
+        (self.timer_service if timer else self.service).append(finished - start)
+
+    def _button(self, text):
+        for button in self.app.button:
+            if text in button.label:
+                return button
+        return None
+
+    def _think(self, deadline):
+        """Wait out the think time, rerunning like the live-view timer"""
+        wake = time.monotonic() + self.rng.expovariate(1.0 / self.think_time)
+        while time.monotonic() < min(wake, deadline):
+            time.sleep(max(0.0, min(self.refresh, wake - time.monotonic())))
+            if self.app.session_state.engine.game_state != "playing":
+                return
+            self._run(timer=True)
+
+    def play(self, deadline):
+        from streamlit.testing.v1 import AppTest
+        self.app = AppTest.from_file(MAIN, default_timeout=120)
+        self._run()
+        while time.monotonic() < deadline:
+            state = self.app.session_state.engine.game_state
+            if state in ("menu", "game_over"):
+                button = self._button("START RACING") or self._button("PLAY AGAIN")
+                if button is None:
+                    self.errors += 1
+                    return
+                self._run(button.click().run)
+                self.games += 1
+                continue
+            self._think(deadline)
+            engine = self.app.session_state.engine
+            if engine.game_state != "playing" or time.monotonic() >= deadline:
+                continue
+            question = engine.qm.current_question
+            answer = question["a"] if self.rng.random() < self.accuracy else "pass"
+            submit = self._button("SUBMIT")
+            if submit is None or not self.app.text_area:
+                self._run()
+                continue
+            self.app.text_area[0].input(answer)
+            self._run(submit.click().run)
+            self.answers += 1
+
+    def state_bytes(self):
+        from memory_report import deep_sizeof
+        return deep_sizeof(self.app.session_state.to_dict()) if self.app else 0
+
+
+def _milliseconds(values):
+    return {name: round(percentile(values, p) * 1000, 2) for name, p in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))}
+
+
+def run_step(players, duration, accuracy, think_time, refresh, seed):
+    """Run ``players`` concurrent sessions for ``duration`` seconds"""
+    sims = [SimulatedPlayer(seed * 1000 + i, accuracy, think_time, refresh) for i in range(players)]
+    deadline = time.monotonic() + duration
+    errors = []
+
+    def worker(sim):
+        try:
+            sim.play(deadline)
+        except Exception as exc:        # report, don't hang the step
+            errors.append(repr(exc))
+
+    threads = [threading.Thread(target=worker, args=(sim,), daemon=True) for sim in sims]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    service = [value for sim in sims for value in sim.service]
+    timer = [value for sim in sims for value in sim.timer_service]
+    live = [sim for sim in sims if sim.app is not None]
+    return {
+        "players": players,
+        "action_reruns": len(service),
+        "timer_reruns": len(timer),
+        "action_rerun_ms": _milliseconds(service),
+        "timer_rerun_ms": _milliseconds(timer),
+        "queued_ms": _milliseconds([value for sim in sims for value in sim.waits]),
+        "games_started": sum(sim.games for sim in sims),
+        "answers": sum(sim.answers for sim in sims),
+        "state_bytes_per_session": round(sum(sim.state_bytes() for sim in live) / len(live)) if live else 0,
+        "errors": errors[:5],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ramp simulated players against the app")
+    parser.add_argument("--players", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="players per step")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per step")
+    parser.add_argument("--accuracy", type=float, default=0.7)
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds per answer")
+    parser.add_argument("--refresh", type=float, default=None,
+                        help="seconds between timer reruns (default: main.TRACK_REFRESH_SECONDS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the report here")
+    args = parser.parse_args(argv)
+
+    # Keep the load test's scores, snapshots, events and ports away from the real ones
+    scratch = tempfile.mkdtemp(prefix="coderacer-load-")
+    os.environ.setdefault("CODERACER_DB", os.path.join(scratch, "scores.db"))
+    os.environ.setdefault("CODERACER_SESSIONS", "local")
+    os.environ.setdefault("CODERACER_EVENTS", os.path.join(scratch, "events"))
+    os.environ.setdefault("CODERACER_METRICS_PORT", "0")
+    refresh = args.refresh
+    if refresh is None:
+        from main import TRACK_REFRESH_SECONDS
+        refresh = TRACK_REFRESH_SECONDS
+
+    steps = []
+    for players in args.players:
+        steps.append(run_step(players, args.duration, args.accuracy, args.think_time, refresh, args.seed))
+    report = {
+        "duration_per_step_s": args.duration,
+        "think_time_s": args.think_time,
+        "accuracy": args.accuracy,
+        "refresh_s": refresh,
+        "steps": steps,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
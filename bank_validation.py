@@ -0,0 +1,126 @@
+"""
+Startup validation of the question bank's reference answers.
+
+Every code question's reference answer is wrapped in its def line and
+graded against the question's own test cases by a SandboxPool, with the
+same time and resource limits as a player's submission; text questions
+just need a prompt and an answer.  Broken questions are reported on
+stderr and, by default, left out of the bank:
+
+    CODERACER_VALIDATE=quarantine | report | off     (default quarantine)
+    python bank_validation.py [questions.json] --workers 4
+"""
+
+import os
+import sys
+from types import MappingProxyType
+
+from canonical import canonical_hash
+from grader import SandboxPool, Verdict, parse_signature
+
+MODES = ("quarantine", "report", "off")
+
+
+class Reference:
+    """A validated reference answer, hashed once for the grader's fast path"""
+    __slots__ = ("name", "hash")
+
+    def __init__(self, name, hash):
+        self.name = name
+        self.hash = hash
+
+
+def check_question(question, pool):
+    """(status, detail) for one question; code runs in ``pool``"""
+    if not str(question.get("q", "")).strip() or not str(question.get("a", "")).strip():
+        return Verdict.ERROR, "Missing prompt or answer"
+    if not question.get("tests"):
+        return Verdict.PASSED, "Text answer"
+    if parse_signature(question["q"])[0] is None:
+        return Verdict.ERROR, "Prompt has no def line for its tests"
+    verdict = pool.grade(question, question["a"])
+    return verdict.status, verdict.detail
+
+
+class ValidationReport:
+    """Per-question outcome of a validation run"""
+    def __init__(self):
+        self.checked = 0
+        self.broken = {}            # id -> "status: detail"
+        self.references = {}        # id -> Reference
+
+    def add(self, question, status, detail):
+        self.checked += 1
+        if status != Verdict.PASSED:
+            self.broken[question["id"]] = f"{status}: {detail}"
+        elif question.get("tests"):
+            name, _ = parse_signature(question["q"])
+            self.references[question["id"]] = Reference(name, canonical_hash(question["a"]))
+
+    def summary(self):
+        lines = [f"Validated {self.checked} questions, {len(self.broken)} broken"]
+        lines.extend(f"  {qid}: {problem}" for qid, problem in sorted(self.broken.items()))
+        return "\n".join(lines)
+
+
+def validate(questions, workers=None):
+    """Check every question; code questions run on ``workers`` sandbox processes"""
+    questions = list(questions)
+    report = ValidationReport()
+    code = [q for q in questions if q.get("tests")]
+    for question in questions:
+        if not question.get("tests"):
+            report.add(question, *check_question(question, None))
+    if not code:
+        return report
+    size = max(1, min(workers or os.cpu_count() or 1, len(code)))
+    # One job per thread: nothing ever waits in the pool's queue
+    pool = SandboxPool.from_env(size=size, queue_depth=0)
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=size) as threads:
+            for question, outcome in zip(code, threads.map(lambda q: check_question(q, pool), code)):
+                report.add(question, *outcome)
+    finally:
+        pool.close()
+    return report
+
+
+def validation_mode():
+    """CODERACER_VALIDATE, with its spellings of "off" folded together"""
+    mode = os.environ.get("CODERACER_VALIDATE", "quarantine").lower()
+    return "off" if mode in ("off", "0", "false") else mode
+
+
+def validated(questions):
+    """(questions to keep, references) per CODERACER_VALIDATE"""
+    mode = validation_mode()
+    if mode == "off":
+        return questions, MappingProxyType({})
+    workers = int(os.environ.get("CODERACER_VALIDATE_WORKERS", 0)) or None
+    report = validate(questions, workers=workers)
+    if report.broken:
+        print(report.summary(), file=sys.stderr)
+        if mode != "report":
+            questions = [q for q in questions if q["id"] not in report.broken]
+    return questions, MappingProxyType(report.references)
+
+
+def main(argv=None):
+    import argparse
+    from question_bank import QUESTIONS_FILE, embedded_questions, file_questions
+    parser = argparse.ArgumentParser(description="Check every reference answer against its tests")
+    parser.add_argument("questions", nargs="?", default=QUESTIONS_FILE, help="questions.json to check")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--no-embedded", action="store_true", help="skip the built-in code questions")
+    args = parser.parse_args(argv)
+
+    questions = [] if args.no_embedded else list(embedded_questions())
+    questions.extend(file_questions(args.questions))
+    report = validate(questions, workers=args.workers)
+    print(report.summary())
+    sys.exit(1 if report.broken else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Offline grading of classroom submission sets.
+
+Submissions are (student, question id, code) records, read from a JSONL
+file or from a directory holding JSONL files and/or one file per answer
+at <student>/<file name>.py (.c, .cpp).  Each record is graded exactly
+as QuestionManager.check_answer grades it in the game, against the same
+question bank, but identical submissions to a question (same canonical
+form for Python) are run once.  Python code runs in a SandboxPool of
+--workers resource-limited processes; results are written as each run
+finishes, then throughput and pass rates are printed on stderr:
+
+    python batch_grade.py submissions.jsonl --workers 4 --output results.csv
+    python batch_grade.py class-5b/ --output results.jsonl
+
+Question ids are "<topic>_<difficulty>:<n>" for the built-in questions
+(e.g. "arrays_easy:1") and "json/<difficulty>/<topic>:<n>" for those from
+questions.json (e.g. "json/easy/arrays:0").  JSONL records carry the id as
+is, with an optional "language" ("Python", "C" or "C++"):
+
+    {"student": "ada", "question": "arrays_easy:1", "code": "return sorted(arr)[-2]"}
+
+Answer files name the id percent-encoded so it is one portable file name
+(question_filename() / question_id()), e.g. ada/json%2Feasy%2Farrays%3A0.py;
+`python batch_grade.py --list-files` prints every id with its file name.
+"""
+
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from urllib.parse import quote, unquote
+
+from canonical import canonical_hash
+from engine import QuestionManager
+from grader import SandboxPool, Verdict
+from question_bank import LANGUAGES, get_bank
+
+Submission = namedtuple("Submission", "student question code language")
+
+SUFFIXES = {".py": "Python", ".c": "C", ".cpp": "C++"}
+FIELDS = ("student", "question", "language", "status", "passed", "detail", "duplicate")
+
+
+# ===========================
+# INPUT
+# ===========================
+
+def question_filename(question_id, language="Python"):
+    """File name of an answer to ``question_id``: the id percent-encoded"""
+    suffix = next(suffix for suffix, name in SUFFIXES.items() if name == language)
+    return quote(question_id, safe="") + suffix
+
+
+def question_id(filename):
+    """Inverse of question_filename (the suffix is dropped)"""
+    return unquote(os.path.splitext(os.path.basename(filename))[0])
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield Submission(str(record["student"]), str(record["question"]),
+                                 record["code"], record.get("language", "Python"))
+            except (ValueError, KeyError, TypeError) as exc:
+                print(f"{path}:{number}: skipped ({type(exc).__name__}: {exc})", file=sys.stderr)
+
+
+def read_submissions(path):
+    """Yield Submissions from a JSONL file or a directory of them"""
+    if not os.path.isdir(path):
+        yield from read_jsonl(path)
+        return
+    for name in sorted(glob.glob(os.path.join(path, "**", "*.jsonl"), recursive=True)):
+        yield from read_jsonl(name)
+    for name in sorted(glob.glob(os.path.join(path, "*", "*"))):
+        suffix = os.path.splitext(name)[1]
+        if suffix in SUFFIXES:
+            with open(name, encoding="utf-8") as f:
+                code = f.read()
+            yield Submission(os.path.basename(os.path.dirname(name)), question_id(name), code, SUFFIXES[suffix])
+
+
+def dedupe_key(submission):
+    """Submissions with equal keys get the same verdict"""
+    if submission.language == "Python":
+        answer = canonical_hash(submission.code)
+        if answer is not None:
+            return submission.question, submission.language, answer
+    return submission.question, submission.language, str(submission.code).strip()
+
+
+# ===========================
+# GRADING
+# ===========================
+
+class BatchGrader:
+    """Grades unique submissions on a thread per sandbox worker"""
+    def __init__(self, bank=None, workers=None, timeout=2.0):
+        self.bank = bank if bank is not None else get_bank()
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._python = None
+        self._toolchain = None
+        self._native = {}
+        self._lock = threading.Lock()
+
+    def grader_for(self, language):
+        with self._lock:
+            if language == "Python":
+                if self._python is None:
+                    # One job per thread: nothing ever waits in the pool's queue
+                    self._python = SandboxPool(size=self.workers, queue_depth=0, timeout=self.timeout)
+                return self._python
+            if language not in self._native:
+                from native_grader import NativeGrader, NativeToolchain
+                if self._toolchain is None:
+                    self._toolchain = NativeToolchain.from_env()
+                self._native[language] = NativeGrader(self._toolchain, language)
+            return self._native[language]
+
+    def grade(self, submission):
+        """Verdict for one submission, as the game would give it"""
+        question = self.bank.get(submission.question)
+        if question is None:
+            return Verdict(Verdict.ERROR, f"Unknown question '{submission.question}'")
+        if submission.language not in LANGUAGES:
+            return Verdict(Verdict.ERROR, f"Unsupported language '{submission.language}'")
+        qm = QuestionManager(self.bank)
+        qm.current_question = question
+        grader = self.grader_for(submission.language) if question.get("tests") else None
+        passed = qm.check_answer(submission.code, grader)
+        if qm.last_verdict is not None:
+            return qm.last_verdict
+        return Verdict(Verdict.PASSED if passed else Verdict.FAILED, "Text answer")
+
+    def close(self):
+        if self._python is not None:
+            self._python.close()
+
+
+class Results:
+    """Writes result rows as they come and keeps the tallies"""
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.csv = csv.writer(stream) if fmt == "csv" else None
+        if self.csv is not None:
+            self.csv.writerow(FIELDS)
+        self.rows = 0
+        self.attempts = Counter()
+        self.passes = Counter()
+        self.statuses = Counter()
+
+    def write(self, submission, verdict, duplicate):
+        row = (submission.student, submission.question, submission.language,
+               verdict.status, verdict.passed, verdict.detail, duplicate)
+        if self.csv is not None:
+            self.csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(dict(zip(FIELDS, row))) + "\n")
+        self.rows += 1
+        self.attempts[submission.question] += 1
+        self.passes[submission.question] += verdict.passed
+        self.statuses[verdict.status] += 1
+
+
+def grade_all(submissions, results, grader):
+    """Grade each distinct submission once; returns how many were run"""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    groups = {}
+    for submission in submissions:
+        groups.setdefault(dedupe_key(submission), []).append(submission)
+    with ThreadPoolExecutor(max_workers=grader.workers) as pool:
+        futures = {pool.submit(grader.grade, group[0]): group for group in groups.values()}
+        for future in as_completed(futures):
+            verdict = future.result()
+            for index, submission in enumerate(futures[future]):
+                results.write(submission, verdict, index > 0)
+            results.stream.flush()
+    return len(groups)
+
+
+def summary(results, unique, seconds):
+    lines = [
+        f"Graded {results.rows} submissions ({unique} distinct) in {seconds:.2f}s: "
+        f"{results.rows / max(seconds, 1e-9):.1f} submissions/s, {unique / max(seconds, 1e-9):.1f} runs/s",
+        "  " + ", ".join(f"{status} {count}" for status, count in results.statuses.most_common()),
+        "Pass rate by question:",
+    ]
+    for question, attempts in sorted(results.attempts.items()):
+        passed = results.passes[question]
+        lines.append(f"  {question:24s} {passed:5d}/{attempts:<5d} {passed / attempts:6.1%}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Grade a set of submissions against the question bank")
+    parser.add_argument("submissions", nargs="?",
+                        help="JSONL file, or a directory of JSONL files and <student>/<file name>.py answers")
+    parser.add_argument("--list-files", action="store_true", help="print each question id and its answer file name")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="sandbox processes")
+    parser.add_argument("--timeout", type=float, default=2.0, help="seconds per Python submission")
+    parser.add_argument("--output", default="-", help="results file (.csv or .jsonl); - for stdout")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the output's extension, else jsonl")
+    args = parser.parse_args(argv)
+    if args.list_files:
+        for qid in get_bank().questions:
+            print(f"{qid}\t{question_filename(qid)}")
+        return
+    if args.submissions is None:
+        parser.error("the submissions path is required")
+
+    fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    stream = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    grader = BatchGrader(workers=args.workers, timeout=args.timeout)
+    try:
+        results = Results(stream, fmt)
+        started = time.perf_counter()
+        unique = grade_all(read_submissions(args.submissions), results, grader)
+        elapsed = time.perf_counter() - started
+    finally:
+        grader.close()
+        if stream is not sys.stdout:
+            stream.close()
+    print(summary(results, unique, elapsed), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Microbenchmarks for the per-rerun hot path.
+
+    python benchmarks/bench_hot_path.py                   # compare to baseline
+    python benchmarks/bench_hot_path.py --update-baseline
+    python benchmarks/bench_hot_path.py --threshold 0.10 --runs 5 --output results.json
+
+Each measurement is the best per-call time over several repeats (timeit,
+with garbage collection off); a benchmark reports the median of --runs
+measurements, so one noisy run neither trips the gate nor skews the
+baseline.  A benchmark regresses when it is slower than the baseline by
+more than the threshold (a fraction) in two consecutive sets of runs; the
+script then exits with status 1.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine import GameEngine, QuestionManager  # noqa: E402
+from question_bank import get_bank  # noqa: E402
+from track import track_payload  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def measure(func, repeat=7):
+    """Best seconds per call; each repeat runs long enough to time reliably"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+# ===========================
+# BENCHMARKS
+# ===========================
+
+def bench_update_game():
+    now = [0.0]
+    engine = GameEngine(clock=lambda: now[0], rng=random.Random(1))
+    engine.start_game()
+
+    def step():
+        now[0] += 0.001
+        engine.update_game()
+        if engine.game_state != "playing":
+            now[0] = 0.0
+            engine.start_game()
+    return measure(step)
+
+
+def bench_render_track():
+    positions = [(d, d / 40.0, d % 3, (d + 1) % 3) for d in range(0, 101)]
+    index = [0]
+
+    def render():
+        dist, eta, obstacle, car = positions[index[0] % len(positions)]
+        index[0] += 1
+        track_payload(dist, eta, obstacle, car)
+    return measure(render)
+
+
+def bench_prepare_questions():
+    qm = QuestionManager(get_bank())
+    rng = random.Random(2)
+    return measure(lambda: qm.prepare_questions("Easy", "Mixed", "Python", rng=rng))
+
+
+def bench_check_answer():
+    qm = QuestionManager(get_bank())
+    qm.current_question = get_bank().get("arrays_easy:1")
+    answers = ["return sorted(arr)[-2]", "return (sorted(arr))[-2]", "return max(arr)"]
+    index = [0]
+
+    def check():
+        qm.check_answer(answers[index[0] % len(answers)])
+        index[0] += 1
+    return measure(check)
+
+
+def bench_rerun_cycle():
+    """Full menu -> playing -> game_over cycle through Streamlit's AppTest"""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None
+
+    def cycle():
+        at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=30)
+        at.run()                                    # menu
+        at.button[0].click().run()                  # playing
+        engine = at.session_state.engine
+        engine.lives.size = 1
+        engine.obstacle_lane = engine.car_lane
+        engine.obstacle_spawn_time -= 60            # next rerun crashes
+        at.run()                                    # game_over
+        assert at.session_state.engine.game_state == "game_over"
+        at.run()
+    return measure(cycle, repeat=3)
+
+
+BENCHMARKS = {
+    "update_game": bench_update_game,
+    "render_racing_track": bench_render_track,
+    "prepare_questions": bench_prepare_questions,
+    "check_answer": bench_check_answer,
+    "rerun_cycle": bench_rerun_cycle,
+}
+
+
+# ===========================
+# REPORTING
+# ===========================
+
+def run(selected, runs=3):
+    """Median of ``runs`` measurements per benchmark"""
+    results = {}
+    for name in selected:
+        samples = [BENCHMARKS[name]() for _ in range(runs)]
+        if None not in samples:
+            results[name] = statistics.median(samples)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return [(name, baseline, current, ratio)] for regressed benchmarks"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and current > previous * (1 + threshold):
+            regressions.append((name, previous, current, current / previous))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the per-rerun hot path")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--runs", type=int, default=3, help="measurements per benchmark; the median counts")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    args = parser.parse_args(argv)
+
+    results = run(args.only, max(args.runs, 1))
+    report = {
+        "python": sys.version.split()[0],
+        "unit": "seconds per call",
+        "runs": max(args.runs, 1),
+        "results": results,
+    }
+    for name, seconds in results.items():
+        print(f"{name:22s} {seconds * 1e6:12.2f} us")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --update-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        # Confirm before failing: a regression must show up in a second set of runs too
+        retried = run([name for name, _, _, _ in regressions], max(args.runs, 1))
+        regressions = compare({name: min(seconds, results[name]) for name, seconds in retried.items()},
+                              baseline, args.threshold)
+    for name, previous, current, ratio in regressions:
+        print(f"REGRESSION {name}: {previous * 1e6:.2f} us -> {current * 1e6:.2f} us ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Cold-start report: time to first render and where import time goes.
+
+    python benchmarks/startup_report.py                   # compare to baseline
+    python benchmarks/startup_report.py --update-baseline
+    python benchmarks/startup_report.py --top 15 --output startup.json
+
+Each sample is a fresh interpreter run under ``python -X importtime`` that
+imports streamlit (the server has it loaded before any session connects)
+and then renders the menu once through AppTest.  Samples run with an empty
+bank cache ("cold") and with the cache written by the previous sample
+("warm"); the best of --repeat samples is reported.  A timing regresses
+when it is slower than the baseline by more than the threshold.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+APP_MODULES = frozenset(name[:-3] for name in os.listdir(ROOT) if name.endswith(".py"))
+
+SAMPLE = """
+import json, sys, time
+start = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+done = time.perf_counter()
+assert not at.exception, at.exception
+print(json.dumps({"streamlit_import": imported - start, "first_render": done - imported}))
+"""
+
+
+def parse_importtime(text):
+    """{module: (self us, cumulative us)} from -X importtime output"""
+    modules = {}
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative))
+    return modules
+
+
+def sample(cache_path, scratch):
+    env = dict(os.environ)
+    env.update({
+        "CODERACER_BANK_CACHE": cache_path,
+        "CODERACER_DB": os.path.join(scratch, "scores.db"),
+        "CODERACER_SESSIONS": "local",
+        "CODERACER_METRICS_PORT": "0",
+        "PYTHONPATH": ROOT,
+    })
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SAMPLE, os.path.join(ROOT, "main.py")],
+        capture_output=True, text=True, env=env, cwd=ROOT, check=True,
+    )
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(proc.stderr)
+
+
+def run(repeat):
+    """Best cold and warm samples plus the warm import breakdown"""
+    results = {}
+    imports = {}
+    with tempfile.TemporaryDirectory(prefix="coderacer-startup-") as scratch:
+        cache_path = os.path.join(scratch, "bank.marshal")
+        for _ in range(repeat):
+            for phase in ("cold", "warm"):
+                if phase == "cold" and os.path.exists(cache_path):
+                    os.remove(cache_path)
+                timings, modules = sample(cache_path, scratch)
+                for name, seconds in timings.items():
+                    key = f"{name}_{phase}"
+                    results[key] = min(results.get(key, seconds), seconds)
+                if phase == "warm":
+                    imports = modules
+    results["streamlit_import"] = min(results.pop("streamlit_import_cold"), results.pop("streamlit_import_warm"))
+    return results, imports
+
+
+def compare(results, baseline, threshold):
+    """Return [(name, baseline, current, ratio)] for regressed timings"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and current > previous * (1 + threshold):
+            regressions.append((name, previous, current, current / previous))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report time to first render and import costs")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--output", help="write the report JSON here")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results, imports = run(args.repeat)
+    app = {name: cumulative for name, (_, cumulative) in imports.items() if name in APP_MODULES}
+    slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    report = {
+        "python": sys.version.split()[0],
+        "unit": "seconds",
+        "results": results,
+        "app_imports_us": dict(sorted(app.items(), key=lambda item: item[1], reverse=True)),
+        "slowest_imports_self_us": {name: self_us for name, (self_us, _) in slowest},
+    }
+    for name, seconds in results.items():
+        print(f"{name:22s} {seconds * 1e3:10.1f} ms")
+    print("app module imports (cumulative):")
+    for name, cumulative in report["app_imports_us"].items():
+        print(f"  {name:20s} {cumulative / 1e3:8.1f} ms")
+    print("slowest imports (self):")
+    for name, self_us in report["slowest_imports_self_us"].items():
+        print(f"  {name:40s} {self_us / 1e3:8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({key: report[key] for key in ("python", "unit", "results")}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --update-baseline")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.threshold)
+    for name, previous, current, ratio in regressions:
+        print(f"REGRESSION {name}: {previous * 1e3:.1f} ms -> {current * 1e3:.1f} ms ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
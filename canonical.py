@@ -0,0 +1,133 @@
+"""
+Canonical forms for Python answers and a memoized verdict cache.
+
+Two answers that differ only in formatting, redundant parentheses, quote
+style or the order of operands of a commutative operator canonicalize to
+the same source text, and therefore the same hash.
+"""
+
+import ast
+import hashlib
+import textwrap
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+
+# Builtins with no side effects; calls to them may be reordered
+PURE_CALLS = frozenset({"abs", "len", "max", "min", "sorted", "sum", "str", "int", "list", "set"})
+
+COMMUTATIVE_COMPARE = (ast.Eq, ast.NotEq, ast.Is, ast.IsNot)
+
+
+def _is_pure(node):
+    """Expression whose evaluation order cannot matter"""
+    if isinstance(node, (ast.Name, ast.Constant)):
+        return True
+    if isinstance(node, ast.Attribute):
+        return _is_pure(node.value)
+    if isinstance(node, ast.Subscript):
+        return _is_pure(node.value) and _is_pure(node.slice)
+    if isinstance(node, ast.Slice):
+        return all(part is None or _is_pure(part) for part in (node.lower, node.upper, node.step))
+    if isinstance(node, ast.UnaryOp):
+        return _is_pure(node.operand)
+    if isinstance(node, ast.BinOp):
+        return _is_pure(node.left) and _is_pure(node.right)
+    if isinstance(node, ast.Call):
+        return (isinstance(node.func, ast.Name) and node.func.id in PURE_CALLS
+                and not node.keywords and all(_is_pure(a) for a in node.args))
+    return False
+
+
+def _is_number(node):
+    return (isinstance(node, ast.Constant) and isinstance(node.value, (int, float))
+            and not isinstance(node.value, bool))
+
+
+def _order(left, right):
+    """Return the operands in a stable order"""
+    if ast.dump(right) < ast.dump(left):
+        return right, left
+    return left, right
+
+
+class _Canonicalizer(ast.NodeTransformer):
+    """Rewrite commutative operations into a sorted operand order"""
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if (len(node.ops) == 1 and isinstance(node.ops[0], COMMUTATIVE_COMPARE)
+                and _is_pure(node.left) and _is_pure(node.comparators[0])):
+            node.left, node.comparators[0] = _order(node.left, node.comparators[0])
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        # n * 2 == 2 * n for numbers, lists and strings alike
+        if (isinstance(node.op, (ast.Add, ast.Mult))
+                and (_is_number(node.left) or _is_number(node.right))
+                and _is_pure(node.left) and _is_pure(node.right)):
+            node.left, node.right = _order(node.left, node.right)
+        return node
+
+
+@lru_cache(maxsize=4096)
+def canonicalize(code):
+    """Canonical source of a function-body answer, or None if not Python"""
+    body = textwrap.dedent(str(code)).strip()
+    if not body:
+        return None
+    try:
+        tree = ast.parse("def _answer():\n" + textwrap.indent(body, "    "))
+    except SyntaxError:
+        return None
+    func = tree.body[0]
+    module = ast.Module(body=func.body, type_ignores=[])
+    module = ast.fix_missing_locations(_Canonicalizer().visit(module))
+    return ast.unparse(module)
+
+
+def canonical_hash(code):
+    """Short stable hash of an answer's canonical form (None if not Python)"""
+    canonical = canonicalize(code)
+    if canonical is None:
+        return None
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+class VerdictCache:
+    """Bounded LRU of grading verdicts keyed by (question id, canonical hash)"""
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return verdict
+
+    def put(self, key, verdict):
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
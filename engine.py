@@ -0,0 +1,565 @@
+"""
+Headless game engine for the DSA Racing Simulator.
+
+All game rules live here as plain Python with an injected clock and a
+seeded RNG; main.py is a thin Streamlit adapter over GameEngine, and
+simulate.py plays scripted games in bulk.
+"""
+
+import heapq
+import random
+import time
+from array import array
+
+import event_log
+from canonical import canonical_hash, canonicalize
+from grader import Verdict
+from metrics import CRASHES, QUESTIONS_SERVED, TIMEOUTS, VERDICTS
+from question_bank import get_bank
+from scheduler import QuestionScheduler
+
+# ===========================
+# DATA STRUCTURES
+# ===========================
+
+class LifeNode:
+    """Linked list node for lives"""
+    __slots__ = ("next",)
+    
+    def __init__(self):
+        self.next = None
+
+class LivesLinkedList:
+    """Dynamic life management"""
+    __slots__ = ("head", "tail", "size")
+    
+    def __init__(self, initial=3):
+        self.head = None
+        self.tail = None
+        self.size = 0
+        for _ in range(initial):
+            self.add_life()
+    
+    def add_life(self):
+        """Append at the tail in O(1)"""
+        node = LifeNode()
+        if not self.head:
+            self.head = node
+        else:
+            self.tail.next = node
+        self.tail = node
+        self.size += 1
+    
+    def remove_life(self):
+        if self.head:
+            self.head = self.head.next
+            if self.head is None:
+                self.tail = None
+            self.size -= 1
+            return True
+        return False
+    
+    def get_count(self):
+        return self.size
+    
+    def has_lives(self):
+        return self.size > 0
+
+
+class ScoreTimeline:
+    """Ring buffer of the last answers' (time, score, streak, lane) samples"""
+    __slots__ = ("times", "scores", "streaks", "lanes", "head", "count", "started",
+                 "base_time", "base_score", "window_correct", "max_streak")
+    
+    def __init__(self, capacity=32):
+        self.times = array("f", [0.0]) * capacity      # seconds since the race started
+        self.scores = array("i", [0]) * capacity
+        self.streaks = array("H", [0]) * capacity      # 0 after a wrong answer
+        self.lanes = array("B", [0]) * capacity
+        self.reset()
+    
+    def reset(self, now=0.0):
+        self.head = 0
+        self.count = 0
+        self.started = now
+        self.base_time = 0.0        # last sample before the window, for the rolling rate
+        self.base_score = 0
+        self.window_correct = 0
+        self.max_streak = 0
+    
+    def push(self, now, score, streak, lane):
+        """O(1); the oldest sample is overwritten once full"""
+        i = self.head
+        if self.count == len(self.scores):
+            self.base_time = self.times[i]
+            self.base_score = self.scores[i]
+            self.window_correct -= self.streaks[i] > 0
+        else:
+            self.count += 1
+        self.times[i] = now - self.started
+        self.scores[i] = score
+        self.streaks[i] = min(streak, 0xFFFF)
+        self.lanes[i] = lane
+        self.window_correct += streak > 0
+        self.max_streak = max(self.max_streak, streak)
+        self.head = (i + 1) % len(self.scores)
+    
+    def peek(self):
+        return self.scores[self.head - 1] if self.count else 0
+    
+    def accuracy(self):
+        """Share of correct answers among the buffered ones"""
+        return self.window_correct / self.count if self.count else 0.0
+    
+    def points_per_minute(self):
+        """Scoring rate across the buffered answers"""
+        if not self.count:
+            return 0.0
+        seconds = self.times[self.head - 1] - self.base_time
+        return (self.scores[self.head - 1] - self.base_score) * 60 / seconds if seconds > 0 else 0.0
+    
+    def samples(self):
+        """Buffered (time, score, streak, lane) tuples, oldest first"""
+        size = len(self.scores)
+        for k in range(self.head - self.count, self.head):
+            i = k % size
+            yield self.times[i], self.scores[i], self.streaks[i], self.lanes[i]
+    
+    def chart(self, points=16):
+        """At most ``points`` (time, score) pairs spread over the window"""
+        if not self.count:
+            return []
+        size = len(self.scores)
+        first = self.head - self.count
+        n = min(points, self.count)
+        picks = [(self.count * (k + 1)) // n - 1 for k in range(n)]     # last sample of each of n spans
+        series = [(self.base_time, self.base_score)]
+        series.extend((self.times[(first + k) % size], self.scores[(first + k) % size]) for k in picks)
+        return series
+
+
+class Leaderboard:
+    """Min heap of this session's best scores"""
+    __slots__ = ("heap", "high_score", "capacity")
+    
+    def __init__(self, capacity=10):
+        self.heap = []
+        self.high_score = 0
+        self.capacity = capacity
+    
+    def add_score(self, score):
+        if len(self.heap) < self.capacity:
+            heapq.heappush(self.heap, score)
+        elif score > self.heap[0]:
+            heapq.heapreplace(self.heap, score)
+        if score > self.high_score:
+            self.high_score = score
+            return True
+        return False
+
+
+# ===========================
+# QUESTION MANAGER
+# ===========================
+
+class QuestionManager:
+    """Serves rounds from the shared question bank via the player's scheduler"""
+    __slots__ = ("bank", "scheduler", "remaining", "current_question", "answered", "last_verdict")
+    
+    def __init__(self, bank=None):
+        self.bank = bank if bank is not None else get_bank()
+        self.scheduler = QuestionScheduler()
+        self.remaining = 0
+        self.current_question = None
+        self.answered = False
+        self.last_verdict = None
+    
+    def prepare_questions(self, difficulty, mode, language="Python", rng=random, k=15):
+        """Start a round of k questions from the difficulty/mode bucket"""
+        self._release_current()
+        self.remaining = 0
+        topic = None
+        
+        if mode != "Mixed":
+            # Topic-wise
+            topics = self.bank.topics(difficulty, language)
+            if not topics:
+                return
+            topic = rng.choice(topics)
+        
+        bucket = self.bank.bucket(difficulty, topic, language)
+        self.scheduler.use_bucket((difficulty, topic, language), bucket, rng)
+        self.remaining = min(k, len(bucket))
+    
+    def get_next_question(self):
+        """Ask the scheduler for the next question of the round"""
+        self._release_current()
+        if self.remaining > 0:
+            self.remaining -= 1
+            self.current_question = self.scheduler.next_question()
+        self.answered = False
+        return self.current_question
+    
+    def _release_current(self):
+        if self.current_question is not None and not self.answered:
+            # Never answered before the obstacle arrived or the round ended
+            self.scheduler.record(self.current_question, False, None)
+        self.current_question = None
+    
+    def record_answer(self, correct, elapsed):
+        """Feed the first answer to each question back to the scheduler"""
+        if self.current_question is not None and not self.answered:
+            self.answered = True
+            self.scheduler.record(self.current_question, correct, elapsed)
+    
+    def check_answer(self, user_answer, grader=None, verdict_cache=None):
+        """Validate answer by running it, or by text for non-code questions"""
+        self.last_verdict = None
+        question = self.current_question
+        if not question:
+            return False
+        correct, self.last_verdict = self.grade(question, user_answer, grader, verdict_cache)
+        return correct
+    
+    def grade(self, question, user_answer, grader=None, verdict_cache=None):
+        """(correct, verdict or None) for an answer; touches no round state,
+        so it can run off the thread that owns the engine"""
+        if grader is not None and question.get('tests'):
+            if grader.language != "Python":
+                verdict = grader.grade(question, user_answer)
+            else:
+                verdict = self._grade_python(question, user_answer, grader, verdict_cache)
+            return verdict.passed, verdict
+        canonical = canonicalize(user_answer)
+        if canonical is not None and canonical == canonicalize(question['a']):
+            return True, None
+        correct = str(question['a']).strip().lower().replace(" ", "")
+        user = str(user_answer).strip().lower().replace(" ", "")
+        return correct == user, None
+
+    def _grade_python(self, question, user_answer, grader, verdict_cache):
+        """Reference matches and repeat answers skip the sandbox"""
+        answer_hash = canonical_hash(user_answer)
+        if answer_hash is None:
+            return grader.grade(question, user_answer)
+        reference = self.bank.references.get(question['id'])
+        reference_hash = reference.hash if reference is not None else canonical_hash(question['a'])
+        if answer_hash == reference_hash:
+            return Verdict(Verdict.PASSED, "Matches the reference answer")
+        key = (question['id'], answer_hash)
+        if verdict_cache is not None:
+            cached = verdict_cache.get(key)
+            if cached is not None:
+                return cached
+        verdict = grader.grade(question, user_answer)
+        # Busy/timeout depend on load, not on the answer
+        if verdict_cache is not None and verdict.status in (Verdict.PASSED, Verdict.FAILED, Verdict.ERROR):
+            verdict_cache.put(key, verdict)
+        return verdict
+
+
+# ===========================
+# GAME ENGINE
+# ===========================
+
+OBSTACLE_START_DISTANCE = 100
+OBSTACLE_TICK_SECONDS = 0.1     # obstacle_speed is distance units per tick
+METERS_PER_UNIT = 0.1
+LANES = ("left", "center", "right")
+
+
+class GameRules:
+    """Tunable scoring and pacing constants"""
+    def __init__(self, initial_lives=3, round_size=15, base_points=20,
+                 time_bonuses=((30, 10), (60, 5)), bonus_life_streak=3,
+                 speed_range=(3, 7), time_limits=None):
+        self.initial_lives = initial_lives
+        self.round_size = round_size
+        self.base_points = base_points
+        # (answered within seconds, bonus points), fastest first
+        self.time_bonuses = tuple(tuple(pair) for pair in time_bonuses)
+        self.bonus_life_streak = bonus_life_streak
+        self.speed_range = tuple(speed_range)
+        self.time_limits = dict(time_limits or {"Very Easy": 300, "Easy": 600, "Medium": 900, "Hard": 1200})
+
+    def time_bonus(self, elapsed):
+        for within, bonus in self.time_bonuses:
+            if elapsed < within:
+                return bonus
+        return 0
+
+    def as_dict(self):
+        return {
+            "initial_lives": self.initial_lives,
+            "round_size": self.round_size,
+            "base_points": self.base_points,
+            "time_bonuses": [list(pair) for pair in self.time_bonuses],
+            "bonus_life_streak": self.bonus_life_streak,
+            "speed_range": list(self.speed_range),
+            "time_limits": dict(self.time_limits),
+        }
+
+
+DEFAULT_RULES = GameRules()
+
+
+class GameEngine:
+    """One player's race: menu -> playing -> game_over"""
+    __slots__ = (
+        "clock", "rng", "rules", "game_state", "language", "difficulty", "mode",
+        "games_played", "lives", "score", "streak", "questions_answered",
+        "correct_answers", "distance", "distance_base", "qm", "timeline",
+        "leaderboard", "obstacle_approaching", "obstacle_distance", "obstacle_lane",
+        "car_lane", "obstacle_speed", "obstacle_spawn_time", "question_start_time",
+        "time_limit", "feedback", "feedback_type", "log_id",
+    )
+    
+    def __init__(self, clock=time.monotonic, rng=None, rules=None, bank=None):
+        self.clock = clock
+        # Sessions share the process-wide generator unless given a seeded one
+        self.rng = rng if rng is not None else random
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        
+        self.game_state = "menu"
+        self.language = "Python"
+        self.difficulty = "Easy"
+        self.mode = "Mixed"
+        self.games_played = 0
+        
+        # Game objects
+        self.lives = None
+        self.score = 0
+        self.streak = 0
+        self.questions_answered = 0
+        self.correct_answers = 0
+        self.distance = 0
+        self.distance_base = 0
+        
+        # Managers
+        self.qm = QuestionManager(bank)
+        self.timeline = ScoreTimeline()
+        self.leaderboard = Leaderboard()
+        
+        # Obstacle system
+        self.obstacle_approaching = False
+        self.obstacle_distance = OBSTACLE_START_DISTANCE
+        self.obstacle_lane = "center"
+        self.car_lane = "center"
+        self.obstacle_speed = 5
+        self.obstacle_spawn_time = None
+        
+        # Timer
+        self.question_start_time = None
+        self.time_limit = 300
+        
+        # Feedback
+        self.feedback = ""
+        self.feedback_type = ""
+        
+        # Session key in the event log
+        self.log_id = 0
+    
+    def _log(self, kind, elapsed=None):
+        """Append a game event about the current question"""
+        question = self.qm.current_question
+        event_log.record(kind, self.log_id, question["id"] if question else "", elapsed, self.score,
+                         self.difficulty, self.language, self.lives.get_count() if self.lives else 0)
+    
+    def start_game(self):
+        """Start new game"""
+        self.game_state = "playing"
+        self.games_played += 1
+        self.lives = LivesLinkedList(self.rules.initial_lives)
+        self.score = 0
+        self.streak = 0
+        self.questions_answered = 0
+        self.correct_answers = 0
+        self.distance = 0
+        self.distance_base = 0
+        self.feedback = ""
+        self.feedback_type = ""
+        
+        # Prepare questions
+        self.qm.prepare_questions(self.difficulty, self.mode, self.language,
+                                  rng=self.rng, k=self.rules.round_size)
+        
+        # Load first question
+        now = self.clock()
+        self.timeline.reset(now)
+        self.next_question(now)
+        self.spawn_obstacle(now)
+        self._log(event_log.START)
+    
+    def pause(self):
+        self.game_state = "menu"
+    
+    def next_question(self, now=None):
+        """Load next question"""
+        question = self.qm.get_next_question()
+        if question:
+            QUESTIONS_SERVED.inc(self.difficulty)
+            self.question_start_time = self.clock() if now is None else now
+            self.time_limit = self.rules.time_limits[self.difficulty]
+            return True
+        self.game_state = "game_over"
+        self._log(event_log.GAME_OVER)
+        return False
+    
+    def spawn_obstacle(self, now=None):
+        """Spawn new obstacle"""
+        self.obstacle_approaching = True
+        self.obstacle_distance = OBSTACLE_START_DISTANCE
+        self.obstacle_spawn_time = self.clock() if now is None else now
+        self.obstacle_lane = self.rng.choice(LANES)
+        self.obstacle_speed = self.rng.randint(*self.rules.speed_range)
+    
+    def obstacle_impact_time(self):
+        """Clock time at which the current obstacle reaches the car"""
+        ticks = OBSTACLE_START_DISTANCE / self.obstacle_speed
+        return self.obstacle_spawn_time + ticks * OBSTACLE_TICK_SECONDS
+    
+    def question_deadline(self):
+        """Clock time at which the current question runs out"""
+        if self.question_start_time is None:
+            return None
+        return self.question_start_time + self.time_limit
+    
+    def next_event_time(self):
+        """When update_game next has something to resolve (None when idle)"""
+        if self.game_state != "playing" or not self.obstacle_approaching:
+            return None
+        deadline = self.question_deadline()
+        impact = self.obstacle_impact_time()
+        return impact if deadline is None or impact <= deadline else deadline
+    
+    def obstacle_distance_at(self, now):
+        """Obstacle distance derived from spawn time and speed"""
+        ticks = (now - self.obstacle_spawn_time) / OBSTACLE_TICK_SECONDS
+        return OBSTACLE_START_DISTANCE - self.obstacle_speed * ticks
+    
+    def update_game(self, now=None):
+        """Advance game state to ``now``, however long since the last call"""
+        if self.game_state != "playing":
+            return
+        now = self.clock() if now is None else now
+        
+        # Resolve every impact and deadline that passed since the last update
+        while self.obstacle_approaching:
+            impact = self.obstacle_impact_time()
+            deadline = self.question_start_time + self.time_limit
+            if deadline < impact and deadline <= now:
+                if not self.time_up(deadline):
+                    return
+                continue
+            if impact > now:
+                self.obstacle_distance = self.obstacle_distance_at(now)
+                travelled = OBSTACLE_START_DISTANCE - self.obstacle_distance
+                self.distance = self.distance_base + travelled * METERS_PER_UNIT
+                return
+            
+            self.obstacle_distance = 0
+            self.distance_base += OBSTACLE_START_DISTANCE * METERS_PER_UNIT
+            self.distance = self.distance_base
+            
+            # Check collision
+            if self.obstacle_lane == self.car_lane:
+                self.crash()
+                if not self.lives.has_lives():
+                    self.game_state = "game_over"
+                    self._log(event_log.GAME_OVER)
+                    return
+            
+            # Spawn next obstacle from the moment of impact; an unanswered
+            # question stays up until its own deadline
+            self.spawn_obstacle(impact)
+            if self.qm.answered and not self.next_question(impact):
+                return
+    
+    def time_up(self, now):
+        """The question's time limit ran out: lose a life, move on"""
+        self.lives.remove_life()
+        TIMEOUTS.inc(self.difficulty)
+        self._log(event_log.TIMEOUT)
+        self.feedback = "⏰ TIME'S UP! Lost a life."
+        self.feedback_type = "error"
+        self.streak = 0
+        if not self.lives.has_lives():
+            self.game_state = "game_over"
+            self._log(event_log.GAME_OVER)
+            return False
+        return self.next_question(now)
+    
+    def crash(self):
+        """Obstacle hit the car"""
+        self.lives.remove_life()
+        CRASHES.inc(self.difficulty)
+        self._log(event_log.CRASH)
+        self.feedback = "💥 CRASH! You didn't dodge in time!"
+        self.feedback_type = "error"
+        self.streak = 0
+    
+    def submit_answer(self, answer, grader=None, verdict_cache=None, graded=None):
+        """Process answer; returns whether it was correct.  ``graded`` is a
+        (correct, verdict) pair from QuestionManager.grade() run elsewhere"""
+        if not answer or self.game_state != "playing":
+            return False
+        
+        now = self.clock()
+        elapsed = now - self.question_start_time
+        if graded is not None:
+            is_correct, self.qm.last_verdict = graded
+        else:
+            is_correct = self.qm.check_answer(answer, grader, verdict_cache)
+        verdict = self.qm.last_verdict
+        if verdict is not None and verdict.status == Verdict.BUSY:
+            # The grader's load, not the answer: nothing counts, the player resubmits
+            VERDICTS.inc(self.qm.current_question['topic'], Verdict.BUSY)
+            self.feedback = f"⏳ {verdict.detail}"
+            self.feedback_type = "warning"
+            return False
+        self.qm.record_answer(is_correct, elapsed)
+        VERDICTS.inc(self.qm.current_question['topic'],
+                     verdict.status if verdict is not None else (Verdict.PASSED if is_correct else Verdict.FAILED))
+        
+        self.questions_answered += 1
+        
+        if is_correct:
+            # DODGE!
+            # Move car to avoid obstacle
+            lanes = [lane for lane in LANES if lane != self.obstacle_lane]
+            self.car_lane = self.rng.choice(lanes)
+            
+            # Calculate score
+            points = self.rules.base_points + self.rules.time_bonus(elapsed)
+            self.score += points
+            self.correct_answers += 1
+            self.streak += 1
+            
+            # Bonus life
+            if self.streak % self.rules.bonus_life_streak == 0:
+                self.lives.add_life()
+                self.feedback = f"✅ CORRECT! Dodged obstacle! +{points} pts | ❤️ BONUS LIFE!"
+            else:
+                self.feedback = f"✅ CORRECT! Dodged obstacle! +{points} pts"
+            
+            self.feedback_type = "success"
+        
+        else:
+            # WRONG - stay in lane, will crash
+            correct = self.qm.current_question['a']
+            if verdict is not None:
+                self.feedback = f"❌ WRONG! {verdict.detail} | Answer: {correct} - Can't dodge!"
+            else:
+                self.feedback = f"❌ WRONG! Answer: {correct} - Can't dodge!"
+            self.feedback_type = "error"
+            self.streak = 0
+        
+        self.timeline.push(now, self.score, self.streak, LANES.index(self.car_lane))
+        
+        # Fast forward obstacle: it reaches the car now, and the next question follows
+        self.obstacle_spawn_time -= self.obstacle_impact_time() - now
+        self._log(event_log.CORRECT if is_correct else event_log.WRONG, elapsed)
+        return is_correct
+    
+    def accuracy(self):
+        return self.correct_answers / max(self.questions_answered, 1)
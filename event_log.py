@@ -0,0 +1,261 @@
+"""
+Append-only binary log of game events.
+
+The engine records every race start, answer, crash, timeout and game
+over as a fixed 32-byte record.  record() only packs the record onto an
+in-memory queue; a background thread writes each batch with one write()
+and one fsync(), and starts a new file once the current one passes
+max_bytes.  Files are named so that sorting them by name sorts each
+process's files in order; read_events() merges all of them by time.
+
+    CODERACER_EVENTS=events streamlit run main.py      (0 disables)
+    python event_log.py events --limit 20              # JSON lines
+"""
+
+import atexit
+import glob
+import heapq
+import itertools
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque, namedtuple
+
+from question_bank import DIFFICULTIES, LANGUAGES
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "events")
+
+MAGIC = b"CREVENTS"
+VERSION = 1
+HEADER = struct.Struct("<8sII")             # magic, version, record size
+# time, session, question crc32, elapsed, score, kind, difficulty, language, lives
+RECORD = struct.Struct("<dQIfiBBBB")
+
+START, CORRECT, WRONG, CRASH, TIMEOUT, GAME_OVER = range(1, 7)
+KINDS = ("", "start", "correct", "wrong", "crash", "timeout", "game_over")
+_DIFFICULTY_INDEX = {name: i for i, name in enumerate(DIFFICULTIES)}
+_LANGUAGE_INDEX = {name: i for i, name in enumerate(LANGUAGES)}
+
+Event = namedtuple("Event", "time session question elapsed score kind difficulty language lives")
+
+
+def question_key(question_id):
+    """32-bit key of a question id; resolve it back with a bank's ids"""
+    return zlib.crc32(question_id.encode("utf-8")) if question_id else 0
+
+
+def session_key(sid):
+    """64-bit key of a session id (the hex uuid in the URL)"""
+    try:
+        return int(sid[:16], 16)
+    except (TypeError, ValueError):
+        return zlib.crc32(str(sid).encode("utf-8"))
+
+
+# ===========================
+# WRITER
+# ===========================
+
+class EventLog:
+    """Buffered, group-fsynced writer rotating files by size"""
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=64 * 1024 * 1024, flush_seconds=0.5,
+                 fsync=True, max_pending=100_000):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.flush_seconds = flush_seconds
+        self.fsync = fsync
+        self.max_pending = max_pending
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self._pending = deque()         # append/popleft are atomic: no lock on record()
+        self._sequence = itertools.count(1)
+        self._file = None
+        self._size = 0
+        self._lock = threading.Lock()          # held by whoever is writing a batch
+        self._wake = threading.Event()
+        self._closed = False
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls):
+        """Log to CODERACER_EVENTS (default ./events); None when set to 0"""
+        setting = os.environ.get("CODERACER_EVENTS", "")
+        if setting in ("0", "false", "off"):
+            return None
+        return cls(
+            directory=DEFAULT_DIR if setting in ("", "1", "true") else setting,
+            max_bytes=int(os.environ.get("CODERACER_EVENTS_MAX_MB", 64)) * 1024 * 1024,
+            flush_seconds=float(os.environ.get("CODERACER_EVENTS_FLUSH_SECONDS", 0.5)),
+        )
+
+    def record(self, kind, session, question_id, elapsed, score, difficulty, language, lives):
+        """Queue one event; the rerun pays for a struct pack and a list append"""
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1           # the disk can't keep up; don't grow without bound
+            return
+        self._pending.append(RECORD.pack(
+            time.time(), session, question_key(question_id),
+            math.nan if elapsed is None else elapsed, score, kind,
+            _DIFFICULTY_INDEX.get(difficulty, 255), _LANGUAGE_INDEX.get(language, 255),
+            min(lives, 255),
+        ))
+
+    def _open(self):
+        name = f"events-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._sequence):06d}.log"
+        self._file = open(os.path.join(self.directory, name), "ab")
+        self._size = 0
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._size = HEADER.size
+
+    def flush(self):
+        """Write and fsync everything queued so far"""
+        with self._lock:
+            pending = self._pending
+            batch = [pending.popleft() for _ in range(len(pending))]
+            if not batch:
+                return 0
+            data = b"".join(batch)
+            try:
+                if self._file is None or self._size >= self.max_bytes:
+                    if self._file is not None:
+                        self._file.close()
+                    self._open()
+                self._file.write(data)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except OSError:
+                # Put the batch back in front of newer events for the next attempt, cut
+                # whatever part of it reached this file, and resume in a fresh one
+                pending.extendleft(reversed(batch))
+                self._discard_file()
+                raise
+            self._size += len(data)
+            self.written += len(batch)
+            self.flushes += 1
+            return len(batch)
+
+    def _discard_file(self):
+        file, self._file = self._file, None
+        if file is not None:
+            try:
+                file.truncate(self._size)
+            except (OSError, ValueError):
+                pass
+            try:
+                file.close()
+            except OSError:
+                pass
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                pass        # full or vanished disk: keep the app running, retry next round
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except OSError:
+            pass
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self):
+        return {"written": self.written, "pending": len(self._pending),
+                "dropped": self.dropped, "flushes": self.flushes}
+
+
+_active = None
+
+
+def install(log):
+    """Make ``log`` the process-wide sink for record(); None turns logging off"""
+    global _active
+    _active = log
+    return log
+
+
+def record(kind, session, question_id, elapsed, score, difficulty, language, lives):
+    """Record to the installed log, if any"""
+    log = _active
+    if log is not None:
+        log.record(kind, session, question_id, elapsed, score, difficulty, language, lives)
+
+
+# ===========================
+# READER
+# ===========================
+
+def log_files(directory):
+    return sorted(glob.glob(os.path.join(directory, "events-*.log")))
+
+
+def read_file(path):
+    """Yield Event tuples from one log file in write order"""
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        magic, version, size = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or size != RECORD.size:
+            raise ValueError(f"{path}: not a version {VERSION} event log")
+        while True:
+            chunk = f.read(size * 4096)
+            usable = len(chunk) - len(chunk) % size     # a torn final record is skipped
+            for fields in RECORD.iter_unpack(chunk[:usable]):
+                yield Event(*fields)
+            if len(chunk) < size * 4096:
+                return
+
+
+def read_events(directory=DEFAULT_DIR):
+    """Every event in the directory, merged across files in time order"""
+    return heapq.merge(*(read_file(path) for path in log_files(directory)), key=lambda e: e.time)
+
+
+def describe(event):
+    """JSON-friendly dict of an event with names instead of codes"""
+    return {
+        "time": event.time,
+        "session": f"{event.session:016x}",
+        "question": f"{event.question:08x}",
+        "elapsed": None if math.isnan(event.elapsed) else round(event.elapsed, 3),
+        "score": event.score,
+        "kind": KINDS[event.kind] if event.kind < len(KINDS) else event.kind,
+        "difficulty": DIFFICULTIES[event.difficulty] if event.difficulty < len(DIFFICULTIES) else None,
+        "language": LANGUAGES[event.language] if event.language < len(LANGUAGES) else None,
+        "lives": event.lives,
+    }
+
+
+def main(argv=None):
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Print logged game events as JSON lines")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many events")
+    args = parser.parse_args(argv)
+    for event in itertools.islice(read_events(args.directory), args.limit):
+        print(json.dumps(describe(event)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+"""
+Execution-based answer grading for the DSA Racing Simulator.
+
+Submissions run inside a pool of pre-started, resource-limited Python
+worker processes, so a SUBMIT costs a pipe round-trip instead of an
+interpreter start.  Workers are fresh ``python -I -S`` interpreters rather
+than forks of the app, so they hold none of its modules or state.  Each worker drops into empty user, mount and network
+namespaces where the kernel allows it, and runs submissions on a thread
+whose frames lead to nothing but the runner's own module-free globals.
+"""
+
+import _thread
+import ast
+import atexit
+import copy
+import math
+import os
+import queue
+import re
+import signal
+import sys
+import tempfile
+import subprocess
+import textwrap
+import threading
+import time
+import types
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
+
+
+SIGNATURE_RE = re.compile(r"def\s+(\w+)\((.*?)\):")
+
+# Modules a submission may import (e.g. ``import bisect``), as stand-ins
+# holding only these names (None: every public name of a pure C module).
+# Nothing here may turn a runtime string into an attribute lookup or copy
+# attributes by name (string.Formatter, functools.update_wrapper, ...).
+SAFE_MODULES = {
+    "bisect": ("bisect", "bisect_left", "bisect_right", "insort", "insort_left", "insort_right"),
+    "collections": ("ChainMap", "Counter", "OrderedDict", "defaultdict", "deque"),
+    "functools": ("cache", "cmp_to_key", "lru_cache", "partial", "reduce"),
+    "heapq": ("heapify", "heappop", "heappush", "heappushpop", "heapreplace", "merge",
+              "nlargest", "nsmallest"),
+    "itertools": None,
+    "math": None,
+}
+
+SAFE_BUILTINS = (
+    "abs", "all", "any", "bool", "dict", "divmod", "enumerate", "filter",
+    "float", "frozenset", "int", "isinstance", "len", "list", "map", "max",
+    "min", "range", "reversed", "round", "set", "sorted", "str", "sum",
+    "tuple", "zip", "True", "False", "None", "ValueError", "IndexError",
+    "KeyError", "Exception",
+)
+
+# Attributes that reach frames, code or tracebacks (and from there any
+# module's globals) without a leading underscore
+FRAME_ATTRIBUTES = frozenset({
+    "gi_frame", "gi_code", "gi_yieldfrom", "cr_frame", "cr_code", "cr_await",
+    "ag_frame", "ag_code", "ag_await", "f_back", "f_globals", "f_locals",
+    "f_builtins", "f_code", "tb_frame", "tb_next", "co_code", "co_consts",
+})
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+
+
+# ===========================
+# VERDICTS
+# ===========================
+
+class Verdict:
+    """Outcome of grading one submission"""
+    PASSED = "passed"
+    FAILED = "failed"
+    ERROR = "error"
+    TIMEOUT = "timeout"
+    BUSY = "busy"
+
+    def __init__(self, status, detail=""):
+        self.status = status
+        self.detail = detail
+
+    @property
+    def passed(self):
+        return self.status == Verdict.PASSED
+
+    def __repr__(self):
+        return f"Verdict({self.status!r}, {self.detail!r})"
+
+
+def parse_signature(question_text):
+    """Return (function name, parameter list) from a question prompt"""
+    match = SIGNATURE_RE.search(question_text)
+    if not match:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def build_source(name, params, body):
+    """Wrap a submitted function body in its def line"""
+    body = textwrap.dedent(str(body)).strip("\n")
+    indented = textwrap.indent(body, "    ") or "    pass"
+    return f"def {name}({params}):\n{indented}\n"
+
+
+def check_source(source):
+    """Reject code that reaches for dunders or unsafe imports"""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as exc:
+        return f"SyntaxError: {exc.msg}"
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and (node.attr.startswith("_") or node.attr in FRAME_ATTRIBUTES):
+            return f"Access to '{node.attr}' is not allowed"
+        if isinstance(node, ast.Name) and node.id.startswith("__"):
+            return f"Access to '{node.id}' is not allowed"
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name not in SAFE_MODULES:
+                    return f"Import of '{alias.name}' is not allowed"
+        if isinstance(node, ast.ImportFrom):
+            if node.module not in SAFE_MODULES:
+                return f"Import of '{node.module}' is not allowed"
+    return None
+
+
+# ===========================
+# WORKER PROCESS
+# ===========================
+
+# Compiled into a namespace of its own.  A running submission's frames lead
+# back only to these functions, whose globals hold no modules, and the
+# worker calls serve() on a thread of its own so nothing lies beneath it.
+_RUNNER_SOURCE = """
+def safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name not in MODULES:
+        raise ImportError("import of '" + str(name) + "' is not allowed")
+    return MODULES[name]
+
+def describe(exc):
+    message = str(exc)
+    name = exc.__class__.__name__
+    return name + ": " + message if message else name
+
+def run(code, name, tests, deepcopy):
+    namespace = {"__builtins__": SANDBOX_BUILTINS}
+    try:
+        exec(code, namespace)
+        func = namespace.get(name)
+        if func is None:
+            return ERROR, "Function '" + name + "' not defined"
+        for args, expected in tests:
+            result = func(*deepcopy(args))
+            if result != expected:
+                shown = ", ".join([repr(a) for a in args])
+                return FAILED, f"{name}({shown}) returned {result!r}, expected {expected!r}"
+    except RecursionError:
+        return ERROR, "RecursionError: maximum recursion depth exceeded"
+    except MemoryError:
+        return ERROR, "MemoryError: memory limit exceeded"
+    except BaseException as exc:
+        return ERROR, describe(exc)
+    return PASSED, str(len(tests)) + " tests passed"
+
+def serve(jobs, results, deepcopy):
+    while True:
+        code, name, tests = jobs.get()
+        try:
+            results.put(run(code, name, tests, deepcopy))
+        except BaseException:
+            results.put((ERROR, "Submission could not be graded"))
+"""
+
+_runner = None
+
+
+def _safe_module(name, names):
+    """A module object carrying only the allowed names of ``name``"""
+    real = __import__(name)
+    if names is None:
+        names = [attr for attr in dir(real) if not attr.startswith("_")]
+    module = types.ModuleType(name)
+    for attr in names:
+        setattr(module, attr, getattr(real, attr))
+    return module
+
+
+def _runner_namespace():
+    """The runner functions, compiled once per process"""
+    global _runner
+    if _runner is None:
+        import builtins
+        modules = {name: _safe_module(name, names) for name, names in SAFE_MODULES.items()}
+        sandbox = {name: getattr(builtins, name) for name in SAFE_BUILTINS}
+        runner_builtins = dict(sandbox)
+        for name in ("exec", "repr", "str", "BaseException", "ImportError",
+                     "MemoryError", "RecursionError"):
+            runner_builtins[name] = getattr(builtins, name)
+        namespace = {
+            "__builtins__": runner_builtins, "MODULES": modules, "SANDBOX_BUILTINS": sandbox,
+            "PASSED": Verdict.PASSED, "FAILED": Verdict.FAILED, "ERROR": Verdict.ERROR,
+        }
+        exec(compile(_RUNNER_SOURCE, "<sandbox runner>", "exec"), namespace)
+        sandbox["__import__"] = namespace["safe_import"]
+        _runner = namespace
+    return _runner
+
+
+def _address_space():
+    """Bytes of address space this process has mapped (Linux); 0 elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _apply_limits(memory_bytes, inherited=0):
+    """Process-wide rlimits, set once when the worker starts; the memory
+    allowance comes on top of the ``inherited`` address space"""
+    if resource is None:
+        return
+    limits = [
+        (resource.RLIMIT_AS, inherited + memory_bytes),
+        (resource.RLIMIT_FSIZE, 0),
+        (resource.RLIMIT_NPROC, 0),
+    ]
+    for limit, value in limits:
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            pass
+
+
+def _arm_cpu_limit(cpu_seconds):
+    """Reset the CPU budget before each job (RLIMIT_CPU is cumulative)"""
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = math.ceil(usage.ru_utime + usage.ru_stime)
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, resource.RLIM_INFINITY))
+    except (ValueError, OSError):
+        pass
+
+
+def _isolate():
+    """Move the worker into new user, mount and network namespaces, rooted
+    in an empty deleted directory; best effort, returns whether it worked"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        scratch = tempfile.mkdtemp(prefix="coderacer-sandbox-")
+        os.chdir(scratch)
+        os.rmdir(scratch)       # a deleted directory: empty, and nothing can be created in it
+        unshared = libc.unshare(CLONE_NEWUSER | CLONE_NEWNS | CLONE_NEWNET) == 0
+        os.chroot(".")
+        os.chdir("/")
+        return unshared
+    except (OSError, AttributeError):
+        return False
+
+
+def _describe(exc):
+    message = str(exc)
+    return f"{type(exc).__name__}: {message}" if message else type(exc).__name__
+
+
+def run_tests(source, name, tests):
+    """Execute source and check ``name`` against (args, expected) cases"""
+    try:
+        code = compile(source, "<submission>", "exec")
+    except Exception as exc:
+        return Verdict.ERROR, _describe(exc)
+    return _runner_namespace()["run"](code, name, tests, copy.deepcopy)
+
+
+def _worker_main(conn, cpu_seconds, memory_bytes):
+    """Loop forever: receive a job, run it, send the verdict back"""
+    runner = _runner_namespace()
+    jobs, results = queue.SimpleQueue(), queue.SimpleQueue()
+    # Measured while /proc is still reachable
+    inherited = _address_space()
+    _isolate()      # must come before any thread is started
+    _thread.start_new_thread(runner["serve"], (jobs, results, copy.deepcopy))
+    _apply_limits(memory_bytes, inherited)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        _arm_cpu_limit(cpu_seconds)
+        source, name, tests = job
+        try:
+            code = compile(source, "<submission>", "exec")
+        except Exception as exc:
+            conn.send((Verdict.ERROR, _describe(exc)))
+            continue
+        jobs.put((code, name, tests))
+        conn.send(results.get())
+
+
+class _Worker:
+    """Handle to one sandbox process, started from a clean interpreter so it
+    holds none of the app's modules or state"""
+    def __init__(self, cpu_seconds, memory_bytes):
+        import socket
+        from multiprocessing.connection import Connection
+        parent, child = socket.socketpair()
+        with child:
+            self.process = subprocess.Popen(
+                [sys.executable, "-I", "-S", os.path.abspath(__file__), "--worker",
+                 str(child.fileno()), str(cpu_seconds), str(memory_bytes)],
+                pass_fds=(child.fileno(),), stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            )
+        self.conn = Connection(parent.detach())
+
+    def exit_signal(self):
+        """Signal that ended the worker, waiting briefly for it to go"""
+        try:
+            code = self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            return None
+        return -code if code < 0 else None
+
+    def kill(self):
+        try:
+            self.conn.close()
+        finally:
+            if self.process.poll() is None:
+                self.process.kill()
+            try:
+                self.process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                pass
+
+
+# ===========================
+# WORKER POOL
+# ===========================
+
+class SandboxPool:
+    """Pool of pre-warmed sandbox workers with a bounded wait queue"""
+    language = "Python"
+
+    def __init__(self, size=2, queue_depth=16, timeout=2.0, cpu_seconds=1, memory_mb=256):
+        self.size = size
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self._idle = queue.Queue()
+        # In-flight jobs plus waiters; anything beyond is rejected as busy
+        self._slots = threading.BoundedSemaphore(size + queue_depth)
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(self._spawn())
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """Build a pool configured by CODERACER_GRADER_* environment variables"""
+        env = os.environ
+        settings = dict(
+            size=int(env.get("CODERACER_GRADER_WORKERS", 2)),
+            queue_depth=int(env.get("CODERACER_GRADER_QUEUE", 16)),
+            timeout=float(env.get("CODERACER_GRADER_TIMEOUT", 2.0)),
+            cpu_seconds=int(env.get("CODERACER_GRADER_CPU_SECONDS", 1)),
+            memory_mb=int(env.get("CODERACER_GRADER_MEMORY_MB", 256)),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def _spawn(self):
+        return _Worker(self.cpu_seconds, self.memory_bytes)
+
+    def run(self, source, name, tests):
+        """Run a job, never blocking the caller longer than ``timeout``"""
+        deadline = time.monotonic() + self.timeout
+        if self._closed or not self._slots.acquire(timeout=self.timeout):
+            return Verdict(Verdict.BUSY, "Grader is busy, please resubmit")
+        try:
+            try:
+                worker = self._idle.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return Verdict(Verdict.BUSY, "Grader is busy, please resubmit")
+
+            healthy = False
+            try:
+                worker.conn.send((source, name, tests))
+                if worker.conn.poll(max(0.0, deadline - time.monotonic())):
+                    status, detail = worker.conn.recv()
+                    healthy = True
+                    return Verdict(status, detail)
+                return Verdict(Verdict.TIMEOUT, f"Time limit of {self.timeout:g}s exceeded")
+            except (EOFError, OSError):
+                if worker.exit_signal() == signal.SIGXCPU:
+                    # Out of CPU before the wall clock ran out: the same verdict either way
+                    return Verdict(Verdict.TIMEOUT, f"Time limit of {self.timeout:g}s exceeded")
+                return Verdict(Verdict.ERROR, "Submission exceeded its resource limits")
+            finally:
+                if healthy:
+                    self._idle.put(worker)
+                else:
+                    worker.kill()
+                    self._idle.put(self._spawn())
+        finally:
+            self._slots.release()
+
+    def grade(self, question, submission):
+        """Grade a function-body submission against the question's tests"""
+        name, params = parse_signature(question["q"])
+        if name is None or not question.get("tests"):
+            return Verdict(Verdict.ERROR, "Question has no executable tests")
+        source = build_source(name, params, submission)
+        problem = check_source(source)
+        if problem:
+            return Verdict(Verdict.ERROR, problem)
+        return self.run(source, name, question["tests"])
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            worker.kill()
+
+
+if __name__ == "__main__" and sys.argv[1:2] == ["--worker"]:
+    from multiprocessing.connection import Connection
+    _worker_main(Connection(int(sys.argv[2])), int(sys.argv[3]), int(sys.argv[4]))
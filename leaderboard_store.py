@@ -0,0 +1,274 @@
+"""
+Shared, persistent leaderboard for the DSA Racing Simulator.
+
+Scores live in SQLite (WAL mode) so every session and replica on a host
+sees the same board.  Writes are queued and committed in batches by a
+background thread, so finishing a race never waits on disk; top-N reads
+are cached for a short TTL.  The high score, rank and percentile are
+answered from memory (the high score and a ScoreIndex, seeded at open);
+the writer thread follows the table by row id to pick up other replicas.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from rank_index import ScoreIndex
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "coderacer.db")
+LEGACY_HIGHSCORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "highscore.txt")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    score INTEGER NOT NULL,
+    difficulty TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    language TEXT NOT NULL,
+    player TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scores_score ON scores (score DESC);
+CREATE INDEX IF NOT EXISTS idx_scores_difficulty_mode ON scores (difficulty, mode, score DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class LeaderboardStore:
+    """SQLite leaderboard with a batching writer thread and a TTL read cache"""
+    def __init__(self, path=DEFAULT_DB, flush_interval=0.5, batch_size=256,
+                 cache_ttl=2.0, legacy_highscore=LEGACY_HIGHSCORE):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.cache_ttl = cache_ttl
+        self._pending = queue.Queue()
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+        self._stopped = threading.Event()
+        self._high_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self.write_errors = 0
+
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        self._migrate_highscore(conn, legacy_highscore)
+        row = conn.execute("SELECT MAX(score) FROM scores").fetchone()
+        self._high_score = row[0] or 0
+        self._load_index(conn)
+
+        self._writer = threading.Thread(target=self._write_loop, name="leaderboard-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls):
+        """Build a store at CODERACER_DB (default: coderacer.db next to the app)"""
+        return cls(path=os.environ.get("CODERACER_DB", DEFAULT_DB))
+
+    def _connect(self):
+        """Per-thread connection (sqlite3 connections are not shareable)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate_highscore(self, conn, legacy_path):
+        """Import the old single-number highscore.txt once"""
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'highscore_migrated'").fetchone():
+            return
+        score = 0
+        if legacy_path and os.path.exists(legacy_path):
+            with open(legacy_path, encoding="utf-8") as f:
+                text = f.read().strip()
+            score = int(text) if text.isdigit() else 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we were reading
+            if not conn.execute("SELECT 1 FROM meta WHERE key = 'highscore_migrated'").fetchone():
+                if score > 0:
+                    conn.execute(
+                        "INSERT INTO scores (score, difficulty, mode, language, player, created_at) "
+                        "VALUES (?, 'Legacy', 'Legacy', 'Python', 'highscore.txt', ?)",
+                        (score, time.time()),
+                    )
+                conn.execute("INSERT INTO meta (key, value) VALUES ('highscore_migrated', ?)", (str(score),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _load_index(self, conn):
+        """Build the rank index from per-score counts (one grouped scan)"""
+        self._index_row_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM scores").fetchone()[0]
+        rows = conn.execute(
+            "SELECT difficulty, mode, score, COUNT(*) FROM scores WHERE id <= ? "
+            "GROUP BY difficulty, mode, score",
+            (self._index_row_id,),
+        )
+        self._index = ScoreIndex.from_counts(rows)
+        self._index_synced_at = time.monotonic()
+
+    def _sync_index(self, conn=None):
+        """Add rows written since the last sync, including other processes' rows"""
+        conn = conn or self._connect()
+        with self._index_lock:
+            rows = conn.execute(
+                "SELECT id, score, difficulty, mode FROM scores WHERE id > ? ORDER BY id",
+                (self._index_row_id,),
+            ).fetchall()
+            for row_id, score, difficulty, mode in rows:
+                self._index.add(score, difficulty, mode)
+                self._index_row_id = row_id
+            self._index_synced_at = time.monotonic()
+        if rows:
+            self._raise_high_score(max(row[1] for row in rows))
+
+    def _raise_high_score(self, score):
+        with self._high_lock:
+            if score > self._high_score:
+                self._high_score = score
+
+    # ===========================
+    # WRITES
+    # ===========================
+
+    def submit(self, score, difficulty, mode, language="Python", player=""):
+        """Queue a finished race; returns True if it beats the all-time high
+        as of the writer's last look at the table"""
+        with self._high_lock:
+            is_high = score > self._high_score
+            if is_high:
+                self._high_score = score
+        self._pending.put((int(score), difficulty, mode, language, player, time.time()))
+        return is_high
+
+    def _write_loop(self):
+        batch = []
+        failures = 0
+        while not self._stopped.is_set() or batch or not self._pending.empty():
+            if not batch:
+                try:
+                    batch.append(self._pending.get(timeout=self.flush_interval))
+                except queue.Empty:
+                    self._sync_if_due()
+                    continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except sqlite3.Error as exc:
+                # Locked, full or unreadable database: keep the batch and try again
+                failures += 1
+                self.write_errors += 1
+                delay = min(self.flush_interval * 2 ** failures, 10.0)
+                print(f"leaderboard: writing {len(batch)} scores failed ({exc}); retrying in {delay:.1f}s",
+                      file=sys.stderr)
+                time.sleep(delay)
+                continue
+            failures = 0
+            for _ in batch:
+                self._pending.task_done()
+            batch = []
+
+    def _write_batch(self, batch):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO scores (score, difficulty, mode, language, player, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        with self._cache_lock:
+            self._cache.clear()
+        try:
+            self._sync_index(conn)
+        except sqlite3.Error:
+            pass        # the rows are committed; the next sync catches the index up
+
+    def _sync_if_due(self):
+        """Writer thread: pick up other replicas' rows every cache_ttl"""
+        if time.monotonic() - self._index_synced_at < self.cache_ttl:
+            return
+        try:
+            self._sync_index()
+        except sqlite3.Error as exc:
+            print(f"leaderboard: reading new scores failed ({exc})", file=sys.stderr)
+
+    def refresh(self):
+        """Catch up with every row on disk now (tests and tools; the app
+        leaves this to the writer thread)"""
+        self._sync_index()
+
+    def flush(self):
+        """Block until every queued score is on disk"""
+        self._pending.join()
+
+    def close(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._writer.join(timeout=5)
+
+    # ===========================
+    # READS
+    # ===========================
+
+    @property
+    def high_score(self):
+        return self._high_score
+
+    def top(self, n=10, difficulty=None, mode=None):
+        """Top-n rows as dicts, optionally for one difficulty/mode"""
+        key = (n, difficulty, mode)
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached[0] < self.cache_ttl:
+                return cached[1]
+        sql = "SELECT score, difficulty, mode, language, player, created_at FROM scores"
+        params = []
+        if difficulty is not None and mode is not None:
+            sql += " WHERE difficulty = ? AND mode = ?"
+            params = [difficulty, mode]
+        sql += " ORDER BY score DESC LIMIT ?"
+        params.append(n)
+        columns = ("score", "difficulty", "mode", "language", "player", "created_at")
+        rows = [dict(zip(columns, row)) for row in self._connect().execute(sql, params)]
+        with self._cache_lock:
+            self._cache[key] = (now, rows)
+        return rows
+
+    def rank(self, score, difficulty=None, mode=None):
+        """1-based position the score would take among recorded runs"""
+        with self._index_lock:
+            return self._index.rank(score, difficulty, mode)
+
+    def percentile(self, score, difficulty=None, mode=None):
+        """Percentage of recorded runs that scored strictly lower"""
+        with self._index_lock:
+            return self._index.percentile(score, difficulty, mode)
+
+    def run_count(self, difficulty=None, mode=None):
+        with self._index_lock:
+            return self._index.count(difficulty, mode)
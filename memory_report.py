@@ -0,0 +1,135 @@
+"""
+Deep per-session memory report for the DSA Racing Simulator.
+
+    python memory_report.py --sessions 1000 --budget 4096
+
+Builds simulated mid-game sessions and reports what each one costs,
+excluding objects every session shares (question bank, default rules,
+modules, classes and functions).  Exits with status 1 when the average
+session exceeds the budget.
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import tracemalloc
+import types
+
+from engine import DEFAULT_RULES, GameEngine
+from question_bank import get_bank
+from track import FrameStats
+
+# Default per-session budget: 1,000 players per replica stay under 4 MB
+SESSION_BUDGET_BYTES = 4 * 1024
+
+SKIP_TYPES = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+    types.MethodType, types.CodeType,
+)
+
+
+def _reachable_ids(*roots):
+    """ids of everything reachable from the roots"""
+    seen = set()
+    stack = list(roots)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, SKIP_TYPES):
+            continue
+        seen.add(id(obj))
+        stack.extend(gc.get_referents(obj))
+    return seen
+
+
+_shared_ids = None
+
+
+def shared_ids():
+    """Objects owned by the process rather than by a session"""
+    global _shared_ids
+    if _shared_ids is None:
+        _shared_ids = _reachable_ids(get_bank(), DEFAULT_RULES, random._inst)
+    return _shared_ids
+
+
+def deep_sizeof(obj, exclude=None, seen=None):
+    """Bytes reachable from obj that are not shared or already counted"""
+    exclude = shared_ids() if exclude is None else exclude
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        key = id(item)
+        if key in seen or key in exclude or isinstance(item, SKIP_TYPES):
+            continue
+        seen.add(key)
+        total += sys.getsizeof(item)
+        stack.extend(gc.get_referents(item))
+    return total
+
+
+def session_report(session):
+    """Breakdown for a mapping of session values (e.g. st.session_state)"""
+    components = {}
+    for name, value in session.items():
+        if isinstance(value, GameEngine):
+            for slot in GameEngine.__slots__:
+                components[f"{name}.{slot}"] = deep_sizeof(getattr(value, slot, None))
+        else:
+            components[name] = deep_sizeof(value)
+    total = deep_sizeof(dict(session))
+    return {"total_bytes": total, "components": components}
+
+
+def build_session(seed, answers=5):
+    """A session part-way through a race, as main.py would hold it"""
+    now = [0.0]
+    engine = GameEngine(clock=lambda: now[0])
+    engine.start_game()
+    player = random.Random(seed)
+    for _ in range(answers):
+        if engine.game_state != "playing":
+            break
+        now[0] += 1.0
+        question = engine.qm.current_question
+        engine.submit_answer(question["a"] if player.random() < 0.7 else "pass")
+        engine.update_game()
+    frame_stats = FrameStats()
+    frame_stats.record("x" * 600)
+    return {"initialized": True, "engine": engine, "stylesheet_injected": True, "frame_stats": frame_stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report deep per-session memory use")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--budget", type=int, default=SESSION_BUDGET_BYTES, help="bytes per session")
+    args = parser.parse_args(argv)
+
+    shared_ids()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    sessions = [build_session(i) for i in range(args.sessions)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    sizes = [deep_sizeof(dict(s)) for s in sessions]
+    mean = sum(sizes) / len(sizes)
+    report = {
+        "sessions": len(sessions),
+        "mean_session_bytes": round(mean),
+        "max_session_bytes": max(sizes),
+        "tracemalloc_bytes_per_session": round(allocated / len(sessions)),
+        "budget_bytes": args.budget,
+        "within_budget": mean <= args.budget,
+        "example": session_report(sessions[0]),
+    }
+    print(json.dumps(report, indent=2))
+    return 0 if report["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Low-overhead Prometheus metrics for the DSA Racing Simulator.
+
+Every thread records into its own dict, so the hot path takes no lock; a
+scrape sums the per-thread dicts and renders the Prometheus text format.
+Histogram lists are replaced, never changed in place, so a scrape reads
+each one whole.
+Dicts of threads that have exited are folded into one total on scrapes and
+every PRUNE_EVERY new threads, since Streamlit runs each rerun on a fresh
+thread.  start_http_server serves /metrics from a background thread on a
+side port, on localhost unless CODERACER_METRICS_HOST says otherwise:
+
+    CODERACER_METRICS_PORT=9464 streamlit run main.py     (0 disables)
+    CODERACER_METRICS_HOST=0.0.0.0                        (for a remote scraper)
+    CODERACER_METRICS_PORT_OFFSET=1                       (per replica on one host)
+
+Each process exports only its own registry, so replicas sharing a host
+need a port each; a replica whose port is taken warns and exports nothing.
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 9464
+DEFAULT_HOST = "127.0.0.1"
+PRUNE_EVERY = 64        # new threads between folds of the finished ones
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+ACTIVE_SESSION_SECONDS = 60
+
+
+# ===========================
+# PER-THREAD AGGREGATION
+# ===========================
+
+class _Shard:
+    """One thread's values: {(metric, labels): number or histogram list}"""
+    __slots__ = ("thread", "values")
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.values = {}
+
+
+_local = threading.local()
+_shards = []
+_retired = {}
+_shards_lock = threading.Lock()
+_created = 0
+
+
+def _values():
+    global _created
+    try:
+        return _local.values
+    except AttributeError:
+        shard = _Shard()
+        with _shards_lock:
+            _shards.append(shard)
+            _created += 1
+            if _created % PRUNE_EVERY == 0:
+                _fold_finished()
+        _local.values = shard.values
+        return shard.values
+
+
+def _fold_finished():
+    """Fold finished threads' values into the retired totals (lock held)"""
+    for shard in [s for s in _shards if not s.thread.is_alive()]:
+        # A finished thread never writes again: fold it in for good
+        _merge(_retired, shard.values)
+        _shards.remove(shard)
+
+
+def _merge(into, values):
+    for key, value in values.items():
+        if isinstance(value, list):
+            total = into.get(key)
+            if total is None:
+                into[key] = list(value)
+            else:
+                for i, count in enumerate(value):
+                    total[i] += count
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+def snapshot():
+    """Totals across every thread, past and present"""
+    with _shards_lock:
+        _fold_finished()
+        totals = {key: list(value) if isinstance(value, list) else value for key, value in _retired.items()}
+        live = [shard.values.copy() for shard in _shards]
+    for values in live:
+        _merge(totals, values)
+    return totals
+
+
+# ===========================
+# METRIC TYPES
+# ===========================
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        REGISTRY.append(self)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        values = _values()
+        key = (self.name, labels)
+        values[key] = values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        values = _values()
+        key = (self.name, labels)
+        previous = values.get(key)
+        # A new list each time, published by one store: a scrape copying this
+        # thread's dict never sees a bucket counted without its sum and count
+        # one slot per bucket, +Inf, then sum and count
+        counts = list(previous) if previous is not None else [0] * (len(self.buckets) + 1) + [0.0, 0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+        values[key] = counts
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Gauge(Metric):
+    """Value computed at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), function=None):
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def collect(self):
+        return {(): self.function()} if self.function else {}
+
+
+REGISTRY = []
+
+RERUN_SECONDS = Histogram("coderacer_rerun_seconds", "Streamlit script run duration", ("state",))
+SUBMIT_SECONDS = Histogram("coderacer_submit_seconds", "submit_answer latency including grading", ("language",))
+VERDICTS = Counter("coderacer_verdicts_total", "Graded answers by topic and verdict", ("topic", "status"))
+CRASHES = Counter("coderacer_crashes_total", "Obstacles that hit the car", ("difficulty",))
+TIMEOUTS = Counter("coderacer_question_timeouts_total", "Questions whose time limit ran out", ("difficulty",))
+QUESTIONS_SERVED = Counter("coderacer_questions_served_total", "Questions shown to players", ("difficulty",))
+
+_last_seen = {}
+
+
+def touch_session(sid):
+    """Mark a session active (a plain dict store; no lock needed)"""
+    _last_seen[sid] = time.monotonic()
+    if len(_last_seen) > 10000:
+        active_sessions()       # prune even if nobody scrapes
+
+
+def active_sessions():
+    cutoff = time.monotonic() - ACTIVE_SESSION_SECONDS
+    for sid, seen in list(_last_seen.items()):
+        if seen < cutoff:
+            _last_seen.pop(sid, None)
+    return len(_last_seen)
+
+
+ACTIVE_SESSIONS = Gauge("coderacer_active_sessions",
+                        f"Sessions that reran in the last {ACTIVE_SESSION_SECONDS}s",
+                        function=active_sessions)
+
+
+# ===========================
+# EXPOSITION
+# ===========================
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Every registered metric in the Prometheus text format"""
+    totals = snapshot()
+    by_metric = {}
+    for (name, labels), value in totals.items():
+        by_metric.setdefault(name, []).append((labels, value))
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        if isinstance(metric, Gauge):
+            for labels, value in metric.collect().items():
+                lines.append(f"{metric.name}{_labels(metric.labelnames, labels)} {_number(value)}")
+            continue
+        for labels, value in sorted(by_metric.get(metric.name, ())):
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ("+Inf",), value):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{metric.name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_labels(metric.labelnames, labels)} {_number(value[-2])}")
+                lines.append(f"{metric.name}_count{_labels(metric.labelnames, labels)} {value[-1]}")
+            else:
+                lines.append(f"{metric.name}{_labels(metric.labelnames, labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port=DEFAULT_PORT, host=DEFAULT_HOST):
+    """Serve /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
+
+
+def server_from_env():
+    """Start the exporter on CODERACER_METRICS_PORT (+ CODERACER_METRICS_PORT_OFFSET);
+    None if disabled or the port is taken"""
+    port = int(os.environ.get("CODERACER_METRICS_PORT", DEFAULT_PORT))
+    if not port:
+        return None
+    port += int(os.environ.get("CODERACER_METRICS_PORT_OFFSET", 0))
+    host = os.environ.get("CODERACER_METRICS_HOST", DEFAULT_HOST)
+    try:
+        return start_http_server(port, host)
+    except OSError as exc:
+        print(f"metrics: cannot serve on {host}:{port} ({exc}); this process's metrics are not "
+              "exported (give each replica its own CODERACER_METRICS_PORT_OFFSET)", file=sys.stderr)
+        return None
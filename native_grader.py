@@ -0,0 +1,572 @@
+"""
+C and C++ grading for the DSA Racing Simulator.
+
+Each question's Python signature and test cases are turned into a C or
+C++ harness around the submitted function body.  Binaries are cached on
+disk by a hash of (harness, submission, compiler flags), so identical
+submissions skip the compiler, and a small compile pool caps how many
+compiles run at once.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits
+    resource = None
+
+from grader import Verdict, parse_signature
+
+
+LANGUAGES = {
+    "C": {"compiler": "gcc", "flags": ("-std=c11", "-O1", "-w"), "suffix": ".c"},
+    "C++": {"compiler": "g++", "flags": ("-std=c++17", "-O1", "-w"), "suffix": ".cpp"},
+}
+
+INT, BOOL, STR, INT_LIST = "int", "bool", "str", "int_list"
+
+C_TYPES = {INT: "int", BOOL: "int", STR: "const char *"}
+CPP_TYPES = {INT: "int", BOOL: "bool", STR: "string", INT_LIST: "vector<int>"}
+
+
+# ===========================
+# TYPE INFERENCE
+# ===========================
+
+def _kind(value):
+    """Map a Python test value to a harness type, or None if unsupported"""
+    if isinstance(value, bool):
+        return BOOL
+    if isinstance(value, int):
+        return INT
+    if isinstance(value, str):
+        return STR
+    if isinstance(value, list) and all(isinstance(v, int) and not isinstance(v, bool) for v in value):
+        return INT_LIST
+    return None
+
+
+def infer_signature(question):
+    """Return (name, [(param, kind)], return kind) or None if not expressible"""
+    name, params = parse_signature(question.get("q", ""))
+    tests = question.get("tests")
+    if name is None or not tests:
+        return None
+    names = [p.strip() for p in params.split(",") if p.strip()]
+    args, expected = tests[0]
+    if len(args) != len(names):
+        return None
+    kinds = [_kind(a) for a in args]
+    returns = {_kind(exp) for _, exp in tests}
+    if None in kinds or len(returns) != 1 or None in returns:
+        return None
+    return name, list(zip(names, kinds)), returns.pop()
+
+
+def supports(question, language):
+    """Can this question be played in the given language?"""
+    if language not in LANGUAGES or not question.get("tests"):
+        return True
+    signature = infer_signature(question)
+    if signature is None:
+        return False
+    if language == "C":
+        return signature[2] in (INT, BOOL)
+    return True
+
+
+# ===========================
+# HARNESS GENERATION
+# ===========================
+
+def _literal(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, str):
+        return json.dumps(value)
+    return str(value)
+
+
+def _array_lengths(params):
+    """Single arrays take ``n`` as their length; several use ``<name>_len``"""
+    arrays = [p for p, kind in params if kind == INT_LIST]
+    return {p: ("n" if len(arrays) == 1 else f"{p}_len") for p in arrays}
+
+
+def c_declaration(signature, language):
+    """Function head shown to the player and used in the harness"""
+    name, params, returns = signature
+    lengths = _array_lengths(params)
+    parts = []
+    for param, kind in params:
+        if kind == INT_LIST and language == "C":
+            parts.append(f"int *{param}, int {lengths[param]}")
+        elif language == "C":
+            parts.append(f"{C_TYPES[kind]}{'' if kind == STR else ' '}{param}")
+        else:
+            parts.append(f"{CPP_TYPES[kind]} {param}")
+    ret = C_TYPES[returns] if language == "C" else CPP_TYPES[returns]
+    return f"{ret} {name}({', '.join(parts)})"
+
+
+def expected_output(value):
+    """Text a harness prints for a value"""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, list):
+        return "[" + ", ".join(str(v) for v in value) + "]"
+    return str(value)
+
+
+def _c_call(signature, args, index):
+    name, params, _ = signature
+    lines, call_args = [], []
+    lengths = _array_lengths(params)
+    for (param, kind), value in zip(params, args):
+        if kind == INT_LIST:
+            items = ", ".join(str(v) for v in value) or "0"
+            lines.append(f"        int a{index}_{param}[] = {{{items}}};")
+            call_args.append(f"a{index}_{param}")
+            call_args.append(str(len(value)))
+        else:
+            call_args.append(_literal(value))
+    lines.append(f"        printf(\"%d\\n\", (int)({name}({', '.join(call_args)})));")
+    return lines
+
+
+def _cpp_call(signature, args):
+    name, params, returns = signature
+    call_args = []
+    for (_, kind), value in zip(params, args):
+        if kind == INT_LIST:
+            call_args.append("vector<int>{" + ", ".join(str(v) for v in value) + "}")
+        elif kind == STR:
+            call_args.append(f"string({_literal(value)})")
+        else:
+            call_args.append(_literal(value))
+    call = f"{name}({', '.join(call_args)})"
+    if returns == BOOL:
+        call = f"({call} ? 1 : 0)"
+    return [f"        emit({call});"]
+
+
+SANDBOX_PRELUDE = """#ifndef _GNU_SOURCE
+#define _GNU_SOURCE
+#endif
+#include <sched.h>
+#include <unistd.h>
+#include <sys/resource.h>
+"""
+
+C_PRELUDE = SANDBOX_PRELUDE + """#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+"""
+
+CPP_PRELUDE = SANDBOX_PRELUDE + """#include <algorithm>
+#include <iostream>
+#include <numeric>
+#include <string>
+#include <vector>
+using namespace std;
+
+static void emit(int v) { cout << v << "\\n"; }
+static void emit(const string &v) { cout << v << "\\n"; }
+static void emit(const vector<int> &v) {
+    cout << "[";
+    for (size_t i = 0; i < v.size(); i++) cout << (i ? ", " : "") << v[i];
+    cout << "]\\n";
+}
+
+"""
+
+# Once the loader is done: empty user, mount and network namespaces, rooted
+# in the run directory after removing it (as grader._isolate does), so no
+# path names any file; and no new descriptors.  Without the namespaces the
+# submission does not run at all.  This only holds if nothing in the
+# submission runs before main(): check_body() keeps it inside its function.
+SANDBOX_UNAVAILABLE = 97
+SANDBOX_MAIN = """    char run_dir[4096];
+    if (!getcwd(run_dir, sizeof run_dir)
+            || unshare(CLONE_NEWUSER | CLONE_NEWNS | CLONE_NEWNET) != 0) return %d;
+    rmdir(run_dir);
+    if (chroot(".") != 0 || chdir("/") != 0) return %d;
+    struct rlimit nofile = {3, 3};
+    setrlimit(RLIMIT_NOFILE, &nofile);
+""" % (SANDBOX_UNAVAILABLE, SANDBOX_UNAVAILABLE)
+
+FORBIDDEN_WORDS = frozenset({
+    "__attribute__", "__attribute", "asm", "__asm__", "__asm", "_Pragma", "__declspec",
+})
+_WORD_RE = re.compile(r"[A-Za-z_]\w*")
+_NUMBER_RE = re.compile(r"[0-9](?:'?[0-9A-Za-z_.])*")
+
+
+def check_body(submission):
+    """Reject a function body that could run code outside its function:
+    preprocessor lines, attributes, asm, or braces closing the function"""
+    text = re.sub(r"\\\r?\n", "", str(submission))       # line splices first, as the compiler does
+    if "??" in text:
+        return "Trigraphs are not allowed"
+    depth = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if text.startswith("//", i):
+            i = text.find("\n", i)
+            if i < 0:
+                break
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            if end < 0:
+                return "Unterminated comment"
+            i = end + 2
+            continue
+        elif ch in "\"'":
+            end = i + 1
+            while end < len(text) and text[end] != ch:
+                if text[end] == "\n":
+                    return "Unterminated literal"
+                end += 2 if text[end] == "\\" else 1
+            if end >= len(text):
+                return "Unterminated literal"
+            i = end + 1
+            continue
+        elif ch == "#" or text.startswith(("%:", "<%", "%>"), i):
+            return "Preprocessor directives are not allowed"
+        elif ch.isdigit():
+            i = _NUMBER_RE.match(text, i).end()     # may hold ' digit separators
+            continue
+        elif ch == "_" or ch.isalpha():
+            word = _WORD_RE.match(text, i).group()
+            if word in FORBIDDEN_WORDS:
+                return f"'{word}' is not allowed"
+            if word.endswith("R") and text.startswith('"', i + len(word)):
+                return "Raw string literals are not allowed"
+            i += len(word)
+            continue
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth < 0:
+                return "Code outside the function body is not allowed"
+        i += 1
+    if depth:
+        return "Unbalanced braces"
+    return None
+
+
+def build_harness(question, language, submission):
+    """Return (harness source, expected output lines)"""
+    signature = infer_signature(question)
+    body = "\n".join("    " + line for line in str(submission).strip("\n").splitlines())
+    lines = [C_PRELUDE if language == "C" else CPP_PRELUDE]
+    lines.append(c_declaration(signature, language) + " {")
+    lines.append(body)
+    lines.append("}\n")
+    lines.append("int main(void) {" if language == "C" else "int main() {")
+    lines.append(SANDBOX_MAIN)
+    for index, (args, _) in enumerate(question["tests"]):
+        lines.append("    {")
+        if language == "C":
+            lines.extend(_c_call(signature, args, index))
+        else:
+            lines.extend(_cpp_call(signature, args))
+        lines.append("    }")
+    lines.append("    return 0;\n}\n")
+    expected = [expected_output(exp) for _, exp in question["tests"]]
+    return "\n".join(lines), expected
+
+
+def render_prompt(question, language):
+    """Rewrite a Python prompt with the C/C++ function head"""
+    signature = infer_signature(question)
+    if language not in LANGUAGES or signature is None:
+        return question["q"]
+    out = []
+    for line in question["q"].splitlines():
+        if line.startswith("def "):
+            out.append(c_declaration(signature, language) + " {")
+        elif line.lstrip().startswith("#"):
+            out.append(line.replace("#", "//", 1))
+        else:
+            out.append(line)
+    out.append("}")
+    return "\n".join(out)
+
+
+# ===========================
+# COMPILE CACHE
+# ===========================
+
+class CompileCache:
+    """Content-addressed binaries on disk with LRU eviction"""
+    def __init__(self, directory, max_entries=512):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._pins = {}             # filename -> runs in progress; never evicted
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        entries = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith((".bin", ".err")):
+                entries.append((entry.stat().st_mtime, entry.name))
+        for _, filename in sorted(entries):
+            self._lru[filename] = None
+
+    @staticmethod
+    def key(source, compiler, flags):
+        digest = hashlib.sha256()
+        for part in (compiler, " ".join(flags), source):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def lookup(self, key):
+        """Return ('bin', path) / ('err', message) / None"""
+        with self._lock:
+            for filename, kind in ((key + ".bin", "bin"), (key + ".err", "err")):
+                if filename in self._lru:
+                    path = self.path(filename)
+                    if not os.path.exists(path):
+                        del self._lru[filename]
+                        continue
+                    self._lru.move_to_end(filename)
+                    self.hits += 1
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    if kind == "err":
+                        with open(path, encoding="utf-8") as f:
+                            return kind, f.read()
+                    return kind, path
+            self.misses += 1
+            return None
+
+    def store(self, key, produced_path=None, error=None):
+        """Move a fresh binary (or compile error) into the cache"""
+        filename = key + (".bin" if error is None else ".err")
+        final = self.path(filename)
+        if error is None:
+            os.replace(produced_path, final)
+        else:
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(error)
+            os.replace(tmp, final)
+        with self._lock:
+            self._lru[filename] = None
+            self._lru.move_to_end(filename)
+            self._evict()
+        return final
+
+    def _evict(self):
+        pinned = []
+        while len(self._lru) + len(pinned) > self.max_entries and self._lru:
+            oldest, _ = self._lru.popitem(last=False)
+            if oldest in self._pins:
+                pinned.append(oldest)
+                continue
+            try:
+                os.remove(self.path(oldest))
+            except OSError:
+                pass
+        for filename in reversed(pinned):
+            self._lru[filename] = None
+            self._lru.move_to_end(filename, last=False)
+
+    def pin(self, path):
+        """Keep a binary from eviction until unpin(); False if already gone"""
+        filename = os.path.basename(path)
+        with self._lock:
+            if filename not in self._lru or not os.path.exists(path):
+                return False
+            self._pins[filename] = self._pins.get(filename, 0) + 1
+            return True
+
+    def unpin(self, path):
+        filename = os.path.basename(path)
+        with self._lock:
+            count = self._pins.pop(filename, 0) - 1
+            if count > 0:
+                self._pins[filename] = count
+            self._evict()
+
+
+# ===========================
+# TOOLCHAIN
+# ===========================
+
+# Sets the rlimits on itself, then becomes the binary: nothing runs between
+# fork and exec in the (threaded) server process
+_LAUNCHER = """
+import os, resource, sys
+for name, value in zip(("RLIMIT_CPU", "RLIMIT_AS", "RLIMIT_FSIZE", "RLIMIT_NPROC"), sys.argv[1:5]):
+    try:
+        resource.setrlimit(getattr(resource, name), (int(value), int(value)))
+    except (ValueError, OSError):
+        pass
+os.execv(sys.argv[5], sys.argv[5:])
+"""
+
+
+def launcher(cpu_seconds, memory_bytes):
+    """argv prefix that applies the run limits and execs the program after it"""
+    prlimit = shutil.which("prlimit")
+    if prlimit:
+        return [prlimit, f"--cpu={cpu_seconds}", f"--as={memory_bytes}",
+                "--fsize=0", "--nproc=0", "--"]
+    return [sys.executable, "-I", "-S", "-c", _LAUNCHER,
+            str(cpu_seconds), str(memory_bytes), "0", "0"]
+
+
+class NativeToolchain:
+    """Shared compile pool and cache for every C/C++ grader"""
+    def __init__(self, cache_dir, compile_workers=2, max_entries=512,
+                 compile_timeout=10.0, run_timeout=2.0, memory_mb=256):
+        self.cache = CompileCache(cache_dir, max_entries)
+        self.compile_timeout = compile_timeout
+        self.run_timeout = run_timeout
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self._pool = ThreadPoolExecutor(max_workers=compile_workers, thread_name_prefix="compile")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a toolchain configured by CODERACER_NATIVE_* environment variables"""
+        env = os.environ
+        default_dir = os.path.join(os.path.expanduser("~"), ".cache", "coderacer", "native")
+        return cls(
+            cache_dir=env.get("CODERACER_NATIVE_CACHE", default_dir),
+            compile_workers=int(env.get("CODERACER_NATIVE_WORKERS", 2)),
+            max_entries=int(env.get("CODERACER_NATIVE_CACHE_SIZE", 512)),
+            compile_timeout=float(env.get("CODERACER_NATIVE_COMPILE_TIMEOUT", 10.0)),
+            run_timeout=float(env.get("CODERACER_NATIVE_RUN_TIMEOUT", 2.0)),
+        )
+
+    def available(self, language):
+        return shutil.which(LANGUAGES[language]["compiler"]) is not None
+
+    def _compile(self, key, source, language):
+        spec = LANGUAGES[language]
+        workdir = tempfile.mkdtemp(prefix="coderacer-")
+        try:
+            src_path = os.path.join(workdir, "submission" + spec["suffix"])
+            bin_path = os.path.join(workdir, "submission.bin")
+            with open(src_path, "w", encoding="utf-8") as f:
+                f.write(source)
+            try:
+                result = subprocess.run(
+                    [spec["compiler"], *spec["flags"], src_path, "-o", bin_path],
+                    capture_output=True, text=True, timeout=self.compile_timeout,
+                )
+            except subprocess.TimeoutExpired:
+                return "err", "Compilation timed out"
+            if result.returncode != 0:
+                error = result.stderr.replace(src_path, "submission" + spec["suffix"])[-2000:]
+                self.cache.store(key, error=error)
+                return "err", error
+            return "bin", self.cache.store(key, produced_path=bin_path)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def binary_for(self, source, language):
+        """Return ('bin', path) or ('err', message), compiling at most once per key"""
+        spec = LANGUAGES[language]
+        key = CompileCache.key(source, spec["compiler"], spec["flags"])
+        cached = self.cache.lookup(key)
+        if cached is not None:
+            return cached
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._pool.submit(self._compile, key, source, language)
+                self._inflight[key] = future
+                future.add_done_callback(lambda _f, k=key: self._forget(k))
+        return future.result(timeout=self.compile_timeout)
+
+    def _forget(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def run(self, binary):
+        """Execute a cached binary under rlimits in an empty directory, which
+        the binary removes and chroots into before running the submission"""
+        if resource is None:
+            command = [binary]
+        else:
+            command = launcher(int(self.run_timeout) + 1, self.memory_bytes) + [binary]
+        with tempfile.TemporaryDirectory(prefix="coderacer-run-", ignore_cleanup_errors=True) as cwd:
+            return subprocess.run(
+                command, cwd=cwd, env={}, stdin=subprocess.DEVNULL,
+                capture_output=True, text=True, timeout=self.run_timeout,
+            )
+
+
+class NativeGrader:
+    """Grades submissions in one compiled language"""
+    def __init__(self, toolchain, language):
+        self.toolchain = toolchain
+        self.language = language
+
+    def grade(self, question, submission):
+        if not question.get("tests") or infer_signature(question) is None:
+            return Verdict(Verdict.ERROR, f"Question cannot be graded in {self.language}")
+        if not self.toolchain.available(self.language):
+            return Verdict(Verdict.ERROR, f"No {LANGUAGES[self.language]['compiler']} on this server")
+        problem = check_body(submission)
+        if problem:
+            return Verdict(Verdict.ERROR, problem)
+        source, expected = build_harness(question, self.language, submission)
+        cache = self.toolchain.cache
+        for _ in range(3):
+            try:
+                kind, payload = self.toolchain.binary_for(source, self.language)
+            except FutureTimeout:
+                return Verdict(Verdict.BUSY, "Compiler is busy, please resubmit")
+            if kind == "err":
+                first = next((l for l in payload.splitlines() if "error" in l), payload.strip())
+                return Verdict(Verdict.ERROR, f"Compile error: {first}")
+            if cache.pin(payload):
+                break
+            # Evicted between compile and run: compile it again
+        else:
+            return Verdict(Verdict.BUSY, "Compiler is busy, please resubmit")
+        try:
+            result = self.toolchain.run(payload)
+        except subprocess.TimeoutExpired:
+            return Verdict(Verdict.TIMEOUT, f"Time limit of {self.toolchain.run_timeout:g}s exceeded")
+        finally:
+            cache.unpin(payload)
+        if result.returncode == SANDBOX_UNAVAILABLE:
+            return Verdict(Verdict.ERROR, "This server cannot isolate native programs")
+        if result.returncode != 0:
+            return Verdict(Verdict.ERROR, f"Program exited with status {result.returncode}")
+        actual = result.stdout.splitlines()
+        name = infer_signature(question)[0]
+        for index, ((args, _), want) in enumerate(zip(question["tests"], expected)):
+            got = actual[index] if index < len(actual) else "<no output>"
+            if got != want:
+                shown = ", ".join(repr(a) for a in args)
+                return Verdict(Verdict.FAILED, f"{name}({shown}) returned {got}, expected {want}")
+        return Verdict(Verdict.PASSED, f"{len(expected)} tests passed")
@@ -0,0 +1,163 @@
+"""
+On-demand profiling of live reruns.
+
+Enable for the whole process with CODERACER_PROFILE=<directory> (or 1 for
+./profiles), or for one browser session with the hidden ?profile=1 query
+parameter once CODERACER_PROFILE_ALLOW_QUERY=1 lets visitors use it.  Every Nth sampled rerun is run under cProfile with tracemalloc
+on, leaving a .prof file and a top-N allocation summary (.alloc.tsv) in the
+directory; only the newest files are kept.
+
+    CODERACER_PROFILE=profiles CODERACER_PROFILE_EVERY=20 streamlit run main.py
+    python profiling.py profiles --top 30            # merged report
+"""
+
+import glob
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+
+class Profiler:
+    """Samples every Nth rerun into rotating .prof / .alloc.tsv files"""
+    def __init__(self, directory=DEFAULT_DIR, every=10, keep=50, top=25, enabled=True,
+                 allow_query=False):
+        self.directory = directory
+        self.every = max(1, every)
+        self.keep = keep
+        self.top = top
+        self.enabled = enabled
+        self.allow_query = allow_query     # whether ?profile=1 may turn it on per session
+        self._runs = itertools.count(1)
+        self._files = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Process-wide profiling when CODERACER_PROFILE is set; per-session otherwise"""
+        setting = os.environ.get("CODERACER_PROFILE", "")
+        directory = DEFAULT_DIR if setting in ("", "1", "true") else setting
+        return cls(
+            directory=directory,
+            every=int(os.environ.get("CODERACER_PROFILE_EVERY", 10)),
+            keep=int(os.environ.get("CODERACER_PROFILE_KEEP", 50)),
+            enabled=bool(setting) and setting != "0",
+            allow_query=os.environ.get("CODERACER_PROFILE_ALLOW_QUERY", "") in ("1", "true"),
+        )
+
+    @contextmanager
+    def rerun(self, label, force=False):
+        """Profile this block if profiling is on and it is the Nth rerun"""
+        if not (self.enabled or force):
+            yield
+            return
+        run = next(self._runs)
+        if run % self.every:
+            yield
+            return
+        import cProfile
+        import tracemalloc
+        # tracemalloc is process-wide: only one sampled rerun uses it at a time
+        with self._lock:
+            trace = not tracemalloc.is_tracing()
+            if trace:
+                tracemalloc.start()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot() if trace else None
+            if trace:
+                tracemalloc.stop()
+            self._write(run, label, profile, snapshot, elapsed)
+
+    def _write(self, run, label, profile, snapshot, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        stem = os.path.join(
+            self.directory, f"rerun-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{run:06d}-{label}"
+        )
+        profile.dump_stats(stem + ".prof")
+        written = [stem + ".prof"]
+        if snapshot is not None:
+            with open(stem + ".alloc.tsv", "w", encoding="utf-8") as f:
+                f.write(f"# {label} rerun, {elapsed * 1000:.1f} ms\n")
+                for stat in snapshot.statistics("lineno")[:self.top]:
+                    frame = stat.traceback[0]
+                    f.write(f"{stat.size}\t{stat.count}\t{frame.filename}:{frame.lineno}\n")
+            written.append(stem + ".alloc.tsv")
+        self._rotate(written)
+
+    def _rotate(self, written):
+        with self._lock:
+            if self._files is None:
+                self._files = sorted(
+                    glob.glob(os.path.join(self.directory, "rerun-*.prof")), key=os.path.getmtime
+                )
+            self._files.append(written[0])
+            while len(self._files) > self.keep:
+                old = self._files.pop(0)
+                for path in (old, old[:-len(".prof")] + ".alloc.tsv"):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+
+# ===========================
+# MERGED REPORT
+# ===========================
+
+def merge_allocations(paths):
+    """{location: (bytes, count)} summed over .alloc.tsv files"""
+    totals = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#") or not line.strip():
+                    continue
+                size, count, location = line.rstrip("\n").split("\t", 2)
+                old_size, old_count = totals.get(location, (0, 0))
+                totals[location] = (old_size + int(size), old_count + int(count))
+    return totals
+
+
+def report(directory, top=25, sort="cumulative"):
+    """Text report merging every profile and allocation summary in directory"""
+    profiles = sorted(glob.glob(os.path.join(directory, "*.prof")))
+    allocs = sorted(glob.glob(os.path.join(directory, "*.alloc.tsv")))
+    if not profiles:
+        return f"No profiles in {directory}\n"
+    import io
+    import pstats
+    out = io.StringIO()
+    out.write(f"{len(profiles)} sampled reruns from {directory}\n\n")
+    stats = pstats.Stats(*profiles, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(top)
+    if allocs:
+        totals = merge_allocations(allocs)
+        out.write(f"Top allocations retained per rerun (mean of {len(allocs)} samples)\n")
+        ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for location, (size, count) in ranked:
+            out.write(f"{size / len(allocs) / 1024:10.1f} KiB {count / len(allocs):10.1f} blocks  {location}\n")
+    return out.getvalue()
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Merge sampled rerun profiles into one report")
+    parser.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime, ...)")
+    args = parser.parse_args(argv)
+    print(report(args.directory, top=args.top, sort=args.sort), end="")
+
+
+if __name__ == "__main__":
+    main()
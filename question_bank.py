@@ -0,0 +1,277 @@
+"""
+Process-wide, read-only question bank for the DSA Racing Simulator.
+
+The bank is loaded once per process from the embedded code questions
+below and from questions.json, then indexed by (difficulty, topic,
+language) so a round is drawn with exact lookups and O(k) sampling.
+Reference answers are checked against their tests on the way in.
+The built bank is cached as a marshal file keyed by the sources' mtimes,
+so a cold start with unchanged sources skips parsing, validation and
+indexing (CODERACER_BANK_CACHE=<path>, or 0 to disable).  Large banks can
+instead be served from a sharded, memory-mapped bank directory (see
+sharded_bank.py) named by CODERACER_BANK.
+"""
+
+import json
+import marshal
+import os
+import random
+import sys
+from functools import lru_cache
+from types import MappingProxyType
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS_FILE = os.path.join(HERE, "questions.json")
+CACHE_FILE = os.path.join(HERE, ".cache", "bank.marshal")
+CACHE_VERSION = 2
+# Anything that changes what get_bank() builds
+CACHE_SOURCES = ("question_bank.py", "bank_validation.py", "canonical.py", "grader.py", "native_grader.py")
+
+LANGUAGES = ("Python", "C", "C++")
+DIFFICULTIES = ("Very Easy", "Easy", "Medium", "Hard")
+
+# questions.json difficulty / topic keys -> display labels
+FILE_DIFFICULTIES = {"very_easy": "Very Easy", "easy": "Easy", "medium": "Medium", "hard": "Hard"}
+FILE_TOPICS = {
+    "arrays": "Arrays", "stacks": "Stack", "queues": "Queue", "searching": "Search",
+    "linked_list": "Linked List", "recursion": "Recursion", "sorting": "Sorting",
+    "strings": "Strings", "graphs": "Graphs", "dynamic_programming": "Dynamic Programming",
+    "trees": "Trees", "backtracking": "Backtracking", "advanced": "Advanced",
+}
+
+# HashMap of questions - Write actual code functions
+EMBEDDED_QUESTIONS = {
+    "arrays_very_easy": [
+        {"q": "Write function to find max in array:\ndef find_max(arr):\n    # Your code (return statement only)", "a": "return max(arr)", "topic": "Arrays", "diff": "Very Easy", "tests": [([[3, 1, 2]], 3), ([[-5, -2, -9]], -2), ([[7]], 7)]},
+        {"q": "Write function to sum array:\ndef sum_array(arr):\n    # Your code (return statement only)", "a": "return sum(arr)", "topic": "Arrays", "diff": "Very Easy", "tests": [([[1, 2, 3]], 6), ([[]], 0), ([[-1, 5]], 4)]},
+        {"q": "Write function for array length:\ndef get_length(arr):\n    # Your code (return statement only)", "a": "return len(arr)", "topic": "Arrays", "diff": "Very Easy", "tests": [([[1, 2, 3]], 3), ([[]], 0)]},
+    ],
+    "arrays_easy": [
+        {"q": "Write function to reverse array:\ndef reverse_array(arr):\n    # Your code (return statement only)", "a": "return arr[::-1]", "topic": "Arrays", "diff": "Easy", "tests": [([[1, 2, 3]], [3, 2, 1]), ([[]], [])]},
+        {"q": "Write function to find second max:\ndef second_max(arr):\n    # Your code (return statement only)", "a": "return sorted(arr)[-2]", "topic": "Arrays", "diff": "Easy", "tests": [([[1, 5, 3]], 3), ([[4, 9, 2, 7]], 7)]},
+        {"q": "Write function to count even numbers:\ndef count_evens(arr):\n    # Your code (return statement only)", "a": "return sum(1 for x in arr if x % 2 == 0)", "topic": "Arrays", "diff": "Easy", "tests": [([[1, 2, 3, 4]], 2), ([[1, 3]], 0), ([[]], 0)]},
+    ],
+    "strings_very_easy": [
+        {"q": "Write function to check palindrome:\ndef is_palindrome(s):\n    # Your code (return statement only)", "a": "return s == s[::-1]", "topic": "Strings", "diff": "Very Easy", "tests": [(["racecar"], True), (["abc"], False), ([""], True)]},
+        {"q": "Write function to get string length:\ndef str_length(s):\n    # Your code (return statement only)", "a": "return len(s)", "topic": "Strings", "diff": "Very Easy", "tests": [(["hello"], 5), ([""], 0)]},
+    ],
+    "strings_easy": [
+        {"q": "Write function to reverse string:\ndef reverse_string(s):\n    # Your code (return statement only)", "a": "return s[::-1]", "topic": "Strings", "diff": "Easy", "tests": [(["abc"], "cba"), ([""], "")]},
+        {"q": "Write function to count vowels:\ndef count_vowels(s):\n    # Your code (return statement only)", "a": "return sum(1 for c in s.lower() if c in 'aeiou')", "topic": "Strings", "diff": "Easy", "tests": [(["Hello"], 2), (["xyz"], 0), (["AEIOU"], 5)]},
+    ],
+    "stacks_very_easy": [
+        {"q": "Write function to implement stack push:\ndef push(stack, item):\n    # Your code (return modified stack)", "a": "return stack + [item]", "topic": "Stack", "diff": "Very Easy", "tests": [([[1, 2], 3], [1, 2, 3]), ([[], 1], [1])]},
+        {"q": "Write function for stack pop:\ndef pop(stack):\n    # Your code (return stack[:-1])", "a": "return stack[:-1]", "topic": "Stack", "diff": "Very Easy", "tests": [([[1, 2, 3]], [1, 2]), ([[1]], [])]},
+    ],
+    "stacks_easy": [
+        {"q": "Write function to check balanced parentheses:\ndef is_balanced(s):\n    # Your code (return True/False)", "a": "return s.count('(') == s.count(')')", "topic": "Stack", "diff": "Easy", "tests": [(["(())"], True), (["(()"], False), ([""], True)]},
+        {"q": "Write function for queue dequeue:\ndef dequeue(queue):\n    # Your code (return queue[1:])", "a": "return queue[1:]", "topic": "Queue", "diff": "Easy", "tests": [([[1, 2, 3]], [2, 3]), ([[1]], [])]},
+    ],
+    "searching_very_easy": [
+        {"q": "Write linear search function:\ndef linear_search(arr, target):\n    # Your code (return index or -1)", "a": "return arr.index(target) if target in arr else -1", "topic": "Search", "diff": "Very Easy", "tests": [([[4, 5, 6], 5], 1), ([[4, 5, 6], 9], -1)]},
+        {"q": "Write function to check if element exists:\ndef exists(arr, x):\n    # Your code (return True/False)", "a": "return x in arr", "topic": "Search", "diff": "Very Easy", "tests": [([[1, 2, 3], 2], True), ([[1, 2, 3], 4], False)]},
+    ],
+    "searching_easy": [
+        {"q": "Write binary search (assume sorted):\ndef binary_search(arr, target):\n    # Return index using bisect", "a": "import bisect; return bisect.bisect_left(arr, target)", "topic": "Search", "diff": "Easy", "tests": [([[1, 3, 5, 7], 5], 2), ([[1, 3, 5, 7], 1], 0)]},
+    ],
+    "recursion_easy": [
+        {"q": "Write recursive factorial:\ndef factorial(n):\n    # Your code (single line)", "a": "return 1 if n <= 1 else n * factorial(n-1)", "topic": "Recursion", "diff": "Easy", "tests": [([0], 1), ([1], 1), ([5], 120)]},
+        {"q": "Write recursive fibonacci:\ndef fib(n):\n    # Your code (single line)", "a": "return n if n <= 1 else fib(n-1) + fib(n-2)", "topic": "Recursion", "diff": "Easy", "tests": [([0], 0), ([1], 1), ([10], 55)]},
+    ],
+    "sorting_easy": [
+        {"q": "Write function to sort array:\ndef sort_array(arr):\n    # Your code (return statement)", "a": "return sorted(arr)", "topic": "Sorting", "diff": "Easy", "tests": [([[3, 1, 2]], [1, 2, 3]), ([[]], [])]},
+        {"q": "Write function to sort descending:\ndef sort_desc(arr):\n    # Your code (return statement)", "a": "return sorted(arr, reverse=True)", "topic": "Sorting", "diff": "Easy", "tests": [([[3, 1, 2]], [3, 2, 1]), ([[]], [])]},
+    ],
+    "trees_hard": [
+        {"q": "Write BFS traversal skeleton:\ndef bfs(root):\n    # What data structure? (queue/stack)", "a": "queue", "topic": "Trees", "diff": "Hard"},
+        {"q": "Write DFS traversal skeleton:\ndef dfs(root):\n    # What data structure? (queue/stack)", "a": "stack", "topic": "Trees", "diff": "Hard"},
+    ],
+}
+
+
+def _freeze(question):
+    """Read-only view of a question; test cases become tuples"""
+    question = dict(question)
+    if "tests" in question:
+        question["tests"] = tuple((tuple(args), expected) for args, expected in question["tests"])
+    return MappingProxyType(question)
+
+
+def embedded_questions():
+    """Yield the embedded code questions with their stable ids"""
+    for key, questions in EMBEDDED_QUESTIONS.items():
+        for index, question in enumerate(questions):
+            yield dict(question, id=f"{key}:{index}")
+
+
+def file_questions(path=QUESTIONS_FILE):
+    """Yield questions.json entries converted to the embedded layout"""
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    for diff_key, topics in data.items():
+        diff = FILE_DIFFICULTIES.get(diff_key, diff_key.replace("_", " ").title())
+        for topic_key, questions in topics.items():
+            topic = FILE_TOPICS.get(topic_key, topic_key.replace("_", " ").title())
+            for index, entry in enumerate(questions):
+                yield {
+                    "id": f"json/{diff_key}/{topic_key}:{index}",
+                    "q": entry["question"],
+                    "a": entry["answer"],
+                    "topic": topic,
+                    "diff": diff,
+                }
+
+
+def floyd_sample(n, k, rng):
+    """k distinct indices from range(n) in O(k) time and space"""
+    k = min(k, n)
+    chosen = []
+    seen = set()
+    for j in range(n - k, n):
+        t = rng.randint(0, j)
+        pick = j if t in seen else t
+        seen.add(pick)
+        chosen.append(pick)
+    rng.shuffle(chosen)
+    return chosen
+
+
+class QuestionBank:
+    """Immutable questions indexed by (difficulty, topic, language)"""
+    # Validated reference answers by id (see bank_validation.py)
+    references = MappingProxyType({})
+
+    def __init__(self, questions):
+        import native_grader
+        by_id = {}
+        index = {}
+        for raw in questions:
+            question = _freeze(raw)
+            by_id[question["id"]] = question
+            for language in LANGUAGES:
+                if not native_grader.supports(question, language):
+                    continue
+                # topic None is the Mixed bucket for a difficulty
+                for topic in (question["topic"], None):
+                    index.setdefault((question["diff"], topic, language), []).append(question)
+        topics = {}
+        for difficulty, topic, language in index:
+            if topic is not None:
+                topics.setdefault((difficulty, language), []).append(topic)
+        self.questions = MappingProxyType(by_id)
+        self._index = MappingProxyType({key: tuple(bucket) for key, bucket in index.items()})
+        self._topics = MappingProxyType({key: tuple(sorted(names)) for key, names in topics.items()})
+
+    def __len__(self):
+        return len(self.questions)
+
+    def get(self, question_id):
+        return self.questions.get(question_id)
+
+    def bucket(self, difficulty, topic=None, language="Python"):
+        """Every question for an exact (difficulty, topic, language) key"""
+        return self._index.get((difficulty, topic, language), ())
+
+    def topics(self, difficulty, language="Python"):
+        return self._topics.get((difficulty, language), ())
+
+    def sample(self, difficulty, topic=None, language="Python", k=15, rng=random):
+        """Up to k distinct questions in random order"""
+        bucket = self.bucket(difficulty, topic, language)
+        return [bucket[i] for i in floyd_sample(len(bucket), k, rng)]
+
+
+# ===========================
+# PRECOMPILED CACHE
+# ===========================
+
+def cache_key():
+    """Everything a cached bank depends on; any change rebuilds it"""
+    files = [os.path.join(HERE, name) for name in CACHE_SOURCES] + [QUESTIONS_FILE]
+    stamps = []
+    for path in files:
+        try:
+            stat = os.stat(path)
+            stamps.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append((os.path.basename(path), 0, 0))
+    # marshal's code format changes between Python versions
+    return (CACHE_VERSION, sys.version, os.environ.get("CODERACER_VALIDATE", "quarantine"), tuple(stamps))
+
+
+def dump_bank(bank, path, key):
+    """Write the bank's tables to path atomically (best effort)"""
+    payload = {
+        "key": key,
+        "questions": [dict(q) for q in bank.questions.values()],
+        "index": {k: tuple(q["id"] for q in bucket) for k, bucket in bank._index.items()},
+        "topics": dict(bank._topics),
+        "references": {qid: (ref.name, ref.hash) for qid, ref in bank.references.items()},
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            marshal.dump(payload, f)
+        os.replace(tmp, path)
+    except OSError:
+        # A read-only checkout just starts cold every time
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load_bank(path, key):
+    """The cached bank if it was built from the same sources, else None"""
+    try:
+        with open(path, "rb") as f:
+            payload = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(payload, dict) or payload.get("key") != key:
+        return None
+    from bank_validation import Reference
+    by_id = {q["id"]: MappingProxyType(q) for q in payload["questions"]}
+    bank = QuestionBank.__new__(QuestionBank)
+    bank.questions = MappingProxyType(by_id)
+    bank._index = MappingProxyType({
+        k: tuple(by_id[qid] for qid in ids) for k, ids in payload["index"].items()
+    })
+    bank._topics = MappingProxyType(payload["topics"])
+    bank.references = MappingProxyType({
+        qid: Reference(*fields) for qid, fields in payload["references"].items()
+    })
+    return bank
+
+
+def build_bank():
+    """Parse, validate and index the embedded questions and questions.json"""
+    from bank_validation import validated
+    questions = list(embedded_questions())
+    questions.extend(file_questions())
+    questions, references = validated(questions)
+    bank = QuestionBank(questions)
+    bank.references = references
+    return bank
+
+
+@lru_cache(maxsize=None)
+def get_bank():
+    """The process-wide bank, from the cache when its sources are unchanged"""
+    directory = os.environ.get("CODERACER_BANK")
+    if directory:
+        from sharded_bank import ShardedBank
+        return ShardedBank(directory)
+    path = os.environ.get("CODERACER_BANK_CACHE", CACHE_FILE)
+    if path in ("", "0"):
+        return build_bank()
+    key = cache_key()
+    bank = load_bank(path, key)
+    if bank is None:
+        bank = build_bank()
+        dump_bank(bank, path, key)
+    return bank
@@ -0,0 +1,106 @@
+"""
+Blocking client for race_server.py, used by the Streamlit page.
+
+A background thread reads the server's newline-delimited JSON and folds
+each delta into ``players``; the page only reads that state and sends
+answers, so it never simulates the race itself.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+from engine import OBSTACLE_START_DISTANCE, OBSTACLE_TICK_SECONDS
+
+DEFAULT_SERVER = "127.0.0.1:8765"
+
+
+class RoomClient:
+    """One player's connection to a race room"""
+    def __init__(self, room, name, server=None, difficulty="Easy", language="Python"):
+        host, _, port = (server or os.environ.get("CODERACER_RACE_SERVER", DEFAULT_SERVER)).rpartition(":")
+        self.sock = socket.create_connection((host, int(port)), timeout=5)
+        self.sock.settimeout(None)
+        self.room = room
+        self.player = None
+        self.players = {}
+        self.questions = []
+        self.standings = []
+        self.last_result = None
+        self.room_state = "lobby"
+        self.server_offset = 0.0        # server clock minus local clock
+        self.closed = False
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, name=f"room-{room}", daemon=True)
+        self._reader.start()
+        self.send({"op": "join", "room": room, "name": name,
+                   "difficulty": difficulty, "language": language})
+
+    def send(self, message):
+        data = json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._send_lock:
+            self.sock.sendall(data)
+
+    def start(self):
+        self.send({"op": "start"})
+
+    def answer(self, text):
+        self.send({"op": "answer", "text": text})
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _read_loop(self):
+        stream = self.sock.makefile("rb")
+        try:
+            for line in stream:
+                self._apply(json.loads(line))
+        except (OSError, ValueError):
+            pass
+        self.closed = True
+
+    def _apply(self, message):
+        op = message.get("op")
+        if op == "welcome":
+            self.player = message["player"]
+            self.players = message["players"]
+            self.room_state = message["room"]["state"]
+        elif op == "round":
+            self.questions = message["questions"]
+            self.standings = []
+            self.last_result = None
+            self.room_state = "racing"
+        elif op == "delta":
+            self.server_offset = message["now"] - time.monotonic()
+            for player_id, changes in message["players"].items():
+                self.players.setdefault(player_id, {}).update(changes)
+        elif op == "result":
+            self.last_result = message
+        elif op == "finished":
+            self.standings = message["standings"]
+            self.room_state = "lobby"
+
+    # Views ------------------------------------------------------------------
+
+    @property
+    def me(self):
+        return self.players.get(self.player, {})
+
+    def current_question(self):
+        index = self.me.get("q", 0)
+        return self.questions[index - 1] if 0 < index <= len(self.questions) else None
+
+    def obstacle_view(self):
+        """(distance, eta seconds, lane) of this player's obstacle, from server time"""
+        _, lane, speed, spawn = self.me.get("obstacle", [0, "center", 5, 0.0])
+        now = time.monotonic() + self.server_offset
+        ticks = (now - spawn) / OBSTACLE_TICK_SECONDS
+        distance = max(0.0, OBSTACLE_START_DISTANCE - speed * ticks)
+        eta = distance / speed * OBSTACLE_TICK_SECONDS
+        return distance, eta, lane
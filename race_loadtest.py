@@ -0,0 +1,202 @@
+"""
+Local load test for race_server.py.
+
+Starts the server in its own process, connects rooms x players scripted
+clients from this process, plays for a while, and prints a JSON report:
+server tick time, late ticks, delta latency and server CPU use.
+
+    python race_loadtest.py --rooms 300 --players 4 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from question_bank import get_bank
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _cpu_seconds(pid):
+    """utime + stime of a process from /proc (Linux); None elsewhere"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Player:
+    """Scripted client: answers each new question after a think time"""
+    def __init__(self, port, room, index, accuracy, think_time, rng, latencies):
+        self.port = port
+        self.room = room
+        self.index = index
+        self.accuracy = accuracy
+        self.think_time = think_time
+        self.rng = rng
+        self.latencies = latencies
+        self.player = None
+        self.questions = []
+        self.question = 0
+        self.messages = 0
+        self.bytes = 0
+
+    async def send(self, writer, message):
+        writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await writer.drain()
+
+    async def run(self, stop_at):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        await self.send(writer, {"op": "join", "room": self.room, "name": f"bot{self.index}"})
+        pending = None
+        bank = get_bank()
+        try:
+            while time.monotonic() < stop_at:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), timeout=max(0.01, stop_at - time.monotonic()))
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break
+                received = time.monotonic()
+                self.messages += 1
+                self.bytes += len(line)
+                message = json.loads(line)
+                op = message["op"]
+                if op == "welcome":
+                    self.player = message["player"]
+                    if self.index == 0:
+                        await asyncio.sleep(0.2)        # let the room fill
+                        await self.send(writer, {"op": "start"})
+                elif op == "round":
+                    self.questions = message["questions"]
+                elif op == "delta":
+                    # Server and clients share the host's monotonic clock
+                    self.latencies.append(received - message["now"])
+                    mine = message["players"].get(self.player, {})
+                    if "q" in mine and mine["q"] != self.question:
+                        self.question = mine["q"]
+                        if pending:
+                            pending.cancel()
+                        pending = asyncio.create_task(self.answer_later(writer, bank))
+                elif op == "finished" and self.index == 0:
+                    await self.send(writer, {"op": "start"})
+        finally:
+            if pending:
+                pending.cancel()
+            writer.close()
+
+    async def answer_later(self, writer, bank):
+        await asyncio.sleep(self.rng.expovariate(1.0 / self.think_time))
+        question = bank.get(self.questions[self.question - 1]["id"]) if self.questions else None
+        if question is None:
+            return
+        text = question["a"] if self.rng.random() < self.accuracy else "pass"
+        await self.send(writer, {"op": "answer", "text": text})
+
+
+async def fetch_stats(port):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b'{"op":"stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run_clients(port, rooms, players, duration, accuracy, think_time, seed):
+    rng = random.Random(seed)
+    latencies = []
+    stop_at = time.monotonic() + duration
+    clients = [
+        Player(port, f"room-{r}", p, accuracy, think_time, random.Random(rng.getrandbits(32)), latencies)
+        for r in range(rooms) for p in range(players)
+    ]
+    tasks = []
+    for client in clients:
+        tasks.append(asyncio.create_task(client.run(stop_at)))
+        await asyncio.sleep(0)
+    stats = None
+    await asyncio.sleep(max(0.0, stop_at - time.monotonic() - 1.0))
+    stats = await fetch_stats(port)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return clients, latencies, stats
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the race room server")
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of play")
+    parser.add_argument("--accuracy", type=float, default=0.7)
+    parser.add_argument("--think-time", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0, help="use a running server instead of starting one")
+    args = parser.parse_args(argv)
+
+    server = None
+    port = args.port
+    if not port:
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(HERE, "race_server.py"), "--port", str(port)])
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+    cpu_before = _cpu_seconds(server.pid) if server else None
+    started = time.monotonic()
+    try:
+        clients, latencies, stats = asyncio.run(run_clients(
+            port, args.rooms, args.players, args.duration, args.accuracy, args.think_time, args.seed
+        ))
+        elapsed = time.monotonic() - started
+        cpu_after = _cpu_seconds(server.pid) if server else None
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = {
+        "rooms": args.rooms,
+        "players": args.rooms * args.players,
+        "duration_s": round(elapsed, 1),
+        "server": stats,
+        "server_cpu_fraction": round((cpu_after - cpu_before) / elapsed, 3) if cpu_before is not None else None,
+        "messages_received": sum(c.messages for c in clients),
+        "messages_per_second": round(sum(c.messages for c in clients) / elapsed, 1),
+        "bytes_per_player_per_second": round(sum(c.bytes for c in clients) / elapsed / len(clients), 1),
+        "delta_latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
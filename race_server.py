@@ -0,0 +1,486 @@
+"""
+Multiplayer race rooms served over asyncio.
+
+Every player in a room gets the same question sequence and the same
+obstacle schedule (lane and speed by obstacle number).  The server owns the
+authoritative engines.  Each engine's next obstacle impact or question
+deadline sits on one shared timer wheel; the fixed-rate ticker advances
+the wheel, so only engines with something due are touched, and each room's
+subscribers get only the fields that changed.  The protocol
+is newline-delimited JSON over TCP:
+
+    -> {"op": "join", "room": "lobby-1", "name": "ada"}
+    <- {"op": "welcome", "player": "p1", "room": {...}, "players": {...}}
+    -> {"op": "start"}                       (any player starts a race)
+    <- {"op": "round", "questions": [{"id", "q", "topic", "diff"}, ...]}
+    <- {"op": "delta", "tick": 412, "now": 41.2, "players": {"p1": {"score": 20}}}
+    -> {"op": "answer", "text": "return max(arr)"}
+    <- {"op": "result", "correct": true, "feedback": "..."}
+    <- {"op": "finished", "standings": [...]}
+
+    python race_server.py --port 8765
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from engine import DEFAULT_RULES, LANES, OBSTACLE_START_DISTANCE, GameEngine, QuestionManager
+from question_bank import DIFFICULTIES, LANGUAGES, get_bank
+from timer_wheel import TimerWheel
+
+TICK_SECONDS = 0.1
+MAX_BUFFERED_BYTES = 256 * 1024     # slower subscribers are dropped
+TICK_HISTORY = 1000
+
+
+# ===========================
+# ROOM ENGINES
+# ===========================
+
+class RoomQuestions(QuestionManager):
+    """Serves the room's fixed question sequence instead of the scheduler"""
+    __slots__ = ("room", "index")
+
+    def __init__(self, room):
+        super().__init__(room.bank)
+        self.room = room
+        self.index = 0
+
+    def prepare_questions(self, difficulty, mode, language="Python", rng=random, k=15):
+        self.index = 0
+        self.current_question = None
+
+    def get_next_question(self):
+        questions = self.room.questions
+        self.current_question = questions[self.index] if self.index < len(questions) else None
+        if self.current_question is not None:
+            self.index += 1
+        self.answered = False
+        return self.current_question
+
+    def record_answer(self, correct, elapsed):
+        self.answered = True
+
+
+class RoomEngine(GameEngine):
+    """A player's engine that takes its obstacles from the room schedule"""
+    __slots__ = ("room", "obstacle_index", "crashes", "name", "timer")
+
+    def __init__(self, room, name, clock):
+        super().__init__(clock=clock, rng=random.Random(), bank=room.bank)
+        self.room = room
+        self.name = name
+        self.obstacle_index = 0
+        self.crashes = 0
+        self.timer = None
+        self.qm = RoomQuestions(room)
+        self.difficulty = room.difficulty
+        self.mode = "Mixed"
+        self.language = room.language
+
+    def start_game(self):
+        self.obstacle_index = 0
+        self.crashes = 0
+        super().start_game()
+
+    def spawn_obstacle(self, now=None):
+        self.obstacle_approaching = True
+        self.obstacle_distance = OBSTACLE_START_DISTANCE
+        self.obstacle_spawn_time = self.clock() if now is None else now
+        self.obstacle_lane, self.obstacle_speed = self.room.obstacle(self.obstacle_index)
+        self.obstacle_index += 1
+
+    def crash(self):
+        super().crash()
+        self.crashes += 1
+
+    def public(self):
+        """Fields every subscriber sees; distance is derived client-side"""
+        return {
+            "name": self.name,
+            "state": self.game_state,
+            "lane": self.car_lane,
+            "lives": self.lives.get_count() if self.lives else 0,
+            "score": self.score,
+            "streak": self.streak,
+            "crashes": self.crashes,
+            "q": self.qm.index,
+            "obstacle": [self.obstacle_index, self.obstacle_lane, self.obstacle_speed,
+                         round(self.obstacle_spawn_time or 0.0, 3)],
+        }
+
+
+class Room:
+    """Authoritative state of one race room"""
+    def __init__(self, name, clock, bank=None, difficulty="Easy", language="Python", seed=None,
+                 timers=None, changed_rooms=None):
+        self.name = name
+        self.clock = clock
+        # A standalone room runs its own wheel; the server passes its shared one
+        self.own_timers = timers is None
+        self.timers = timers if timers is not None else TimerWheel(TICK_SECONDS, start=clock())
+        self.changed_rooms = changed_rooms if changed_rooms is not None else set()
+        self.bank = bank if bank is not None else get_bank()
+        self.difficulty = difficulty
+        self.language = language
+        self.rng = random.Random(seed)
+        self.state = "lobby"
+        self.questions = []
+        self.obstacles = []
+        self.players = {}
+        self.subscribers = {}
+        self.last_public = {}
+        self.dirty = set()          # players whose public fields may have changed
+        self.racing = 0             # engines still playing this round
+        self.round_seed = None
+
+    def obstacle(self, index):
+        """(lane, speed) of obstacle number ``index``, the same for everyone"""
+        while len(self.obstacles) <= index:
+            self.obstacles.append((self.rng.choice(LANES), self.rng.randint(*DEFAULT_RULES.speed_range)))
+        return self.obstacles[index]
+
+    def add_player(self, player_id, name, writer):
+        engine = RoomEngine(self, name, self.clock)
+        self.players[player_id] = engine
+        self.subscribers[player_id] = writer
+        self.last_public[player_id] = engine.public()
+        return engine
+
+    def remove_player(self, player_id):
+        engine = self.players.pop(player_id, None)
+        self.subscribers.pop(player_id, None)
+        self.last_public.pop(player_id, None)
+        self.dirty.discard(player_id)
+        if engine is not None:
+            self.timers.cancel(engine.timer)
+            if engine.game_state == "playing":
+                self.racing -= 1
+                self.mark(None)     # the round may be over now
+
+    def mark(self, player_id):
+        """Queue a player (or just the room, for None) for the next tick's delta"""
+        if player_id is not None:
+            self.dirty.add(player_id)
+        self.changed_rooms.add(self)
+
+    def schedule(self, player_id):
+        """Put the engine's next impact or deadline on the wheel"""
+        engine = self.players[player_id]
+        self.timers.cancel(engine.timer)
+        at = engine.next_event_time()
+        engine.timer = None if at is None else self.timers.schedule(
+            at, lambda due: self._expire(player_id, due)
+        )
+
+    def _expire(self, player_id, due):
+        engine = self.players.get(player_id)
+        if engine is None:
+            return
+        engine.timer = None
+        self.catch_up(player_id, due)
+
+    def catch_up(self, player_id, now):
+        """Resolve the impacts and deadlines a player has passed by ``now``"""
+        engine = self.players[player_id]
+        if engine.game_state != "playing":
+            return
+        engine.update_game(now)
+        if engine.game_state != "playing":
+            self.racing -= 1
+        self.mark(player_id)
+        self.schedule(player_id)
+
+    def answered(self, player_id):
+        """An answer pulls the obstacle's impact forward to now"""
+        if player_id in self.players:
+            self.mark(player_id)
+            self.schedule(player_id)
+
+    def start(self):
+        """New round: fresh questions and obstacles, every engine starts now"""
+        self.round_seed = self.rng.getrandbits(32)
+        round_rng = random.Random(self.round_seed)
+        self.questions = self.bank.sample(self.difficulty, None, self.language,
+                                          k=DEFAULT_RULES.round_size, rng=round_rng)
+        self.obstacles = []
+        self.rng = round_rng
+        for player_id, engine in self.players.items():
+            engine.start_game()
+            self.schedule(player_id)
+            self.mark(player_id)
+        self.racing = sum(engine.game_state == "playing" for engine in self.players.values())
+        self.state = "racing"
+        return {
+            "op": "round",
+            "seed": self.round_seed,
+            "questions": [{"id": q["id"], "q": q["q"], "topic": q["topic"], "diff": q["diff"]}
+                          for q in self.questions],
+        }
+
+    def tick(self, now):
+        """Delta of the players touched since the last tick; returns (delta or None, finished or None)"""
+        if self.own_timers:
+            self.timers.advance(now)
+        changed = {}
+        for player_id in self.dirty:
+            engine = self.players.get(player_id)
+            if engine is None:
+                continue
+            current = engine.public()
+            previous = self.last_public[player_id]
+            diff = {key: value for key, value in current.items() if previous.get(key) != value}
+            if diff:
+                changed[player_id] = diff
+                self.last_public[player_id] = current
+        self.dirty.clear()
+        message = None
+        if changed:
+            message = {"op": "delta", "now": round(now, 3), "players": changed}
+        if self.state == "racing" and self.racing <= 0:
+            self.state = "lobby"
+            return message, {"op": "finished", "standings": self.standings()}
+        return message, None
+
+    def standings(self):
+        ranked = sorted(self.players.items(), key=lambda item: item[1].score, reverse=True)
+        return [{"player": pid, "name": e.name, "score": e.score, "crashes": e.crashes} for pid, e in ranked]
+
+    def snapshot(self):
+        return {"name": self.name, "state": self.state, "difficulty": self.difficulty,
+                "language": self.language, "round": self.round_seed}
+
+
+# ===========================
+# SERVER
+# ===========================
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+class RaceServer:
+    """Owns the rooms, the connections and the fixed-rate ticker"""
+    def __init__(self, tick_seconds=TICK_SECONDS, clock=time.monotonic, grader=None, verdict_cache=None):
+        self.tick_seconds = tick_seconds
+        self.clock = clock
+        self.grader = grader
+        self.verdict_cache = verdict_cache
+        self._toolchain = None
+        self._native = {}
+        self.timers = TimerWheel(tick_seconds, start=clock())
+        self.changed_rooms = set()
+        self.rooms = {}
+        self._ids = itertools.count(1)
+        self.ticks = 0
+        self.tick_durations = []
+        self.late_ticks = 0
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self._server = None
+        self._ticker = None
+
+    # Fan-out --------------------------------------------------------------
+
+    def broadcast(self, room, message):
+        if message is None:
+            return
+        data = encode(message)      # serialized once per room, not per player
+        for player_id, writer in list(room.subscribers.items()):
+            self.send_bytes(writer, data)
+
+    def send(self, writer, message):
+        self.send_bytes(writer, encode(message))
+
+    def send_bytes(self, writer, data):
+        if writer.is_closing():
+            return
+        if writer.transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+            writer.close()
+            return
+        writer.write(data)
+        self.messages_sent += 1
+        self.bytes_sent += len(data)
+
+    async def run_ticker(self):
+        next_tick = self.clock()
+        while True:
+            next_tick += self.tick_seconds
+            start = self.clock()
+            self.timers.advance(start)
+            changed = list(self.changed_rooms)
+            self.changed_rooms.clear()
+            for room in changed:
+                if room.state != "racing":
+                    room.dirty.clear()
+                    continue
+                delta, finished = room.tick(start)
+                if delta is not None:
+                    delta["tick"] = self.ticks
+                self.broadcast(room, delta)
+                self.broadcast(room, finished)
+            self.ticks += 1
+            duration = self.clock() - start
+            self.tick_durations.append(duration)
+            if len(self.tick_durations) > TICK_HISTORY:
+                del self.tick_durations[:TICK_HISTORY // 2]
+            delay = next_tick - self.clock()
+            if delay < 0:
+                self.late_ticks += 1
+                next_tick = self.clock()        # don't try to catch up a backlog
+                delay = 0
+            await asyncio.sleep(delay)
+
+    # Connections ----------------------------------------------------------
+
+    async def handle(self, reader, writer):
+        player_id = None
+        room = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    self.send(writer, {"op": "error", "detail": "bad json"})
+                    continue
+                op = message.get("op")
+                if op == "join" and room is None:
+                    difficulty = message.get("difficulty", "Easy")
+                    language = message.get("language", "Python")
+                    if difficulty not in DIFFICULTIES or language not in LANGUAGES:
+                        self.send(writer, {"op": "error", "detail": f"unknown difficulty or language: "
+                                                                    f"{difficulty!r}, {language!r}"})
+                        await writer.drain()
+                        continue
+                    player_id = f"p{next(self._ids)}"
+                    name = str(message.get("room", "lobby"))[:64]
+                    room = self.rooms.get(name)
+                    if room is None:
+                        room = self.rooms[name] = Room(
+                            name, self.clock, difficulty=difficulty, language=language,
+                            timers=self.timers, changed_rooms=self.changed_rooms,
+                        )
+                    room.add_player(player_id, str(message.get("name", player_id))[:32], writer)
+                    self.send(writer, {
+                        "op": "welcome", "player": player_id, "room": room.snapshot(),
+                        "players": {pid: dict(state) for pid, state in room.last_public.items()},
+                    })
+                elif op == "start" and room is not None:
+                    if room.state != "racing":
+                        self.broadcast(room, room.start())
+                elif op == "answer" and room is not None:
+                    await self.answer(room, player_id, writer, str(message.get("text", "")))
+                elif op == "stats":
+                    self.send(writer, {"op": "stats", **self.stats()})
+                else:
+                    self.send(writer, {"op": "error", "detail": f"unexpected {op!r}"})
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if room is not None:
+                room.remove_player(player_id)
+                if not room.players:
+                    self.rooms.pop(room.name, None)
+            writer.close()
+
+    def grader_for(self, language):
+        """The room language's grader; None grades by text comparison"""
+        if self.grader is None or language == "Python":
+            return self.grader
+        grader = self._native.get(language)
+        if grader is None:
+            from native_grader import NativeGrader, NativeToolchain
+            if self._toolchain is None:
+                self._toolchain = NativeToolchain.from_env()
+            grader = self._native[language] = NativeGrader(self._toolchain, language)
+        return grader
+
+    async def answer(self, room, player_id, writer, text):
+        engine = room.players.get(player_id)
+        if engine is None:
+            return
+        # An obstacle that hit before the answer arrived is resolved first
+        room.catch_up(player_id, self.clock())
+        if engine.game_state != "playing":
+            return
+        question = engine.qm.current_question
+        grader = self.grader_for(room.language)
+        if text and grader is not None and question.get("tests"):
+            # Sandboxed grading blocks; only the grading leaves the event loop,
+            # the engine itself is only ever touched here and by the ticker
+            loop = asyncio.get_running_loop()
+            graded = await loop.run_in_executor(
+                None, engine.qm.grade, question, text, grader, self.verdict_cache
+            )
+            if room.players.get(player_id) is not engine:
+                return
+            room.catch_up(player_id, self.clock())
+            if engine.game_state != "playing" or engine.qm.current_question is not question:
+                self.send(writer, {"op": "result", "correct": False,
+                                   "feedback": "⏰ Too late: the race moved on while grading"})
+                return
+        else:
+            graded = engine.qm.grade(question, text)
+        correct = engine.submit_answer(text, graded=graded)
+        room.answered(player_id)
+        self.send(writer, {"op": "result", "correct": correct, "feedback": engine.feedback})
+
+    def stats(self):
+        durations = sorted(self.tick_durations)
+
+        def pct(p):
+            return round(durations[min(len(durations) - 1, int(p * len(durations)))] * 1000, 3) if durations else 0.0
+        return {
+            "rooms": len(self.rooms),
+            "racing": sum(room.state == "racing" for room in self.rooms.values()),
+            "players": sum(len(room.players) for room in self.rooms.values()),
+            "ticks": self.ticks,
+            "timers": len(self.timers),
+            "timers_fired": self.timers.fired,
+            "late_ticks": self.late_ticks,
+            "tick_p50_ms": pct(0.50),
+            "tick_p99_ms": pct(0.99),
+            "tick_max_ms": round(durations[-1] * 1000, 3) if durations else 0.0,
+            "messages_sent": self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+        }
+
+    async def start(self, host="127.0.0.1", port=8765):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        self._ticker = asyncio.create_task(self.run_ticker())
+        return self._server
+
+    async def serve_forever(self, host="127.0.0.1", port=8765):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve multiplayer race rooms")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick", type=float, default=TICK_SECONDS, help="seconds between room updates")
+    args = parser.parse_args(argv)
+    from canonical import VerdictCache
+    from grader import SandboxPool
+    grader = SandboxPool.from_env()
+    server = RaceServer(tick_seconds=args.tick, grader=grader, verdict_cache=VerdictCache())
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        grader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Rank and percentile index over historical scores.
+
+Each (difficulty, mode) group keeps a Fenwick tree of score counts, so
+"how many runs scored below X", "what rank is X" and "the k-th best
+score" are O(log S) for S distinct score values, however many millions
+of runs have been recorded.
+"""
+
+
+class FenwickTree:
+    """Binary indexed tree of counts at non-negative integer positions"""
+    __slots__ = ("size", "tree", "total")
+
+    def __init__(self, size=1024):
+        self.size = 1
+        while self.size < size:
+            self.size *= 2
+        self.tree = [0] * (self.size + 1)
+        self.total = 0
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Build in O(S) from a {position: count} mapping"""
+        fenwick = cls(max(counts, default=0) + 1)
+        tree = fenwick.tree
+        for position, count in counts.items():
+            tree[position + 1] += count
+        for i in range(1, fenwick.size + 1):
+            parent = i + (i & -i)
+            if parent <= fenwick.size:
+                tree[parent] += tree[i]
+        fenwick.total = sum(counts.values())
+        return fenwick
+
+    def _grow(self, position):
+        # Doubling a power-of-two tree only adds one non-zero node: the new root
+        while position >= self.size:
+            self.tree.extend([0] * self.size)
+            self.size *= 2
+            self.tree[self.size] = self.total
+
+    def add(self, position, count=1):
+        if position >= self.size:
+            self._grow(position)
+        self.total += count
+        i = position + 1
+        while i <= self.size:
+            self.tree[i] += count
+            i += i & -i
+
+    def count_at_most(self, position):
+        """Number of entries at positions <= position"""
+        if position < 0:
+            return 0
+        i = min(position + 1, self.size)
+        result = 0
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def select(self, k):
+        """Smallest position whose prefix count reaches k (1-based)"""
+        if not 1 <= k <= self.total:
+            raise IndexError("rank out of range")
+        position = 0
+        step = self.size
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step //= 2
+        return position
+
+
+class ScoreIndex:
+    """Per (difficulty, mode) Fenwick trees, plus one across all runs"""
+    __slots__ = ("groups",)
+
+    def __init__(self):
+        self.groups = {}
+
+    @classmethod
+    def from_counts(cls, rows):
+        """Build from (difficulty, mode, score, count) rows"""
+        grouped = {}
+        for difficulty, mode, score, count in rows:
+            score = max(0, int(score))
+            for key in ((difficulty, mode), (None, None)):
+                counts = grouped.setdefault(key, {})
+                counts[score] = counts.get(score, 0) + count
+        index = cls()
+        index.groups = {key: FenwickTree.from_counts(counts) for key, counts in grouped.items()}
+        return index
+
+    def add(self, score, difficulty, mode, count=1):
+        score = max(0, int(score))
+        for key in ((difficulty, mode), (None, None)):
+            tree = self.groups.get(key)
+            if tree is None:
+                tree = self.groups[key] = FenwickTree()
+            tree.add(score, count)
+
+    def count(self, difficulty=None, mode=None):
+        tree = self.groups.get((difficulty, mode))
+        return tree.total if tree else 0
+
+    def rank(self, score, difficulty=None, mode=None):
+        """1 + number of runs that scored strictly higher"""
+        tree = self.groups.get((difficulty, mode))
+        if tree is None:
+            return 1
+        return 1 + tree.total - tree.count_at_most(int(score))
+
+    def percentile(self, score, difficulty=None, mode=None):
+        """Percentage of runs that scored strictly lower (0-100)"""
+        tree = self.groups.get((difficulty, mode))
+        if tree is None or not tree.total:
+            return 100.0
+        return 100.0 * tree.count_at_most(int(score) - 1) / tree.total
+
+    def top(self, k, difficulty=None, mode=None):
+        """The k best scores, highest first"""
+        tree = self.groups.get((difficulty, mode))
+        if tree is None:
+            return []
+        return [tree.select(tree.total - r) for r in range(min(k, tree.total))]
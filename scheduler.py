@@ -0,0 +1,140 @@
+"""
+Adaptive per-player question scheduling.
+
+A lightweight spaced-repetition scheduler: every question a player has
+seen gets a card with its accuracy, answer time, ease and next due step
+(steps count questions served).  Due cards sit in a min-heap; when none
+is due a fresh question is drawn from the bucket with a lazy Fisher-Yates
+shuffle, so picking the next question is O(log n) in the cards seen and
+O(1) in the bank size, and nothing is stored for questions never served.
+"""
+
+import heapq
+import random
+
+# Steps until a question is shown again
+MISS_INTERVAL = 2
+FIRST_INTERVAL = 6
+MIN_EASE = 1.3
+START_EASE = 2.5
+MAX_EASE = 4.0
+
+# Correct answers faster than this count as fluent
+FLUENT_SECONDS = 30
+
+
+class Card:
+    """One player's history with one question"""
+    __slots__ = ("question", "key", "attempts", "correct", "total_time", "interval", "ease", "due")
+
+    def __init__(self, question, key):
+        self.question = question
+        self.key = key
+        self.attempts = 0
+        self.correct = 0
+        self.total_time = 0.0
+        self.interval = 0
+        self.ease = START_EASE
+        self.due = 0
+
+    @property
+    def accuracy(self):
+        return self.correct / self.attempts if self.attempts else 0.0
+
+    @property
+    def mean_time(self):
+        return self.total_time / self.attempts if self.attempts else 0.0
+
+
+class QuestionScheduler:
+    """Picks each player's next question: due reviews first, then new ones"""
+    __slots__ = ("cards", "due_heap", "step", "bucket", "key", "drawn", "swaps", "rng")
+
+    def __init__(self, rng=random):
+        self.cards = {}
+        self.due_heap = []
+        self.step = 0
+        self.bucket = ()
+        self.key = None
+        self.drawn = 0
+        self.swaps = {}
+        self.rng = rng
+
+    def use_bucket(self, key, bucket, rng=None):
+        """Schedule from one (difficulty, topic, language) bucket"""
+        if rng is not None:
+            self.rng = rng
+        if key == self.key:
+            return
+        self.key = key
+        self.bucket = bucket
+        self.drawn = 0
+        self.swaps = {}
+        # Only cards from this bucket compete for review
+        self.due_heap = [(card.due, qid) for qid, card in self.cards.items() if card.key == key]
+        heapq.heapify(self.due_heap)
+
+    def _draw_new(self):
+        """Next unseen question in a lazily shuffled order"""
+        n = len(self.bucket)
+        while self.drawn < n:
+            j = self.rng.randint(self.drawn, n - 1)
+            picked = self.swaps.pop(j, j)
+            if j != self.drawn:
+                self.swaps[j] = self.swaps.pop(self.drawn, self.drawn)
+            self.drawn += 1
+            question = self.bucket[picked]
+            if question["id"] not in self.cards:
+                return question
+        return None
+
+    def _pop_card(self, due_only):
+        while self.due_heap:
+            due, qid = self.due_heap[0]
+            card = self.cards[qid]
+            if card.due != due:
+                heapq.heappop(self.due_heap)     # superseded entry
+                continue
+            if due_only and due > self.step:
+                return None
+            heapq.heappop(self.due_heap)
+            return card
+        return None
+
+    def next_question(self):
+        """Due review, else a new question, else the soonest review"""
+        self.step += 1
+        card = self._pop_card(due_only=True)
+        if card is not None:
+            return card.question
+        question = self._draw_new()
+        if question is not None:
+            self.cards[question["id"]] = Card(question, self.key)
+            return question
+        card = self._pop_card(due_only=False)
+        return card.question if card is not None else None
+
+    def record(self, question, correct, elapsed):
+        """Update a card after an answer (or a miss) and schedule its review"""
+        card = self.cards.get(question["id"])
+        if card is None:
+            card = self.cards[question["id"]] = Card(question, self.key)
+        card.attempts += 1
+        if elapsed is not None:
+            card.total_time += elapsed
+        if correct:
+            card.correct += 1
+            if elapsed < FLUENT_SECONDS:
+                card.ease = min(MAX_EASE, card.ease + 0.15)
+            card.interval = FIRST_INTERVAL if card.interval < FIRST_INTERVAL else round(card.interval * card.ease)
+        else:
+            card.ease = max(MIN_EASE, card.ease - 0.2)
+            card.interval = MISS_INTERVAL
+        card.due = self.step + card.interval
+        if card.key == self.key:
+            heapq.heappush(self.due_heap, (card.due, question["id"]))
+        return card
+
+    def mastered(self, min_interval=30):
+        """Ids of questions the player reliably answers"""
+        return [qid for qid, card in self.cards.items() if card.interval >= min_interval]
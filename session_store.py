@@ -0,0 +1,395 @@
+"""
+Externalized game sessions for multi-replica deployments.
+
+A GameEngine is packed into a compact binary snapshot (question ids rather
+than question bodies, counters, lanes and timers) and kept in a pluggable
+SnapshotStore keyed by a session id carried in the page URL, so a player
+who lands on another replica, or reconnects after a restart, resumes the
+same race.  SessionSaver writes only when the state meaningfully changes,
+not on every rerun; timers are stored as wall-clock times, so the race
+keeps running while the player is away and a reload does not reset them.
+
+The session id is a bearer token: anyone holding the ?sid= URL can resume
+that race, so players should not share it.
+
+    CODERACER_SESSIONS=sqlite:///path/sessions.db    (default: sessions.db)
+    CODERACER_SESSIONS=redis://host:6379/0           (needs the redis package)
+    CODERACER_SESSIONS=local                         (in-process stand-in)
+"""
+
+import os
+import sqlite3
+import struct
+import threading
+import time
+
+from engine import LANES, GameEngine, LivesLinkedList
+from question_bank import get_bank
+from scheduler import Card
+
+SNAPSHOT_VERSION = 4
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.db")
+SESSION_TTL_SECONDS = 24 * 3600
+
+GAME_STATES = ("menu", "playing", "game_over")
+
+# version, state, car lane, obstacle lane, approaching, answered,
+# games played, lives, score, streak, answered count, correct count,
+# obstacle speed, time limit, round remaining, scheduler step,
+# distance, distance base, obstacle distance, obstacle spawned at, question
+# started at (wall-clock seconds, -1 for none)
+_HEAD = struct.Struct("<6BIHq3IHIHI5d")
+_CARD = struct.Struct("<HIIfIfI")    # bucket key, attempts, correct, time, interval, ease, due
+_COUNT = struct.Struct("<H")
+# timeline: samples, race started at (wall clock), window base time, base score, correct in window, max streak
+_TIMELINE = struct.Struct("<HdfiHH")
+_SAMPLE = struct.Struct("<fiHB")     # time, score, streak, lane
+
+
+class _Writer:
+    __slots__ = ("buf",)
+
+    def __init__(self):
+        self.buf = bytearray()
+
+    def pack(self, fmt, *values):
+        self.buf += fmt.pack(*values)
+
+    def text(self, value):
+        data = (value or "").encode("utf-8")
+        self.buf += struct.pack("<H", len(data)) + data
+
+    def ints(self, values):
+        self.buf += struct.pack(f"<H{len(values)}q", len(values), *values)
+
+
+class _Reader:
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt):
+        values = fmt.unpack_from(self.data, self.pos)
+        self.pos += fmt.size
+        return values
+
+    def count(self):
+        (n,) = struct.unpack_from("<H", self.data, self.pos)
+        self.pos += 2
+        return n
+
+    def text(self):
+        n = self.count()
+        value = bytes(self.data[self.pos:self.pos + n]).decode("utf-8")
+        self.pos += n
+        return value
+
+    def ints(self):
+        n = self.count()
+        values = struct.unpack_from(f"<{n}q", self.data, self.pos)
+        self.pos += 8 * n
+        return list(values)
+
+
+# ===========================
+# SERIALIZATION
+# ===========================
+
+def dump_engine(engine, wall_clock=time.time):
+    """Compact binary snapshot of a GameEngine.  Timers are stored as
+    wall-clock times: a snapshot is only rewritten when snapshot_key changes,
+    so ages would date from that write and a reload would refill the clock"""
+    now = engine.clock()
+    wall = wall_clock()
+    qm = engine.qm
+    scheduler = qm.scheduler
+    spawn = engine.obstacle_spawn_time
+    started = engine.question_start_time
+    out = _Writer()
+    out.pack(
+        _HEAD, SNAPSHOT_VERSION, GAME_STATES.index(engine.game_state),
+        LANES.index(engine.car_lane), LANES.index(engine.obstacle_lane),
+        engine.obstacle_approaching, qm.answered, engine.games_played,
+        engine.lives.get_count() if engine.lives else 0, engine.score, engine.streak,
+        engine.questions_answered, engine.correct_answers, engine.obstacle_speed,
+        engine.time_limit, qm.remaining, scheduler.step,
+        engine.distance, engine.distance_base, engine.obstacle_distance,
+        -1.0 if spawn is None else wall - (now - spawn), -1.0 if started is None else wall - (now - started),
+    )
+    for value in (engine.language, engine.difficulty, engine.mode,
+                  engine.feedback, engine.feedback_type,
+                  qm.current_question["id"] if qm.current_question else ""):
+        out.text(value)
+
+    timeline = engine.timeline
+    out.pack(_TIMELINE, timeline.count, wall - (now - timeline.started), timeline.base_time,
+             timeline.base_score, timeline.window_correct, timeline.max_streak)
+    for sample in timeline.samples():
+        out.pack(_SAMPLE, *sample)
+    out.ints([engine.leaderboard.high_score] + engine.leaderboard.heap)
+
+    # Scheduler cards; bucket keys go in a small table, then the active one (0: none)
+    keys = [scheduler.key] if scheduler.key else []
+    for card in scheduler.cards.values():
+        if card.key not in keys:
+            keys.append(card.key)
+    out.pack(_COUNT, len(keys))
+    for key in keys:
+        for part in key:
+            out.text(part)
+    out.pack(_COUNT, keys.index(scheduler.key) + 1 if scheduler.key else 0)
+    out.pack(_COUNT, len(scheduler.cards))
+    for question_id, card in scheduler.cards.items():
+        out.text(question_id)
+        out.pack(_CARD, keys.index(card.key), card.attempts, card.correct,
+                 card.total_time, card.interval, card.ease, card.due)
+    return bytes(out.buf)
+
+
+def load_engine(data, clock=time.monotonic, rng=None, rules=None, bank=None, wall_clock=time.time):
+    """Rebuild a GameEngine from dump_engine output; the race went on while
+    nobody served it, and the next update_game() catches up"""
+    bank = bank if bank is not None else get_bank()
+    reader = _Reader(data)
+    head = reader.unpack(_HEAD)
+    if head[0] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {head[0]}")
+    (_, state, car_lane, obstacle_lane, approaching, answered, games_played,
+     lives, score, streak, questions_answered, correct_answers, speed,
+     time_limit, remaining, step, distance, distance_base, obstacle_distance,
+     obstacle_at, question_at) = head
+    now = clock()
+    wall = wall_clock()
+
+    engine = GameEngine(clock=clock, rng=rng, rules=rules, bank=bank)
+    engine.game_state = GAME_STATES[state]
+    engine.car_lane = LANES[car_lane]
+    engine.obstacle_lane = LANES[obstacle_lane]
+    engine.obstacle_approaching = bool(approaching)
+    engine.games_played = games_played
+    engine.lives = LivesLinkedList(lives)
+    engine.score = score
+    engine.streak = streak
+    engine.questions_answered = questions_answered
+    engine.correct_answers = correct_answers
+    engine.obstacle_speed = speed
+    engine.time_limit = time_limit
+    engine.distance = distance
+    engine.distance_base = distance_base
+    engine.obstacle_distance = obstacle_distance
+    engine.obstacle_spawn_time = None if obstacle_at < 0 else now - (wall - obstacle_at)
+    engine.question_start_time = None if question_at < 0 else now - (wall - question_at)
+    (engine.language, engine.difficulty, engine.mode,
+     engine.feedback, engine.feedback_type, current_id) = (reader.text() for _ in range(6))
+
+    timeline = engine.timeline
+    count, race_at, base_time, base_score, window_correct, max_streak = reader.unpack(_TIMELINE)
+    timeline.reset(now - (wall - race_at))
+    for _ in range(count):
+        sample_time, sample_score, sample_streak, lane = reader.unpack(_SAMPLE)
+        timeline.push(timeline.started + sample_time, sample_score, sample_streak, lane)
+    timeline.base_time, timeline.base_score = base_time, base_score
+    timeline.window_correct, timeline.max_streak = window_correct, max_streak
+    high_score, *heap = reader.ints()
+    engine.leaderboard.high_score = high_score
+    engine.leaderboard.heap = heap
+
+    qm = engine.qm
+    scheduler = qm.scheduler
+    keys = []
+    for _ in range(reader.count()):
+        difficulty, topic, language = (reader.text() for _ in range(3))
+        keys.append((difficulty, topic or None, language))
+    active = reader.count()
+    for _ in range(reader.count()):
+        question_id = reader.text()
+        key, attempts, correct, total_time, interval, ease, due = reader.unpack(_CARD)
+        question = bank.get(question_id)
+        if question is None:
+            continue        # dropped from the bank since the snapshot
+        card = Card(question, keys[key])
+        card.attempts, card.correct, card.total_time = attempts, correct, total_time
+        card.interval, card.ease, card.due = interval, ease, due
+        scheduler.cards[question_id] = card
+    scheduler.step = step
+    if active:
+        key = keys[active - 1]
+        scheduler.use_bucket(key, bank.bucket(*key), engine.rng)
+    qm.remaining = remaining
+    qm.current_question = bank.get(current_id) if current_id else None
+    qm.answered = bool(answered)
+    if engine.game_state == "playing" and qm.current_question is None:
+        engine.next_question(now)
+    return engine
+
+
+def snapshot_key(engine):
+    """State that is worth persisting when it changes (not distance or timers)"""
+    qm = engine.qm
+    return (
+        engine.game_state, engine.games_played, engine.score, engine.questions_answered,
+        engine.lives.get_count() if engine.lives else 0, engine.car_lane, engine.obstacle_lane,
+        engine.obstacle_speed, qm.current_question["id"] if qm.current_question else None,
+        engine.language, engine.difficulty, engine.mode,
+    )
+
+
+# ===========================
+# STORES
+# ===========================
+
+class SnapshotStore:
+    """Interface: bytes in, bytes out, keyed by session id"""
+    def get(self, sid):
+        raise NotImplementedError
+
+    def put(self, sid, data):
+        raise NotImplementedError
+
+    def delete(self, sid):
+        raise NotImplementedError
+
+
+class SQLiteSnapshotStore(SnapshotStore):
+    """Snapshots in a WAL-mode SQLite table shared by replicas on one host"""
+    def __init__(self, path=DEFAULT_DB, ttl=SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "sid TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - ttl,))
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE sid = ? AND updated_at >= ?",
+            (sid, time.time() - self.ttl),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put(self, sid, data):
+        self._connect().execute(
+            "INSERT INTO sessions (sid, data, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(sid) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (sid, data, time.time()),
+        )
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+class LocalRedis:
+    """In-process stand-in for the few Redis commands the store uses"""
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (bytes(value), None if ex is None else time.monotonic() + ex)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return int(self._data.pop(key, None) is not None)
+
+
+class RedisSnapshotStore(SnapshotStore):
+    """Snapshots in Redis (or anything with its get/set/delete) with a TTL"""
+    def __init__(self, client, prefix="coderacer:session:", ttl=SESSION_TTL_SECONDS):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("redis:// session stores need the redis package (pip install redis)")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, sid):
+        return self.client.get(self.prefix + sid)
+
+    def put(self, sid, data):
+        self.client.set(self.prefix + sid, data, ex=self.ttl)
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+
+def store_from_env():
+    """Snapshot store named by CODERACER_SESSIONS"""
+    spec = os.environ.get("CODERACER_SESSIONS", "")
+    if spec == "local":
+        return RedisSnapshotStore(LocalRedis())
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSnapshotStore.from_url(spec)
+    if spec.startswith("sqlite:///"):
+        return SQLiteSnapshotStore(spec[len("sqlite:///"):])
+    return SQLiteSnapshotStore(spec or DEFAULT_DB)
+
+
+# ===========================
+# COALESCED SAVES
+# ===========================
+
+class SessionSaver:
+    """Writes a session's snapshot only when snapshot_key changes"""
+    __slots__ = ("store", "sid", "last_key", "writes", "skipped")
+
+    def __init__(self, store, sid):
+        self.store = store
+        self.sid = sid
+        self.last_key = None
+        self.writes = 0
+        self.skipped = 0
+
+    def restore(self, **kwargs):
+        """The stored engine for this session, or None"""
+        data = self.store.get(self.sid)
+        if not data:
+            return None
+        try:
+            engine = load_engine(data, **kwargs)
+        except (ValueError, struct.error, IndexError, UnicodeDecodeError):
+            return None     # stale or corrupt snapshot: start fresh
+        self.last_key = snapshot_key(engine)
+        return engine
+
+    def save(self, engine):
+        """Persist if something meaningful changed; returns whether it wrote"""
+        key = snapshot_key(engine)
+        if key == self.last_key:
+            self.skipped += 1
+            return False
+        self.store.put(self.sid, dump_engine(engine))
+        self.last_key = key
+        self.writes += 1
+        return True
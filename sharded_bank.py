@@ -0,0 +1,223 @@
+"""
+Sharded, memory-mapped question banks.
+
+A bank directory holds question bodies in JSON-lines shards plus a
+prebuilt index:
+
+    index.json     shard names, question ids, bucket and topic tables
+    index.bin      uint32 (shard, offset, length) per question, then the
+                   question numbers of every bucket back to back
+    shard-0000.jsonl ...
+
+Opening a bank reads only the index; index.bin and the shards are mapped
+with mmap, and a question body is decoded on first access and kept in an
+LRU.  Reference answers are validated (CODERACER_VALIDATE) when a bank
+is built rather than when it is opened, which never reads every body.
+Build a bank from questions.json with:
+
+    python sharded_bank.py questions.json bank/ --shard-size 5000
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+import native_grader
+from bank_validation import validated, validation_mode
+from question_bank import LANGUAGES, QuestionBank, _freeze, embedded_questions, file_questions
+
+INDEX_VERSION = 1
+INDEX_JSON = "index.json"
+INDEX_BIN = "index.bin"
+RECORD_FIELDS = 3       # shard, offset, length
+
+
+def _bucket_key(difficulty, topic, language):
+    return "\t".join((difficulty, topic or "", language))
+
+
+def _mapped(path):
+    """Read-only mmap of a file (None when it is empty)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# ===========================
+# CONVERTER
+# ===========================
+
+def write_bank(directory, questions, shard_size=5000, checked=False):
+    """Write questions (dicts with an "id") as a sharded bank; returns its size"""
+    os.makedirs(directory, exist_ok=True)
+    shards, ids, records, buckets = [], [], array("I"), {}
+    shard = None
+    for number, question in enumerate(questions):
+        if number % shard_size == 0:
+            if shard:
+                shard.close()
+            shards.append(f"shard-{len(shards):04d}.jsonl")
+            shard = open(os.path.join(directory, shards[-1]), "wb")
+        line = json.dumps(question, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        records.extend((len(shards) - 1, shard.tell(), len(line)))
+        shard.write(line)
+        ids.append(question["id"])
+        # Language support is decided here so opening the bank never decodes bodies
+        frozen = _freeze(question)
+        for language in LANGUAGES:
+            if native_grader.supports(frozen, language):
+                for topic in (question["topic"], None):
+                    buckets.setdefault(_bucket_key(question["diff"], topic, language), []).append(number)
+    if shard:
+        shard.close()
+
+    members = array("I")
+    table = {}
+    for key, numbers in buckets.items():
+        table[key] = [len(members), len(numbers)]
+        members.extend(numbers)
+    with open(os.path.join(directory, INDEX_BIN), "wb") as f:
+        records.tofile(f)
+        members.tofile(f)
+    with open(os.path.join(directory, INDEX_JSON), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": INDEX_VERSION,
+            "byteorder": sys.byteorder,
+            "shards": shards,
+            "ids": ids,
+            "buckets": table,
+            "validated": checked,
+        }, f, ensure_ascii=False)
+    return len(ids)
+
+
+# ===========================
+# READER
+# ===========================
+
+class LazyBucket:
+    """Sequence of a bucket's questions, decoded as they are indexed"""
+    __slots__ = ("bank", "start", "count")
+
+    def __init__(self, bank, start, count):
+        self.bank = bank
+        self.start = start
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("bucket index out of range")
+        return self.bank.load(self.bank._members[self.start + i])
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+
+class ShardedBank(QuestionBank):
+    """QuestionBank over a sharded bank directory"""
+    def __init__(self, directory, cache_size=4096):
+        with open(os.path.join(directory, INDEX_JSON), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported bank index version: {meta.get('version')}")
+        self.directory = directory
+        self.cache_size = cache_size
+        self._shard_names = meta["shards"]
+        self._shards = [None] * len(self._shard_names)
+        self._ids = meta["ids"]
+        self._numbers = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        if meta.get("byteorder", sys.byteorder) != sys.byteorder:
+            raise ValueError("Bank index was written on a machine with another byte order")
+        if not meta.get("validated") and validation_mode() != "off":
+            print(f"{directory}: reference answers were not validated; rebuild it with sharded_bank.py",
+                  file=sys.stderr)
+        self._index_map = _mapped(os.path.join(directory, INDEX_BIN))
+        view = memoryview(self._index_map) if self._index_map is not None else memoryview(b"")
+        split = len(self._ids) * RECORD_FIELDS * 4
+        self._records = view[:split].cast("I")
+        self._members = view[split:].cast("I")
+
+        self._index = {}
+        topics = {}
+        for key, (start, count) in meta["buckets"].items():
+            difficulty, topic, language = key.split("\t")
+            topic = topic or None
+            self._index[(difficulty, topic, language)] = LazyBucket(self, start, count)
+            if topic is not None:
+                topics.setdefault((difficulty, language), []).append(topic)
+        self._topics = {key: tuple(sorted(names)) for key, names in topics.items()}
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def questions(self):
+        """Every question, decoding the whole bank (for tools, not the game)"""
+        return {question_id: self.get(question_id) for question_id in self._ids}
+
+    def _shard(self, number):
+        shard = self._shards[number]
+        if shard is None:
+            shard = self._shards[number] = _mapped(os.path.join(self.directory, self._shard_names[number]))
+        return shard
+
+    def load(self, number):
+        """Question number ``number``, decoded once and kept in the LRU"""
+        with self._lock:
+            question = self._cache.get(number)
+            if question is not None:
+                self._cache.move_to_end(number)
+                return question
+            base = number * RECORD_FIELDS
+            shard, offset, length = self._records[base:base + RECORD_FIELDS]
+            raw = self._shard(shard)[offset:offset + length]
+        question = _freeze(json.loads(raw))
+        with self._lock:
+            self._cache[number] = question
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return question
+
+    def get(self, question_id):
+        if self._numbers is None:
+            self._numbers = {qid: number for number, qid in enumerate(self._ids)}
+        number = self._numbers.get(question_id)
+        return self.load(number) if number is not None else None
+
+    def cache_info(self):
+        return {"decoded": len(self._cache), "maxsize": self.cache_size, "questions": len(self._ids)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert questions.json into a sharded bank")
+    parser.add_argument("source", help="questions.json layout file")
+    parser.add_argument("output", help="bank directory to write")
+    parser.add_argument("--shard-size", type=int, default=5000, help="questions per shard")
+    parser.add_argument("--no-embedded", action="store_true", help="leave out the embedded code questions")
+    args = parser.parse_args(argv)
+
+    questions = [] if args.no_embedded else list(embedded_questions())
+    questions.extend(file_questions(args.source))
+    questions, _ = validated(questions)
+    count = write_bank(args.output, questions, shard_size=args.shard_size,
+                       checked=validation_mode() != "off")
+    print(f"Wrote {count} questions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Bulk simulation of scripted games for tuning scoring and pacing offline.
+
+    python simulate.py --games 20000 --accuracy 0.7 --think-time 1.5
+    python simulate.py --rules '{"bonus_life_streak": 4, "base_points": 25}'
+
+Each game runs GameEngine on a manual clock with a seeded RNG, so runs
+are reproducible; games are spread over a process pool.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import GameEngine, GameRules
+
+
+class ManualClock:
+    """Clock that only moves when the script advances it"""
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def play_game(seed, difficulty="Easy", mode="Mixed", language="Python",
+              accuracy=0.7, think_time=1.5, rules=None):
+    """Play one scripted game and return its outcome"""
+    clock = ManualClock()
+    engine = GameEngine(clock=clock, rng=random.Random(seed), rules=rules)
+    player = random.Random(seed ^ 0x5EED)
+    engine.difficulty = difficulty
+    engine.mode = mode
+    engine.language = language
+    engine.start_game()
+    crashes = 0
+
+    while engine.game_state == "playing":
+        think = player.expovariate(1.0 / think_time) if think_time > 0 else 0.0
+        due = engine.next_event_time()
+        if clock.now + think >= due:
+            # Too slow: the obstacle (or the time limit) arrives first
+            lives = engine.lives.get_count()
+            clock.now = due
+            engine.update_game()
+            crashes += lives > engine.lives.get_count()
+            continue
+        clock.advance(think)
+        question = engine.qm.current_question
+        answer = question["a"] if player.random() < accuracy else "pass"
+        engine.submit_answer(answer)
+        engine.update_game()
+
+    return {
+        "score": engine.score,
+        "answered": engine.questions_answered,
+        "correct": engine.correct_answers,
+        "distance": engine.distance,
+        "lives_left": engine.lives.get_count(),
+        "crashes": crashes,
+        "duration": clock.now,
+    }
+
+
+def _play_batch(args):
+    seeds, options, rules = args
+    rules = GameRules(**rules) if rules else None
+    return [play_game(seed, rules=rules, **options) for seed in seeds]
+
+
+def simulate(games, workers=None, seed=0, rules=None, chunk=500, **options):
+    """Play ``games`` games across a process pool; returns per-game results"""
+    seeds = [seed + i for i in range(games)]
+    batches = [(seeds[i:i + chunk], options, rules) for i in range(0, games, chunk)]
+    if workers == 1:
+        return [r for batch in batches for r in _play_batch(batch)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [r for batch in pool.map(_play_batch, batches) for r in batch]
+
+
+def summarize(results):
+    scores = [r["score"] for r in results]
+    answered = sum(r["answered"] for r in results)
+    return {
+        "games": len(results),
+        "mean_score": statistics.fmean(scores),
+        "median_score": statistics.median(scores),
+        "p90_score": statistics.quantiles(scores, n=10)[-1] if len(scores) > 1 else scores[0],
+        "accuracy": sum(r["correct"] for r in results) / max(answered, 1),
+        "mean_crashes": statistics.fmean(r["crashes"] for r in results),
+        "survived": sum(r["lives_left"] > 0 for r in results) / len(results),
+        "mean_distance": statistics.fmean(r["distance"] for r in results),
+        "mean_duration_s": statistics.fmean(r["duration"] for r in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate scripted DSA Racing games")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--difficulty", default="Easy")
+    parser.add_argument("--mode", default="Mixed")
+    parser.add_argument("--language", default="Python")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="chance a scripted answer is correct")
+    parser.add_argument("--think-time", type=float, default=1.5, help="mean seconds before answering")
+    parser.add_argument("--rules", default=None, help="JSON object of GameRules overrides")
+    args = parser.parse_args(argv)
+
+    rules = GameRules(**json.loads(args.rules)).as_dict() if args.rules else None
+    start = time.perf_counter()
+    results = simulate(
+        args.games, workers=args.workers, seed=args.seed, rules=rules,
+        difficulty=args.difficulty, mode=args.mode, language=args.language,
+        accuracy=args.accuracy, think_time=args.think_time,
+    )
+    elapsed = time.perf_counter() - start
+    summary = summarize(results)
+    summary["games_per_second"] = round(len(results) / elapsed, 1)
+    summary["rules"] = rules or GameRules().as_dict()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Static stylesheets for the DSA Racing Simulator.
+
+Everything here is injected once per browser session; reruns only send
+the small per-frame markup built in track.py.
+"""
+
+APP_CSS = """
+.stApp {
+    background: linear-gradient(135deg, #1e1e2e 0%, #2d2d3d 100%);
+}
+.stButton>button {
+    font-size: 18px;
+    font-weight: bold;
+    padding: 12px;
+}
+"""
+
+MENU_CSS = """
+.big-title {
+    font-size: 60px;
+    font-weight: bold;
+    text-align: center;
+    color: #00ff88;
+    margin-bottom: 10px;
+}
+.subtitle {
+    font-size: 24px;
+    text-align: center;
+    color: #888;
+    margin-bottom: 40px;
+}
+"""
+
+GAME_OVER_CSS = """
+.game-over-title {
+    font-size: 50px;
+    font-weight: bold;
+    text-align: center;
+    margin: 20px 0;
+}
+.score-chart {
+    width: 100%;
+    height: 80px;
+    margin-bottom: 10px;
+}
+.score-chart polyline {
+    fill: none;
+    stroke: #FFD700;
+    stroke-width: 2;
+    vector-effect: non-scaling-stroke;
+}
+"""
+
+# The obstacle's --obstacle-top and --eta come from the per-frame markup
+TRACK_CSS = """
+.track-container {
+    background: linear-gradient(180deg, #87CEEB 0%, #4a4a4a 50%, #2d2d2d 100%);
+    border-radius: 10px;
+    padding: 20px;
+    min-height: 500px;
+    position: relative;
+    overflow: hidden;
+}
+.road {
+    background: linear-gradient(180deg, #2a2a2a 0%, #1a1a1a 100%);
+    width: 100%;
+    height: 100%;
+    position: relative;
+    border-radius: 5px;
+    display: flex;
+    justify-content: space-between;
+    padding: 0 20px;
+    box-shadow: inset 0 0 50px rgba(0,0,0,0.8);
+}
+.lane {
+    width: 28%;
+    position: relative;
+    border-left: 3px dashed #FFD700;
+    border-right: 3px dashed #FFD700;
+    min-height: 450px;
+}
+.obstacle {
+    font-size: 40px;
+    position: absolute;
+    top: var(--obstacle-top);
+    left: 50%;
+    transform: translateX(-50%);
+    animation: pulse 0.5s infinite, approach var(--eta) linear forwards;
+    filter: drop-shadow(0 0 10px rgba(255,0,0,0.5));
+}
+.car {
+    position: absolute;
+    bottom: 20px;
+    left: 50%;
+    transform: translateX(-50%);
+    width: 80px;
+    height: 120px;
+}
+.car-body {
+    width: 100%;
+    height: 100%;
+    background: linear-gradient(135deg, #ff0000 0%, #cc0000 50%, #990000 100%);
+    border-radius: 15px 15px 5px 5px;
+    position: relative;
+    box-shadow: 0 5px 20px rgba(255,0,0,0.4), inset 0 2px 10px rgba(255,255,255,0.2);
+    animation: carFloat 2s ease-in-out infinite;
+}
+.car-window {
+    width: 60%;
+    height: 30%;
+    background: linear-gradient(135deg, #1a1a2e 0%, #0f0f1e 100%);
+    border-radius: 8px 8px 0 0;
+    position: absolute;
+    top: 10%;
+    left: 20%;
+    box-shadow: inset 0 2px 8px rgba(0,0,0,0.5);
+}
+.car-stripe {
+    width: 20%;
+    height: 80%;
+    background: linear-gradient(180deg, #ffff00 0%, #ffaa00 100%);
+    position: absolute;
+    top: 10%;
+    left: 40%;
+    border-radius: 3px;
+    box-shadow: 0 0 10px rgba(255,255,0,0.6);
+}
+.car-wheel {
+    width: 15px;
+    height: 15px;
+    background: #1a1a1a;
+    border-radius: 50%;
+    position: absolute;
+    border: 3px solid #333;
+    box-shadow: inset 0 2px 5px rgba(0,0,0,0.8);
+}
+.wheel-left {
+    left: 5px;
+    bottom: 25px;
+}
+.wheel-right {
+    right: 5px;
+    bottom: 25px;
+}
+.wheel-left-front {
+    left: 5px;
+    bottom: 60px;
+}
+.wheel-right-front {
+    right: 5px;
+    bottom: 60px;
+}
+.car-glow {
+    position: absolute;
+    bottom: 0;
+    left: 50%;
+    transform: translateX(-50%);
+    width: 100%;
+    height: 30px;
+    background: radial-gradient(ellipse at center, rgba(255,0,0,0.4) 0%, transparent 70%);
+    filter: blur(10px);
+}
+@keyframes pulse {
+    0%, 100% { transform: translateX(-50%) scale(1); }
+    50% { transform: translateX(-50%) scale(1.1); }
+}
+@keyframes approach {
+    from { top: var(--obstacle-top); }
+    to { top: 100%; }
+}
+@keyframes carFloat {
+    0%, 100% { transform: translateY(0); }
+    50% { transform: translateY(-3px); }
+}
+.distance-marker {
+    position: absolute;
+    right: 10px;
+    top: 10px;
+    background: rgba(0,0,0,0.85);
+    color: #FFD700;
+    padding: 8px 15px;
+    border-radius: 8px;
+    font-weight: bold;
+    border: 2px solid #FFD700;
+    box-shadow: 0 0 15px rgba(255,215,0,0.3);
+}
+"""
+
+STYLESHEET = APP_CSS + MENU_CSS + GAME_OVER_CSS + TRACK_CSS
@@ -0,0 +1,36 @@
+from bank_validation import validate, validated
+from canonical import canonical_hash
+
+GOOD = {"id": "good", "q": "Write function:\ndef double(n):\n    # Your code", "a": "return n * 2",
+        "tests": [([2], 4), ([0], 0)]}
+WRONG = {"id": "wrong", "q": "Write function:\ndef triple(n):\n    # Your code", "a": "return n * 2",
+         "tests": [([2], 6)]}
+NO_DEF = {"id": "no-def", "q": "Triple a number", "a": "return n * 3", "tests": [([2], 6)]}
+TEXT = {"id": "text", "q": "BFS uses a?", "a": "queue"}
+BLANK = {"id": "blank", "q": "Anything?", "a": "  "}
+QUESTIONS = [GOOD, WRONG, NO_DEF, TEXT, BLANK]
+
+
+def test_broken_references_are_reported():
+    report = validate(QUESTIONS, workers=2)
+    assert report.checked == len(QUESTIONS)
+    assert set(report.broken) == {"wrong", "no-def", "blank"}
+    assert report.broken["wrong"].startswith("failed")
+    assert set(report.references) == {"good"}
+    reference = report.references["good"]
+    assert (reference.name, reference.hash) == ("double", canonical_hash("return 2 * n"))
+
+
+def test_modes(monkeypatch):
+    monkeypatch.setenv("CODERACER_VALIDATE_WORKERS", "1")
+    monkeypatch.setenv("CODERACER_VALIDATE", "quarantine")
+    kept, references = validated(QUESTIONS)
+    assert [q["id"] for q in kept] == ["good", "text"] and set(references) == {"good"}
+
+    monkeypatch.setenv("CODERACER_VALIDATE", "report")
+    kept, _ = validated(QUESTIONS)
+    assert kept == QUESTIONS
+
+    monkeypatch.setenv("CODERACER_VALIDATE", "0")
+    kept, references = validated(QUESTIONS)
+    assert kept == QUESTIONS and not references
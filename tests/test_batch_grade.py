@@ -0,0 +1,45 @@
+import io
+import json
+
+from batch_grade import BatchGrader, Results, grade_all, question_filename, question_id, read_submissions
+from question_bank import get_bank
+
+
+def test_filenames_round_trip_every_bank_id():
+    for qid in get_bank().questions:
+        name = question_filename(qid)
+        assert "/" not in name and ":" not in name
+        assert question_id(name) == qid
+
+
+def test_grades_a_directory_tree(tmp_path):
+    bank = get_bank()
+    text_id = next(qid for qid, q in bank.questions.items() if "/" in qid and not q.get("tests"))
+    answers = {
+        ("ada", "arrays_easy:1"): "return sorted(arr)[-2]",
+        ("bob", "arrays_easy:1"): "return (sorted(arr))[-2]",     # same canonical form as ada's
+        ("bob", "arrays_easy:0"): "return arr",
+        ("ada", text_id): bank.get(text_id)["a"],
+    }
+    for (student, qid), code in answers.items():
+        (tmp_path / student).mkdir(exist_ok=True)
+        (tmp_path / student / question_filename(qid)).write_text(code)
+    (tmp_path / "extra.jsonl").write_text(
+        json.dumps({"student": "cy", "question": "arrays_easy:0", "code": "return arr[::-1]"}) + "\n")
+
+    out = io.StringIO()
+    results = Results(out, "jsonl")
+    grader = BatchGrader(bank=bank, workers=1)
+    try:
+        unique = grade_all(read_submissions(str(tmp_path)), results, grader)
+    finally:
+        grader.close()
+
+    rows = {(row["student"], row["question"]): row for row in map(json.loads, out.getvalue().splitlines())}
+    assert unique == 4
+    assert set(rows) == set(answers) | {("cy", "arrays_easy:0")}
+    assert rows["ada", "arrays_easy:1"]["passed"] and rows["bob", "arrays_easy:1"]["passed"]
+    assert rows["bob", "arrays_easy:1"]["duplicate"] != rows["ada", "arrays_easy:1"]["duplicate"]
+    assert rows["bob", "arrays_easy:0"]["status"] == "failed"
+    assert rows["cy", "arrays_easy:0"]["passed"]
+    assert rows["ada", text_id]["passed"]
@@ -0,0 +1,93 @@
+import pytest
+
+from canonical import VerdictCache, canonical_hash, canonicalize
+from engine import QuestionManager
+from grader import Verdict
+from question_bank import get_bank
+
+
+@pytest.mark.parametrize("left, right", [
+    ("return sorted(arr)[-2]", "return (sorted(arr))[-2]"),
+    ("return sorted(arr)[-2]", "  return   sorted( arr )[ -2 ]  "),
+    ("return 'a' + s", 'return "a" + s'),
+    ("return n * 2", "return 2 * n"),
+    ("return a + 1", "return 1 + a"),
+    ("return len(arr) == 0", "return 0 == len(arr)"),
+    ("return x is not None", "return None is not x"),
+    ("if a != b:\n    return a\nreturn b", "if b != a:\n  return a\nreturn b"),
+])
+def test_equivalent_answers_share_a_hash(left, right):
+    assert canonicalize(left) == canonicalize(right)
+    assert canonical_hash(left) == canonical_hash(right)
+
+
+@pytest.mark.parametrize("left, right", [
+    ("return a + b", "return b + a"),              # strings and lists do not commute
+    ("return a - 1", "return 1 - a"),
+    ("return f() == g()", "return g() == f()"),    # calls may have side effects
+    ("return 'a b'", "return 'ab'"),               # literal contents are kept
+    ("return arr < 1", "return 1 < arr"),
+])
+def test_different_answers_keep_different_hashes(left, right):
+    assert canonical_hash(left) != canonical_hash(right)
+
+
+def test_non_python_has_no_hash():
+    assert canonical_hash("") is None
+    assert canonical_hash("O(n log n") is None
+
+
+class CountingGrader:
+    language = "Python"
+
+    def __init__(self, status=Verdict.FAILED):
+        self.status = status
+        self.calls = 0
+
+    def grade(self, question, code):
+        self.calls += 1
+        return Verdict(self.status, "graded")
+
+
+def graded_question():
+    return next(q for q in get_bank().questions.values() if q.get("tests"))
+
+
+def test_reference_matches_skip_the_sandbox():
+    question = graded_question()
+    grader = CountingGrader()
+    correct, verdict = QuestionManager().grade(question, "  " + question["a"] + "  \n\n", grader)
+    assert correct and verdict.passed and grader.calls == 0
+
+
+def test_repeat_answers_are_graded_once():
+    question = graded_question()
+    grader = CountingGrader()
+    cache = VerdictCache()
+    manager = QuestionManager()
+    for answer in ("return   0", "return 0", "return (0)"):
+        correct, verdict = manager.grade(question, answer, grader, cache)
+        assert not correct and verdict.status == Verdict.FAILED
+    assert grader.calls == 1
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_load_dependent_verdicts_are_not_cached():
+    question = graded_question()
+    grader = CountingGrader(Verdict.BUSY)
+    cache = VerdictCache()
+    manager = QuestionManager()
+    manager.grade(question, "return 0", grader, cache)
+    manager.grade(question, "return 0", grader, cache)
+    assert grader.calls == 2 and cache.stats()["size"] == 0
+
+
+def test_cache_evicts_the_least_recently_used():
+    cache = VerdictCache(maxsize=2)
+    cache.put("a", Verdict(Verdict.PASSED))
+    cache.put("b", Verdict(Verdict.FAILED))
+    assert cache.get("a").passed        # "a" is now the most recent
+    cache.put("c", Verdict(Verdict.ERROR))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["size"] == 2
@@ -0,0 +1,85 @@
+import random
+
+from engine import ScoreTimeline
+
+
+def test_chart_short_run_returns_every_sample():
+    timeline = ScoreTimeline()
+    timeline.reset(100.0)
+    for i, score in enumerate((10, 25, 40), 1):
+        timeline.push(100.0 + i * 5, score, i, 1)
+    assert timeline.chart(16) == [(0.0, 0), (5.0, 10), (10.0, 25), (15.0, 40)]
+
+
+def test_chart_downsamples_to_the_last_sample_of_each_span():
+    timeline = ScoreTimeline(capacity=8)
+    for i in range(1, 9):
+        timeline.push(float(i), i * 10, i, 1)
+    assert timeline.chart(4) == [(0.0, 0), (2.0, 20), (4.0, 40), (6.0, 60), (8.0, 80)]
+
+
+def test_chart_after_wraparound_starts_at_the_evicted_sample():
+    timeline = ScoreTimeline(capacity=4)
+    for i in range(1, 11):
+        timeline.push(float(i), i * 10, 0 if i % 3 == 0 else 1, 1)
+    assert timeline.chart(16) == [(6.0, 60), (7.0, 70), (8.0, 80), (9.0, 90), (10.0, 100)]
+    assert timeline.accuracy() == 0.75
+    assert timeline.points_per_minute() == 600.0
+
+
+def test_chart_ignores_samples_from_the_previous_race():
+    timeline = ScoreTimeline()
+    for i in range(1, 21):
+        timeline.push(float(i), i * 100, i, 1)
+    timeline.reset(50.0)
+    timeline.push(52.0, 15, 1, 0)
+    assert timeline.chart() == [(0.0, 0), (2.0, 15)]
+    assert timeline.max_streak == 1
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unanswered_question_survives_impacts_until_its_deadline():
+    from engine import GameEngine, GameRules
+    from metrics import TIMEOUTS, snapshot
+
+    rules = GameRules(initial_lives=50, time_limits={d: 10 for d in ("Very Easy", "Easy", "Medium", "Hard")})
+    clock = ManualClock()
+    engine = GameEngine(clock=clock, rng=random.Random(7), rules=rules)
+    engine.start_game()
+    first = engine.qm.current_question["id"]
+    timeouts = snapshot().get((TIMEOUTS.name, ("Easy",)), 0)
+
+    clock.now = 9.5         # several obstacles have hit by now
+    engine.update_game()
+    assert engine.qm.current_question["id"] == first
+    assert engine.distance > 0
+
+    lives = engine.lives.get_count()
+    clock.now = 10.5
+    engine.update_game()
+    assert engine.qm.current_question["id"] != first
+    assert engine.feedback.startswith("⏰")
+    assert engine.question_deadline() == 20.0
+    assert engine.lives.get_count() <= lives - 1
+    assert snapshot()[(TIMEOUTS.name, ("Easy",))] == timeouts + 1
+
+
+def test_answer_moves_on_to_the_next_question():
+    from engine import GameEngine
+
+    clock = ManualClock()
+    engine = GameEngine(clock=clock, rng=random.Random(7))
+    engine.start_game()
+    first = engine.qm.current_question
+    clock.now = 1.0
+    assert engine.submit_answer(first["a"])
+    engine.update_game()
+    assert engine.qm.current_question is not first
+    assert engine.question_start_time == 1.0
@@ -0,0 +1,27 @@
+import pytest
+
+import event_log
+from event_log import EventLog, read_events
+
+
+def test_failed_flush_keeps_the_batch(tmp_path, monkeypatch):
+    log = EventLog(directory=str(tmp_path), flush_seconds=60, fsync=True)
+    try:
+        for score in range(3):
+            log.record(event_log.CORRECT, 1, "q", 1.0, score, "Easy", "Python", 3)
+
+        def full_disk(fd):
+            raise OSError(28, "No space left on device")
+
+        monkeypatch.setattr(event_log.os, "fsync", full_disk)
+        with pytest.raises(OSError):
+            log.flush()
+        assert log.stats()["pending"] == 3
+
+        monkeypatch.undo()
+        log.record(event_log.CORRECT, 1, "q", 1.0, 3, "Easy", "Python", 3)
+        assert log.flush() == 4
+    finally:
+        log.close()
+    scores = [event.score for event in read_events(str(tmp_path))]
+    assert scores[-4:] == [0, 1, 2, 3]
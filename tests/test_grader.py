@@ -0,0 +1,63 @@
+import pytest
+
+import grader
+from grader import SandboxPool, Verdict, check_source
+
+QUESTION = {
+    "q": "Write function to find second max:\ndef second_max(arr):\n    # Your code",
+    "a": "return sorted(arr)[-2]",
+    "tests": [([[1, 5, 3]], 3), ([[4, 9, 2, 7]], 7)],
+}
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = SandboxPool(size=1, timeout=5.0)
+    yield pool
+    pool.close()
+
+
+def test_reference_and_library_answers_pass(pool):
+    assert pool.grade(QUESTION, QUESTION["a"]).passed
+    assert pool.grade(QUESTION, "import heapq\nreturn heapq.nlargest(2, arr)[1]").passed
+
+
+def test_wrong_answer_fails(pool):
+    assert pool.grade(QUESTION, "return 0").status == Verdict.FAILED
+
+
+@pytest.mark.parametrize("body", [
+    "return getattr(arr, '__class__')",
+    "return arr.__class__",
+    "import string\nreturn string.Formatter().get_field('0.__class__', [()], {})",
+    "import functools\ndef g(): pass\nfunctools.update_wrapper(g, len, ('__self__',), ())\nreturn g",
+    "import collections\nreturn collections.sys",
+    "def g():\n    yield 1\nreturn g().gi_frame.f_back",
+    "import os\nreturn os.getppid()",
+])
+def test_escapes_are_errors(pool, body):
+    assert pool.grade(QUESTION, body).status == Verdict.ERROR
+
+
+def test_format_strings_only_reach_text(pool):
+    # str.format may look up dunders, but only ever yields their repr
+    verdict = pool.grade(QUESTION, "return '{0.__class__.__base__}'.format(())")
+    assert verdict.status == Verdict.FAILED
+    assert "\"<class 'object'>\"" in verdict.detail
+
+
+def test_allowed_modules_expose_only_listed_names():
+    assert check_source("def f():\n    import string\n") == "Import of 'string' is not allowed"
+    modules = grader._runner_namespace()["MODULES"]
+    assert not hasattr(modules["functools"], "update_wrapper")
+    assert not hasattr(modules["collections"], "sys")
+
+
+def test_workers_do_not_inherit_the_apps_grader_state(monkeypatch):
+    # A forked worker would carry this forged verdict table with it
+    monkeypatch.setitem(grader._runner_namespace(), "FAILED", Verdict.PASSED)
+    pool = SandboxPool(size=1, timeout=5.0)
+    try:
+        assert pool.grade(QUESTION, "return 0").status == Verdict.FAILED
+    finally:
+        pool.close()
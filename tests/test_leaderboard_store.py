@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import time
+
+from leaderboard_store import LeaderboardStore
+
+
+def make_store(tmp_path, **kwargs):
+    return LeaderboardStore(path=str(tmp_path / "board.db"), flush_interval=0.01,
+                            legacy_highscore=None, **kwargs)
+
+
+def test_high_score_sees_other_replicas(tmp_path):
+    first = make_store(tmp_path)
+    second = make_store(tmp_path)
+    try:
+        assert first.submit(100, "Easy", "Classic")
+        first.flush()
+        second.refresh()
+        assert second.high_score == 100
+        assert not second.submit(50, "Easy", "Classic")
+        assert second.submit(150, "Easy", "Classic")
+    finally:
+        first.close()
+        second.close()
+
+
+def test_failed_batch_is_retried_not_lost(tmp_path):
+    store = make_store(tmp_path)
+    write_batch = store._write_batch
+
+    def locked_once(batch):
+        if not store.write_errors:
+            raise sqlite3.OperationalError("database is locked")
+        write_batch(batch)
+
+    store._write_batch = locked_once
+    try:
+        store.submit(42, "Easy", "Classic")
+        store.flush()
+    finally:
+        store.close()
+    assert store.write_errors == 1
+    assert [row["score"] for row in store.top()] == [42]
+
+
+def test_game_over_reads_never_touch_the_database(tmp_path):
+    earlier = make_store(tmp_path)
+    earlier.submit(70, "Easy", "Classic")
+    earlier.close()
+    store = make_store(tmp_path)
+    connect = store._connect
+    script_thread = threading.current_thread()
+
+    def writer_only():
+        assert threading.current_thread() is not script_thread
+        return connect()
+
+    store._connect = writer_only
+    try:
+        # seeded once at open
+        assert store.high_score == 70
+        assert store.submit(90, "Easy", "Classic")
+        assert store.rank(60, "Easy", "Classic") == 2
+        assert store.percentile(80) == 100.0
+        assert store.run_count() == 1
+        store.flush()
+        assert store.run_count() == 2 and store.high_score == 90
+    finally:
+        store.close()
+
+
+def test_writer_picks_up_other_replicas_while_idle(tmp_path):
+    idle = make_store(tmp_path, cache_ttl=0.0)
+    busy = make_store(tmp_path)
+    try:
+        busy.submit(120, "Easy", "Classic")
+        busy.flush()
+        deadline = time.monotonic() + 5
+        while idle.high_score != 120 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert idle.high_score == 120 and idle.run_count() == 1
+    finally:
+        idle.close()
+        busy.close()
@@ -0,0 +1,27 @@
+import metrics
+from metrics import Histogram, snapshot
+
+
+def test_published_histogram_lists_are_never_changed():
+    # A scrape copies another thread's dict outside that thread's control, so
+    # the lists it finds there must stay as they were when published
+    histogram = Histogram("test_torn_seconds", "torn-read check", ("k",), buckets=(1.0,))
+    metrics.REGISTRY.remove(histogram)
+    key = (histogram.name, ("x",))
+    histogram.observe(0.5, "x")
+    published = metrics._values()[key]
+    histogram.observe(2.0, "x")
+    assert published == [1, 0, 0.5, 1]
+    assert snapshot()[key] == [1, 1, 2.5, 2]
+
+
+def test_a_taken_port_warns_instead_of_hiding(monkeypatch, capsys):
+    first = metrics.start_http_server(0)
+    try:
+        monkeypatch.setenv("CODERACER_METRICS_PORT", str(first.server_port - 1))
+        monkeypatch.setenv("CODERACER_METRICS_PORT_OFFSET", "1")
+        assert metrics.server_from_env() is None
+        assert f":{first.server_port}" in capsys.readouterr().err
+    finally:
+        first.shutdown()
+        first.server_close()
@@ -0,0 +1,41 @@
+import shutil
+
+import pytest
+
+from grader import Verdict
+from native_grader import NativeGrader, NativeToolchain
+
+pytestmark = pytest.mark.skipif(shutil.which("gcc") is None or shutil.which("g++") is None,
+                                reason="needs gcc and g++")
+
+QUESTION = {
+    "q": "Write function to add two numbers:\ndef add(a, b):\n    # Your code",
+    "a": "return a + b",
+    "tests": [([1, 2], 3), ([-4, 4], 0)],
+}
+
+
+@pytest.fixture(scope="module")
+def toolchain(tmp_path_factory):
+    return NativeToolchain(str(tmp_path_factory.mktemp("native-cache")))
+
+
+@pytest.mark.parametrize("language", ["C", "C++"])
+def test_plain_answer_passes(toolchain, language):
+    assert NativeGrader(toolchain, language).grade(QUESTION, "return a + b;").passed
+
+
+@pytest.mark.parametrize("language", ["C", "C++"])
+@pytest.mark.parametrize("operation", [
+    'remove("{victim}");',
+    'rename("{victim}", "{victim}.moved");',
+    'FILE *f = fopen("{victim}", "w"); if (f) fputs("owned", f);',
+])
+def test_file_operations_cannot_reach_the_server(toolchain, tmp_path, language, operation):
+    victim = tmp_path / "victim.txt"
+    victim.write_text("keep me")
+    body = operation.format(victim=victim) + " return a + b;"
+    verdict = NativeGrader(toolchain, language).grade(QUESTION, body)
+    assert verdict.status in (Verdict.PASSED, Verdict.ERROR)
+    assert victim.read_text() == "keep me"
+    assert not (tmp_path / "victim.txt.moved").exists()
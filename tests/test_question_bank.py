@@ -0,0 +1,113 @@
+import os
+import random
+import shutil
+
+import pytest
+
+import question_bank
+from question_bank import QuestionBank, embedded_questions, floyd_sample
+
+
+@pytest.fixture(scope="module")
+def bank():
+    return QuestionBank(embedded_questions())
+
+
+def test_buckets_match_difficulty_exactly(bank):
+    assert bank.bucket("Easy", "Arrays")
+    assert all(q["diff"] == "Easy" for q in bank.bucket("Easy", "Arrays"))
+    assert not any(q["diff"] == "Very Easy" for q in bank.bucket("Easy"))
+
+
+def test_mixed_bucket_is_every_topic_of_a_difficulty(bank):
+    by_topic = {q["id"] for topic in bank.topics("Easy") for q in bank.bucket("Easy", topic)}
+    assert by_topic == {q["id"] for q in bank.bucket("Easy")}
+    assert bank.topics("Easy") == tuple(sorted(bank.topics("Easy")))
+
+
+def test_questions_are_read_only(bank):
+    question = bank.get("arrays_easy:1")
+    assert question["a"] == "return sorted(arr)[-2]"
+    with pytest.raises(TypeError):
+        question["a"] = "return 0"
+    assert isinstance(question["tests"], tuple)
+
+
+@pytest.mark.parametrize("n, k", [(0, 5), (3, 5), (10, 10), (1000, 15)])
+def test_floyd_sample_draws_distinct_indices(n, k):
+    rng = random.Random(n)
+    picks = floyd_sample(n, k, rng)
+    assert len(picks) == min(n, k) == len(set(picks))
+    assert all(0 <= i < n for i in picks)
+
+
+def test_floyd_sample_reaches_every_index():
+    rng = random.Random(7)
+    seen = set()
+    for _ in range(200):
+        seen.update(floyd_sample(6, 2, rng))
+    assert seen == set(range(6))
+
+
+def test_sample_stays_in_its_bucket(bank):
+    picks = bank.sample("Very Easy", "Strings", k=15, rng=random.Random(1))
+    assert sorted(q["id"] for q in picks) == sorted(q["id"] for q in bank.bucket("Very Easy", "Strings"))
+
+
+# ===========================
+# PRECOMPILED CACHE
+# ===========================
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    """Copies of the cache's source files, so their mtimes can change"""
+    for name in question_bank.CACHE_SOURCES:
+        shutil.copy2(os.path.join(question_bank.HERE, name), tmp_path / name)
+    questions = tmp_path / "questions.json"
+    shutil.copy2(question_bank.QUESTIONS_FILE, questions)
+    monkeypatch.setattr(question_bank, "HERE", str(tmp_path))
+    monkeypatch.setattr(question_bank, "QUESTIONS_FILE", str(questions))
+    monkeypatch.setenv("CODERACER_VALIDATE", "off")
+    return tmp_path
+
+
+def test_cache_key_follows_every_source(sources, monkeypatch):
+    key = question_bank.cache_key()
+    assert question_bank.cache_key() == key
+    for name in question_bank.CACHE_SOURCES + ("questions.json",):
+        path = sources / name
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert question_bank.cache_key() != key, name
+        key = question_bank.cache_key()
+    monkeypatch.setenv("CODERACER_VALIDATE", "report")
+    assert question_bank.cache_key() != key
+
+
+def test_cached_bank_is_reused_until_a_source_changes(sources, tmp_path, monkeypatch):
+    cache = tmp_path / "cache" / "bank.marshal"
+    monkeypatch.setenv("CODERACER_BANK_CACHE", str(cache))
+    builds = []
+    build_bank = question_bank.build_bank
+    monkeypatch.setattr(question_bank, "build_bank", lambda: builds.append(1) or build_bank())
+    get_bank = question_bank.get_bank.__wrapped__
+
+    fresh = get_bank()
+    assert cache.exists() and len(builds) == 1
+    cached = get_bank()
+    assert len(builds) == 1
+    assert {qid: dict(q) for qid, q in cached.questions.items()} == {qid: dict(q) for qid, q in fresh.questions.items()}
+    assert [q["id"] for q in cached.bucket("Easy", "Arrays")] == [q["id"] for q in fresh.bucket("Easy", "Arrays")]
+    assert cached.topics("Easy") == fresh.topics("Easy")
+
+    (sources / "questions.json").write_text("{}")
+    get_bank()
+    assert len(builds) == 2
+    assert question_bank.load_bank(str(cache), question_bank.cache_key()) is not None
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    cache = tmp_path / "bank.marshal"
+    cache.write_bytes(b"not marshal")
+    assert question_bank.load_bank(str(cache), question_bank.cache_key()) is None
+    assert question_bank.load_bank(str(tmp_path / "missing"), question_bank.cache_key()) is None
@@ -0,0 +1,71 @@
+import random
+from bisect import bisect_left, bisect_right
+
+import pytest
+
+from rank_index import FenwickTree, ScoreIndex
+
+
+def check_against_oracle(tree, scores):
+    oracle = sorted(scores)
+    assert tree.total == len(oracle)
+    for position in range(-1, (oracle[-1] if oracle else 0) + 3):
+        assert tree.count_at_most(position) == bisect_right(oracle, position)
+    for k in range(1, len(oracle) + 1):
+        assert tree.select(k) == oracle[k - 1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fenwick_matches_a_sorted_list_while_growing(seed):
+    rng = random.Random(seed)
+    tree = FenwickTree(size=4)
+    scores = []
+    # every few adds land past the current size, so _grow doubles repeatedly
+    for step in range(200):
+        score = rng.randrange(tree.size, tree.size * 3) if step % 40 == 0 else rng.randrange(40)
+        tree.add(score)
+        scores.append(score)
+        if step % 25 == 0:
+            check_against_oracle(tree, scores)
+    check_against_oracle(tree, scores)
+
+
+def test_growing_a_bulk_built_tree_keeps_its_counts():
+    counts = {0: 2, 3: 1, 7: 4}
+    tree = FenwickTree.from_counts(counts)
+    assert tree.size == 8
+    tree.add(1000)
+    assert tree.size == 1024
+    check_against_oracle(tree, [0, 0, 3, 7, 7, 7, 7, 1000])
+
+
+def test_select_out_of_range():
+    tree = FenwickTree.from_counts({5: 1})
+    with pytest.raises(IndexError):
+        tree.select(0)
+    with pytest.raises(IndexError):
+        tree.select(2)
+
+
+def test_score_index_ranks_like_a_sorted_list():
+    rng = random.Random(11)
+    runs = [(rng.randrange(3000), rng.choice(("Easy", "Hard")), "Classic") for _ in range(500)]
+    bulk = ScoreIndex.from_counts((d, m, s, 1) for s, d, m in runs[:300])
+    for score, difficulty, mode in runs[300:]:
+        bulk.add(score, difficulty, mode)
+
+    for difficulty in (None, "Easy", "Hard"):
+        mode = None if difficulty is None else "Classic"
+        oracle = sorted(s for s, d, _ in runs if difficulty in (None, d))
+        assert bulk.count(difficulty, mode) == len(oracle)
+        assert bulk.top(5, difficulty, mode) == oracle[::-1][:5]
+        for probe in (0, 1, 1500, 2999, 5000):
+            assert bulk.rank(probe, difficulty, mode) == 1 + len(oracle) - bisect_right(oracle, probe)
+            assert bulk.percentile(probe, difficulty, mode) == 100.0 * bisect_left(oracle, probe) / len(oracle)
+
+
+def test_empty_groups():
+    index = ScoreIndex()
+    assert index.rank(10, "Easy", "Classic") == 1
+    assert index.percentile(10) == 100.0
+    assert index.top(3) == [] and index.count() == 0
@@ -0,0 +1,57 @@
+import random
+
+from engine import GameEngine
+from session_store import dump_engine, load_engine
+
+
+def restored(engine):
+    return load_engine(dump_engine(engine), clock=engine.clock, rng=random.Random(1))
+
+
+def played_engine():
+    engine = GameEngine(clock=lambda: 5.0, rng=random.Random(3))
+    engine.start_game()
+    engine.submit_answer(engine.qm.current_question["a"])
+    return engine
+
+
+def test_active_bucket_survives_a_snapshot():
+    engine = played_engine()
+    assert engine.qm.scheduler.cards
+    assert restored(engine).qm.scheduler.key == engine.qm.scheduler.key
+
+
+def test_cards_alone_do_not_pick_a_bucket():
+    engine = played_engine()
+    engine.qm.scheduler.key = None
+    scheduler = restored(engine).qm.scheduler
+    assert scheduler.key is None
+    assert set(scheduler.cards) == set(engine.qm.scheduler.cards)
+
+
+class Clocks:
+    """A monotonic clock and a wall clock that advance together"""
+    def __init__(self, mono=5.0, wall=1_700_000_000.0):
+        self.mono = mono
+        self.wall = wall
+
+    def advance(self, seconds):
+        self.mono += seconds
+        self.wall += seconds
+
+
+def test_reload_after_idle_keeps_the_question_clock_running():
+    clocks = Clocks()
+    engine = GameEngine(clock=lambda: clocks.mono, rng=random.Random(3))
+    engine.start_game()
+    limit = engine.time_limit
+    snapshot = dump_engine(engine, wall_clock=lambda: clocks.wall)
+
+    # Nothing worth saving happens for a while; then the page is reloaded
+    # (possibly on a replica whose monotonic clock reads something else)
+    clocks.advance(4.0)
+    clocks.mono += 1000.0
+    resumed = load_engine(snapshot, clock=lambda: clocks.mono, rng=random.Random(1),
+                          wall_clock=lambda: clocks.wall)
+    assert resumed.question_deadline() - clocks.mono == limit - 4.0
+    assert resumed.obstacle_spawn_time == clocks.mono - 4.0
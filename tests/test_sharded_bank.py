@@ -0,0 +1,50 @@
+import pytest
+
+from question_bank import DIFFICULTIES, LANGUAGES, QuestionBank, embedded_questions, file_questions
+from sharded_bank import ShardedBank, write_bank
+
+
+@pytest.fixture(scope="module")
+def questions():
+    return list(embedded_questions()) + list(file_questions())
+
+
+@pytest.fixture(scope="module")
+def directory(tmp_path_factory, questions):
+    directory = tmp_path_factory.mktemp("bank")
+    assert write_bank(str(directory), questions, shard_size=7, checked=True) == len(questions)
+    return directory
+
+
+def test_sharded_bank_matches_the_in_memory_bank(directory, questions):
+    expected = QuestionBank(questions)
+    bank = ShardedBank(str(directory), cache_size=8)
+    assert len(bank) == len(expected)
+    for difficulty in DIFFICULTIES:
+        for language in LANGUAGES:
+            assert bank.topics(difficulty, language) == expected.topics(difficulty, language)
+            for topic in (None,) + expected.topics(difficulty, language):
+                assert ([q["id"] for q in bank.bucket(difficulty, topic, language)]
+                        == [q["id"] for q in expected.bucket(difficulty, topic, language)])
+    question = questions[-1]
+    assert dict(bank.get(question["id"])) == dict(expected.get(question["id"]))
+    assert bank.get("no-such-id") is None
+
+
+def test_opening_decodes_nothing_and_the_lru_stays_bounded(directory, questions):
+    bank = ShardedBank(str(directory), cache_size=4)
+    assert bank.cache_info()["decoded"] == 0
+    assert bank._shards.count(None) == len(bank._shards) > 1
+    bucket = bank.bucket("Easy")
+    assert bucket[-1]["id"] == list(bucket)[-1]["id"]
+    with pytest.raises(IndexError):
+        bucket[len(bucket)]
+    assert bank.cache_info()["decoded"] == 4
+
+
+def test_index_version_is_checked(tmp_path, questions):
+    write_bank(str(tmp_path), questions[:3])
+    index = tmp_path / "index.json"
+    index.write_text(index.read_text().replace('"version": 1', '"version": 99'))
+    with pytest.raises(ValueError):
+        ShardedBank(str(tmp_path))
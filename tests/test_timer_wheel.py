@@ -0,0 +1,82 @@
+import math
+import random
+
+import pytest
+
+from timer_wheel import TimerWheel
+
+
+class Recorder:
+    def __init__(self):
+        self.fired = []
+
+    def __call__(self, name):
+        return lambda deadline: self.fired.append((name, deadline))
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_timers_fire_on_their_tick_across_cascades(seed):
+    rng = random.Random(seed)
+    # 3 levels of 4 slots: a 64-tick span, so timers cascade and park often
+    wheel = TimerWheel(tick=1.0, start=0.0, slot_bits=2, levels=3)
+    recorder = Recorder()
+    expected = {}
+    names = iter(range(10**6))
+    now = 0
+    for step in range(60):
+        for _ in range(rng.randrange(4)):
+            deadline = now + rng.choice((rng.uniform(0, 8), rng.uniform(0, 70), rng.uniform(60, 300)))
+            name = next(names)
+            wheel.schedule(deadline, recorder(name))
+            expected[name] = (deadline, max(math.ceil(deadline), wheel.current + 1))
+        now += rng.choice((1, 1, 2, 5, 17, 80))
+        recorder.fired.clear()
+        wheel.advance(now)
+        due = {name for name, (_, tick) in expected.items() if tick <= now}
+        assert {name for name, _ in recorder.fired} == due
+        for name, deadline in recorder.fired:
+            assert deadline <= now and expected.pop(name)[0] == deadline
+        # one advance fires earlier ticks before later ones
+        ticks = [math.ceil(deadline) for _, deadline in recorder.fired]
+        assert ticks == sorted(ticks)
+        assert len(wheel) == len(expected)
+
+
+def test_never_fires_before_the_deadline():
+    wheel = TimerWheel(tick=0.1, start=100.0)
+    recorder = Recorder()
+    wheel.schedule(100.25, recorder("a"))
+    assert wheel.advance(100.2) == 0
+    assert wheel.advance(100.31) == 1
+    assert recorder.fired == [("a", 100.25)]
+
+
+def test_past_deadlines_fire_on_the_next_tick():
+    wheel = TimerWheel(tick=1.0)
+    wheel.advance(10)
+    recorder = Recorder()
+    wheel.schedule(3, recorder("late"))
+    assert wheel.advance(10.5) == 0
+    assert wheel.advance(11) == 1
+
+
+def test_cancel_inside_a_callback():
+    wheel = TimerWheel(tick=1.0, slot_bits=2, levels=2)
+    fired = []
+    timers = {}
+
+    def first_wins(name):
+        def callback(deadline):
+            fired.append(name)
+            wheel.cancel(timers["b" if name == "a" else "a"])
+        return callback
+
+    # same tick, same slot: whichever fires first cancels the other
+    timers["a"] = wheel.schedule(5, first_wins("a"))
+    timers["b"] = wheel.schedule(5, first_wins("b"))
+    wheel.schedule(40, lambda deadline: fired.append("far"))    # beyond the 16-tick span
+    wheel.cancel(wheel.schedule(6, lambda deadline: fired.append("cancelled")))
+    assert len(wheel) == 3
+    assert wheel.advance(39) == 1 and len(fired) == 1 and len(wheel) == 1
+    assert wheel.advance(40) == 1 and fired[-1] == "far"
+    assert len(wheel) == 0
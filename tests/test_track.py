@@ -0,0 +1,34 @@
+from styles import STYLESHEET
+from track import FrameStats, lanes_markup, track_payload
+
+
+def test_frames_stay_small_and_carry_no_stylesheet():
+    payload = track_payload(63.7, 2.4, 0, 2)
+    assert len(payload.encode()) < 1024 < len(STYLESHEET.encode())
+    assert "<style" not in payload and "{" not in payload
+    assert "--eta:2.4s" in payload and "63m away" in payload
+
+
+def test_obstacle_and_car_sit_in_their_lanes():
+    payload = track_payload(50, 1.0, 0, 2)
+    assert payload.index("obstacle") < payload.index('class="car"')
+    assert payload.count("🚧") == 1 and payload.count('class="car"') == 1
+    # an arrived obstacle is no longer drawn
+    assert "🚧" not in track_payload(0, 0.0, 1, 1)
+
+
+def test_lanes_are_reused_within_a_position_bucket():
+    lanes_markup.cache_clear()
+    first = track_payload(61.9, 2.0, 1, 0)
+    second = track_payload(60.1, 1.9, 1, 0)
+    assert lanes_markup.cache_info().hits == 1
+    assert first.split('<div class="road">')[1] == second.split('<div class="road">')[1]
+
+
+def test_frame_stats_track_bytes_per_frame():
+    stats = FrameStats()
+    stats.record_stylesheet(STYLESHEET)
+    stats.record("ab")
+    stats.record("é")
+    assert stats.as_dict() == {"frames": 2, "last_bytes": 2, "average_bytes": 2.0,
+                               "stylesheet_bytes": len(STYLESHEET.encode())}
@@ -0,0 +1,118 @@
+"""
+Hierarchical timer wheel for deadlines shared by many sessions.
+
+Time is cut into fixed ticks.  Level 0 has one slot per tick; each higher
+level has one slot per full turn of the level below, and its timers drop
+("cascade") a level every time that slot comes round.  Scheduling and
+cancelling are O(1), and advancing by a tick touches one slot plus
+whatever fires, however many timers are pending.
+
+    wheel = TimerWheel(tick=0.1, start=time.monotonic())
+    timer = wheel.schedule(deadline, on_expiry)     # on_expiry(deadline)
+    wheel.cancel(timer)                             # or let it fire
+    wheel.advance(time.monotonic())                 # from one ticker
+"""
+
+import math
+
+SLOT_BITS = 6       # 64 slots per level
+LEVELS = 4          # 64**4 ticks, about 19 days at 0.1 s; later timers cascade again
+
+
+class Timer:
+    """One pending expiry; TimerWheel.cancel() it or let the wheel fire it"""
+    __slots__ = ("deadline", "expires", "callback", "bucket")
+
+    def __init__(self, deadline, expires, callback):
+        self.deadline = deadline
+        self.expires = expires
+        self.callback = callback
+        self.bucket = None
+
+    @property
+    def active(self):
+        return self.bucket is not None
+
+
+class TimerWheel:
+    """Timers on a monotonic clock, fired by advance() no earlier than their deadline"""
+    def __init__(self, tick=0.1, start=0.0, slot_bits=SLOT_BITS, levels=LEVELS):
+        self.tick = tick
+        self.origin = start
+        self.bits = slot_bits
+        self.mask = (1 << slot_bits) - 1
+        self.levels = levels
+        self.span = 1 << (slot_bits * levels)
+        self.current = 0            # ticks since origin already processed
+        self.pending = 0
+        self.fired = 0
+        self._wheels = [[set() for _ in range(1 << slot_bits)] for _ in range(levels)]
+
+    def schedule(self, deadline, callback):
+        """Call ``callback(deadline)`` from the first advance() at or past deadline"""
+        expires = max(math.ceil((deadline - self.origin) / self.tick), self.current + 1)
+        timer = Timer(deadline, expires, callback)
+        self._place(timer)
+        self.pending += 1
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None and timer.active:
+            timer.bucket.discard(timer)
+            timer.bucket = None
+            self.pending -= 1
+
+    def _place(self, timer):
+        delta = timer.expires - self.current
+        if delta >= self.span:
+            # Beyond the top level: park it as far out as possible, re-placed on cascade
+            expires = self.current + self.span - 1
+            delta = self.span - 1
+        else:
+            expires = timer.expires
+        level = 0
+        while delta >> (self.bits * (level + 1)):
+            level += 1
+        bucket = self._wheels[level][(expires >> (self.bits * level)) & self.mask]
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def _cascade(self):
+        for level in range(1, self.levels):
+            index = (self.current >> (self.bits * level)) & self.mask
+            bucket = self._wheels[level][index]
+            if bucket:
+                self._wheels[level][index] = set()
+                for timer in bucket:
+                    self._place(timer)
+            if index:
+                break
+
+    def advance(self, now):
+        """Fire every timer due by ``now``; returns how many fired"""
+        target = math.floor((now - self.origin) / self.tick)
+        fired = 0
+        while self.current < target:
+            if not self.pending:
+                self.current = target       # nothing to fire: skip idle ticks
+                break
+            self.current += 1
+            if not self.current & self.mask:
+                self._cascade()
+            slot = self.current & self.mask
+            bucket = self._wheels[0][slot]
+            if not bucket:
+                continue
+            self._wheels[0][slot] = set()
+            for timer in list(bucket):
+                if timer.bucket is not bucket:
+                    continue        # cancelled by an earlier callback
+                timer.bucket = None
+                self.pending -= 1
+                fired += 1
+                timer.callback(timer.deadline)
+        self.fired += fired
+        return fired
+
+    def __len__(self):
+        return self.pending
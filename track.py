@@ -0,0 +1,109 @@
+"""
+Per-frame racing track markup.
+
+The stylesheet lives in styles.py and is sent once per session; a frame
+carries only the obstacle offset, its time to impact and the lane
+contents, and lane markup is memoized by (obstacle lane, car lane,
+position bucket).  The game-over score chart is a small inline SVG
+built from the engine's downsampled timeline, so its size does not grow
+with the length of the race.
+"""
+
+from functools import lru_cache
+
+
+LANE_INDEX = {"left": 0, "center": 1, "right": 2}
+
+# Obstacle offsets are rounded to this many distance units
+POSITION_BUCKET = 5
+
+CAR_HTML = (
+    '<div class="car"><div class="car-body">'
+    '<div class="car-window"></div><div class="car-stripe"></div>'
+    '<div class="car-wheel wheel-left"></div><div class="car-wheel wheel-right"></div>'
+    '<div class="car-wheel wheel-left-front"></div><div class="car-wheel wheel-right-front"></div>'
+    '</div><div class="car-glow"></div></div>'
+)
+
+
+def position_bucket(obstacle_dist):
+    """Bucket index of an obstacle distance (0 means it has arrived)"""
+    return max(0, int(obstacle_dist)) // POSITION_BUCKET
+
+
+@lru_cache(maxsize=None)
+def lanes_markup(obstacle_lane_idx, car_lane_idx, bucket):
+    """The three lanes for one (obstacle lane, car lane, position bucket)"""
+    top = 100 - bucket * POSITION_BUCKET
+    html = []
+    for i in range(3):
+        html.append('<div class="lane">')
+        # Show obstacle in its lane
+        if i == obstacle_lane_idx and bucket > 0:
+            html.append(f'<div class="obstacle" style="--obstacle-top:{top}%">🚧</div>')
+        # Show sleek car in its lane
+        if i == car_lane_idx:
+            html.append(CAR_HTML)
+        html.append('</div>')
+    return "".join(html)
+
+
+def track_payload(obstacle_dist, eta, obstacle_lane_idx, car_lane_idx):
+    """Markup for one frame of the track"""
+    distance = max(0, int(obstacle_dist))
+    lanes = lanes_markup(obstacle_lane_idx, car_lane_idx, position_bucket(obstacle_dist))
+    return (
+        f'<div class="track-container" style="--eta:{eta:.1f}s">'
+        f'<div class="distance-marker">⚠️ Obstacle: {distance}m away</div>'
+        f'<div class="road">{lanes}</div></div>'
+    )
+
+
+def score_chart(series, width=300, height=80):
+    """Inline SVG polyline of (time, score) pairs, e.g. ScoreTimeline.chart()"""
+    if len(series) < 2:
+        return ""
+    t0, s0 = series[0]
+    t_span = (series[-1][0] - t0) or 1.0
+    s_span = (max(score for _, score in series) - s0) or 1
+    points = " ".join(
+        f"{(t - t0) / t_span * width:.0f},{height - (score - s0) / s_span * height:.0f}"
+        for t, score in series
+    )
+    return (
+        f'<svg class="score-chart" viewBox="0 0 {width} {height}" preserveAspectRatio="none">'
+        f'<polyline points="{points}"/></svg>'
+    )
+
+
+class FrameStats:
+    """Bytes of markup sent per frame, for tracking websocket traffic"""
+    __slots__ = ("frames", "total_bytes", "last_bytes", "stylesheet_bytes")
+
+    def __init__(self):
+        self.frames = 0
+        self.total_bytes = 0
+        self.last_bytes = 0
+        self.stylesheet_bytes = 0
+
+    def record(self, payload):
+        size = len(payload.encode("utf-8"))
+        self.frames += 1
+        self.total_bytes += size
+        self.last_bytes = size
+        return size
+
+    def record_stylesheet(self, payload):
+        self.stylesheet_bytes += len(payload.encode("utf-8"))
+
+    @property
+    def average_bytes(self):
+        return self.total_bytes / self.frames if self.frames else 0.0
+
+    def as_dict(self):
+        return {
+            "frames": self.frames,
+            "last_bytes": self.last_bytes,
+            "average_bytes": round(self.average_bytes, 1),
+            "stylesheet_bytes": self.stylesheet_bytes,
+        }